@@ -1,3 +1,26 @@
-from git_diff_analyzer.services.diff_service import compare_local_remote_changes
+import importlib
 
-__all__ = ['compare_local_remote_changes']
+# The public API is imported on first access, so importing the package stays cheap
+_EXPORTS = {
+    'compare_local_remote_changes': 'git_diff_analyzer.services.diff_service',
+    'find_overlapping_changes': 'git_diff_analyzer.services.diff_service',
+    'iter_overlapping_changes': 'git_diff_analyzer.services.diff_service',
+    'compare_branch_matrix': 'git_diff_analyzer.services.matrix',
+    'find_conflicting_hunks': 'git_diff_analyzer.services.hunk_service',
+}
+
+__all__ = ['compare_local_remote_changes', 'find_overlapping_changes', 'iter_overlapping_changes',
+           'compare_branch_matrix', 'find_conflicting_hunks']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENV_VAR = "GIT_DIFF_ANALYZER_CACHE"
+DEFAULT_MAX_ENTRIES = 100_000
+# How many writes happen between two checks of the cache size
+EVICTION_INTERVAL = 100
+# Seconds during which further hits leave the access time of an entry alone, so reads rarely write
+TOUCH_INTERVAL = 60.0
+
+_SHA_PATTERN = re.compile(r"^(?:[0-9a-f]{40}|[0-9a-f]{64})$")
+
+
+def is_commit_sha(value):
+    """Check if a revision is a full object SHA, the only kind of revision that never moves."""
+    return isinstance(value, str) and _SHA_PATTERN.match(value) is not None
+
+
+class ResultCache:
+    """
+    Persistent key-value cache in a SQLite file, safe to share between threads and processes.
+    Only results keyed on immutable object SHAs should be stored. Once the cache grows
+    past `max_entries` the least recently used entries are evicted, where access times
+    are only tracked to within TOUCH_INTERVAL seconds.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def get(self, namespace, key):
+        """Return the cached value, or None if it is not cached."""
+        cache_key = _encode_key(namespace, key)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, accessed FROM entries WHERE key = ?", (cache_key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > TOUCH_INTERVAL:
+                self._connection.execute(
+                    "UPDATE entries SET accessed = ? WHERE key = ?", (now, cache_key))
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value):
+        """Store a JSON-serializable value."""
+        cache_key = _encode_key(namespace, key)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, accessed) VALUES (?, ?, ?)",
+                (cache_key, json.dumps(value), time.time()))
+            self._writes += 1
+            if self._writes % EVICTION_INTERVAL == 0:
+                self._evict()
+
+    def _evict(self):
+        """Drop the least recently used entries down to 90% of the limit."""
+        count = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        self._connection.execute(
+            "DELETE FROM entries WHERE key IN "
+            "(SELECT key FROM entries ORDER BY accessed LIMIT ?)", (excess,))
+        logger.debug("Evicted %d entries from the result cache", excess)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def _encode_key(namespace, key):
+    return json.dumps([namespace, key], separators=(",", ":"))
+
+
+_cache = None
+_configured = False
+_config_lock = threading.Lock()
+
+
+def configure_cache(path, max_entries=DEFAULT_MAX_ENTRIES):
+    """Use a persistent result cache stored at `path` for all later calls."""
+    global _cache, _configured
+    with _config_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = ResultCache(path, max_entries)
+        _configured = True
+        return _cache
+
+
+def disable_cache():
+    """Stop caching results."""
+    global _cache, _configured
+    with _config_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+        _configured = True
+
+
+def get_cache():
+    """
+    Return the configured result cache or None if caching is disabled.
+    Unless configured explicitly, the cache path is read from GIT_DIFF_ANALYZER_CACHE.
+    """
+    global _cache, _configured
+    if _configured:
+        return _cache
+    with _config_lock:
+        if not _configured:
+            path = os.environ.get(CACHE_ENV_VAR)
+            _cache = ResultCache(path) if path else None
+            _configured = True
+        return _cache
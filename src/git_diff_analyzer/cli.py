@@ -0,0 +1,161 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from contextlib import nullcontext
+
+from git_diff_analyzer.git_utils.cat_file import BACKEND_ENV_VAR, BACKENDS, GIT_BACKEND, configure_backend
+from git_diff_analyzer.instrumentation import collect_stats
+from git_diff_analyzer.services.diff_service import (
+    MERGE_BASE_LOCAL, MERGE_BASE_REMOTE, iter_overlapping_changes)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_ENV_VAR = "GITHUB_TOKEN"
+
+# Failures reported as an error line instead of a traceback; TimeoutError, FileNotFoundError
+# and the connection errors of requests are all OSErrors
+_REPORTED_ERRORS = (ValueError, OSError)
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(
+        prog="git-diff-analyzer",
+        description="Stream files changed in both a remote branch (branch_a) and a local branch "
+                    "(branch_b) since their merge base, as one JSON object per line.")
+    parser.add_argument("owner", help="owner of the GitHub repository")
+    parser.add_argument("repo", help="name of the GitHub repository")
+    parser.add_argument("local_repo_path", help="path to the local clone")
+    parser.add_argument("branch_a", help="remote branch")
+    parser.add_argument("branch_b", help="local branch")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV_VAR),
+                        help=f"GitHub access token (default: ${TOKEN_ENV_VAR})")
+    parser.add_argument("--provider", default="github",
+                        help="remote API to use: github, github-graphql or a provider installed "
+                             "in the git_diff_analyzer.remotes entry point group")
+    parser.add_argument("--merge-base", default=MERGE_BASE_LOCAL, choices=[MERGE_BASE_LOCAL, MERGE_BASE_REMOTE],
+                        help="find the merge base from local refs, or through the remote so that "
+                             "branch_a does not have to be fetched")
+    parser.add_argument("--include", action="append", metavar="PATTERN",
+                        help="only compare paths matching this glob pathspec, e.g. 'src/**/*.py' "
+                             "(repeatable)")
+    parser.add_argument("--exclude", action="append", metavar="PATTERN",
+                        help="skip paths matching this glob pathspec (repeatable)")
+    parser.add_argument("--skip-generated", action="store_true",
+                        help="skip vendored directories, lock files, generated sources and binaries")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help=f"read local objects through git or in-process without git "
+                             f"(default: ${BACKEND_ENV_VAR} or {GIT_BACKEND})")
+    parser.add_argument("--watch", metavar="SOCKET",
+                        help="keep running, update the overlaps as either head moves and answer "
+                             "JSON queries on this Unix socket")
+    parser.add_argument("--stats", action="store_true",
+                        help="print timings, call counts and latencies as JSON to stderr when done")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress to stderr")
+    return parser
+
+
+def main(argv=None):
+    """Entry point of the git-diff-analyzer console script."""
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        stream=sys.stderr, force=True)
+    if not args.token:
+        print(f"error: a GitHub token is required (--token or ${TOKEN_ENV_VAR})", file=sys.stderr)
+        return 2
+    if args.backend:
+        configure_backend(args.backend)
+
+    with collect_stats() if args.stats else nullcontext() as stats:
+        exit_code = _watch(args) if args.watch else _write_overlaps(args)
+    if stats is not None:
+        print(json.dumps(stats.to_dict()), file=sys.stderr)
+    return exit_code
+
+
+def _watch(args):
+    from git_diff_analyzer.services.daemon import OverlapWatcher, WatchServer
+    try:
+        watcher = OverlapWatcher(
+            args.owner, args.repo, args.token, args.local_repo_path, args.branch_a, args.branch_b,
+            provider=args.provider, merge_base_mode=args.merge_base, include=args.include,
+            exclude=args.exclude, skip_generated=args.skip_generated)
+        server = WatchServer(watcher, args.watch)
+    except _REPORTED_ERRORS as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    logger.info("Serving overlaps on %s", args.watch)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _write_overlaps(args):
+    overlaps = iter_overlapping_changes(
+        args.owner, args.repo, args.token, args.local_repo_path,
+        args.branch_a, args.branch_b, provider=args.provider, merge_base_mode=args.merge_base,
+        include=args.include, exclude=args.exclude, skip_generated=args.skip_generated)
+    try:
+        for overlap in overlaps:
+            sys.stdout.write(json.dumps(overlap.to_dict()) + "\n")
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away, e.g. piped into `head`
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+    except _REPORTED_ERRORS as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        overlaps.close()
+    return 0
+
+
+def _build_fleet_parser():
+    from git_diff_analyzer.services.fleet import DEFAULT_MAX_REPOSITORIES, DEFAULT_TIMEOUT
+    parser = argparse.ArgumentParser(
+        prog="git-diff-analyzer-fleet",
+        description="Find files changed on both sides for many repositories and branch pairs, "
+                    "writing one JSON report.")
+    parser.add_argument("manifest", help="JSON list of {owner, repo, local_path, branches: [[branch_a, branch_b]]}")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV_VAR),
+                        help=f"GitHub access token (default: ${TOKEN_ENV_VAR})")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes for local git work (default: one per core)")
+    parser.add_argument("--max-repositories", type=int, default=DEFAULT_MAX_REPOSITORIES,
+                        help="repositories analyzed at the same time")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per repository")
+    parser.add_argument("--output", help="write the report to this file instead of stdout")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress to stderr")
+    return parser
+
+
+def fleet_main(argv=None):
+    """Entry point of the git-diff-analyzer-fleet console script."""
+    from git_diff_analyzer.services.fleet import load_manifest, run_fleet
+    args = _build_fleet_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        stream=sys.stderr, force=True)
+    try:
+        manifest = load_manifest(args.manifest)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    report = run_fleet(manifest, args.token, processes=args.processes,
+                       max_repositories=args.max_repositories, timeout=args.timeout)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0 if report["summary"]["ok"] == report["summary"]["repositories"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import atexit
+import logging
+import os
+import subprocess
+import threading
+from typing import List, NamedTuple, Optional
+
+from git_diff_analyzer.instrumentation import PIPE, SUBPROCESS, span
+
+logger = logging.getLogger(__name__)
+
+# Requests written before reading their answers, small enough to never fill the pipe buffers
+PIPELINE_DEPTH = 256
+
+BACKEND_ENV_VAR = "GIT_DIFF_ANALYZER_BACKEND"
+GIT_BACKEND = 'git'
+PYTHON_BACKEND = 'python'
+BACKENDS = (GIT_BACKEND, PYTHON_BACKEND)
+
+
+class ObjectInfo(NamedTuple):
+    sha: str
+    type: str
+    size: int
+
+
+class CatFileReader:
+    """
+    Long-lived `git cat-file --batch-check` and `--batch` processes for one repository.
+    Object lookups become pipe round trips instead of process start-ups.
+    Each pipe is guarded by its own lock, so the reader can be shared between threads.
+    """
+
+    def __init__(self, repo_loc):
+        self.repo_loc = repo_loc
+        self._check_process = None
+        self._batch_process = None
+        self._check_lock = threading.Lock()
+        self._batch_lock = threading.Lock()
+
+    def _start(self, mode):
+        try:
+            with span(f'git cat-file {mode}', SUBPROCESS):
+                return subprocess.Popen(
+                    ['git', 'cat-file', mode], cwd=self.repo_loc,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            logger.error(f"Failed to start git cat-file in {self.repo_loc}: {e}")
+            raise ValueError(f"Failed to start git cat-file: {e}")
+
+    def object_info(self, rev) -> Optional[ObjectInfo]:
+        """Return the SHA, type and size of an object, or None if it does not exist."""
+        return self.object_infos([rev])[0]
+
+    def object_infos(self, revs) -> List[Optional[ObjectInfo]]:
+        """Look up several objects, pipelining the requests through the batch-check process."""
+        results = []
+        with self._check_lock:
+            if self._check_process is None or self._check_process.poll() is not None:
+                self._check_process = self._start('--batch-check')
+            process = self._check_process
+            with span('cat-file info', PIPE, objects=len(revs)):
+                for start in range(0, len(revs), PIPELINE_DEPTH):
+                    chunk = revs[start:start + PIPELINE_DEPTH]
+                    self._write_requests(process, chunk)
+                    results.extend(_parse_header(self._read_line(process)) for _ in chunk)
+        return results
+
+    def read_object(self, rev):
+        """Return (ObjectInfo, content bytes) of an object, or None if it does not exist."""
+        with self._batch_lock:
+            if self._batch_process is None or self._batch_process.poll() is not None:
+                self._batch_process = self._start('--batch')
+            process = self._batch_process
+            with span('cat-file read', PIPE) as attributes:
+                self._write_requests(process, [rev])
+                info = _parse_header(self._read_line(process))
+                if info is None:
+                    return None
+                content = process.stdout.read(info.size)
+                # Every object is followed by a newline
+                process.stdout.read(1)
+                attributes['bytes'] = info.size
+            return info, content
+
+    def _write_requests(self, process, revs):
+        for rev in revs:
+            if '\n' in rev:
+                raise ValueError(f"Invalid revision: {rev!r}")
+        try:
+            process.stdin.write(''.join(f'{rev}\n' for rev in revs).encode())
+            process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ValueError(f"git cat-file exited unexpectedly: {e}")
+
+    def _read_line(self, process):
+        line = process.stdout.readline()
+        if not line:
+            raise ValueError("git cat-file exited unexpectedly")
+        return line.decode().rstrip('\n')
+
+    def close(self):
+        """Stop the git processes."""
+        for lock, attribute in ((self._check_lock, '_check_process'), (self._batch_lock, '_batch_process')):
+            with lock:
+                process = getattr(self, attribute)
+                if process is not None:
+                    process.stdin.close()
+                    process.wait()
+                    process.stdout.close()
+                    setattr(self, attribute, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _parse_header(line):
+    """Parse `<sha> <type> <size>`, returning None for `<rev> missing` or `<rev> ambiguous`."""
+    parts = line.rsplit(' ', 2)
+    if len(parts) != 3 or not parts[2].isdigit():
+        return None
+    return ObjectInfo(parts[0], parts[1], int(parts[2]))
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+_backend = None
+
+
+def configure_backend(backend):
+    """
+    Read local objects through `git cat-file` ('git') or in-process with ObjectStore ('python')
+    from now on. Unless configured, the backend is read from GIT_DIFF_ANALYZER_BACKEND.
+    """
+    global _backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    close_object_readers()
+    _backend = backend
+
+
+def get_backend():
+    """Return the configured local backend."""
+    global _backend
+    if _backend is None:
+        backend = os.environ.get(BACKEND_ENV_VAR) or GIT_BACKEND
+        if backend not in BACKENDS:
+            logger.warning(f"Unknown backend {backend} in ${BACKEND_ENV_VAR}, using git")
+            backend = GIT_BACKEND
+        _backend = backend
+    return _backend
+
+
+def get_object_reader(repo_loc):
+    """Return the shared object reader of a repository for the configured backend, starting it on first use."""
+    key = os.path.abspath(repo_loc)
+    with _readers_lock:
+        reader = _readers.get(key)
+        if reader is None:
+            if get_backend() == PYTHON_BACKEND:
+                from git_diff_analyzer.git_utils.object_store import ObjectStore
+                reader = _readers[key] = ObjectStore(repo_loc)
+            else:
+                reader = _readers[key] = CatFileReader(repo_loc)
+        return reader
+
+
+@atexit.register
+def close_object_readers():
+    """Stop the git processes, or unmap the packs, of all shared object readers."""
+    with _readers_lock:
+        for reader in _readers.values():
+            reader.close()
+        _readers.clear()
@@ -0,0 +1,422 @@
+import heapq
+import logging
+import os
+import sqlite3
+import struct
+import subprocess
+import threading
+
+from git_diff_analyzer.instrumentation import SUBPROCESS, span
+
+logger = logging.getLogger(__name__)
+
+COMMIT_INDEX_ENV_VAR = "GIT_DIFF_ANALYZER_COMMIT_INDEX"
+
+_GRAPH_SIGNATURE = b'CGPH'
+_GRAPH_NO_PARENT = 0x70000000
+_GRAPH_EXTRA_EDGES = 0x80000000
+_GRAPH_LAST_EDGE = 0x80000000
+_SHA1_SIZE = 20
+
+# Paint flags of the merge base walk
+_PARENT1, _PARENT2, _STALE = 1, 2, 4
+
+
+class CommitIndex:
+    """
+    Persistent ancestry index of commits, keyed by SHA, stored in a SQLite file and kept in memory.
+    Every commit is stored with its parents and its generation number (one more than the
+    largest generation of its parents), and the index is closed under ancestry: the parents
+    of an indexed commit are always indexed. Merge-base and is-ancestor queries then walk the
+    history in memory, never below the generation of the commits that can still matter.
+    Commits are imported from a repository's commit-graph file when it has one, and otherwise,
+    or for newer commits, from `git rev-list` stopping at the commits indexed so far.
+    Commits from the remote history can be added as well, so ancestry checks against
+    remote heads work without fetching them. Since SHAs are immutable, one index can be
+    shared by many repositories and processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._commits = {}
+        # Indexed commits without indexed children; excluding them from rev-list excludes the whole index
+        self._heads = set()
+        self._git_dirs = {}
+        self._last_rowid = 0
+        self._connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS commits ("
+            "sha TEXT PRIMARY KEY, generation INTEGER NOT NULL, parents TEXT NOT NULL)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY)")
+        self._refresh()
+
+    def __contains__(self, sha):
+        return sha in self._commits
+
+    def __len__(self):
+        return len(self._commits)
+
+    def generation(self, sha):
+        return self._commits[sha][0]
+
+    def parents(self, sha):
+        return self._commits[sha][1]
+
+    def update(self, commits, repo_loc):
+        """
+        Make sure the given commit SHAs and their history are indexed, importing them from a repository.
+        Returns False for shallow repositories, whose history is incomplete and is never indexed.
+        """
+        if all(sha in self._commits for sha in commits):
+            return True
+        git_dir = self._git_dir(repo_loc)
+        if os.path.exists(os.path.join(git_dir, 'shallow')):
+            return False
+        with self._lock:
+            # Another process may have indexed them already
+            self._refresh()
+            if any(sha not in self._commits for sha in commits):
+                self._import_commit_graph(git_dir)
+            missing = [sha for sha in commits if sha not in self._commits]
+            if missing:
+                self._import_rev_list(missing, repo_loc)
+        for sha in commits:
+            if sha not in self._commits:
+                raise ValueError(f"Unknown commit: {sha}")
+        return True
+
+    def add_commits(self, commits):
+        """
+        Index commits given as (sha, parents) pairs in any order, e.g. walked from the remote history.
+        Commits whose history does not reach the index are left out. Returns the number of added commits.
+        """
+        with self._lock:
+            return self._store(self._resolve({sha: tuple(parents) for sha, parents in commits}))
+
+    def merge_bases(self, commit, others):
+        """
+        Return the best common ancestors of a commit and a hypothetical merge of `others`,
+        like `git merge-base --all`, newest generation first.
+        """
+        self._require([commit, *others])
+        if commit in others:
+            return [commit]
+        flags = {commit: _PARENT1}
+        for other in others:
+            flags[other] = _PARENT2
+        queue = [(-self._commits[sha][0], sha) for sha in flags]
+        heapq.heapify(queue)
+        # Without stale entries left in the queue, no further common ancestor can be best
+        active = len(queue)
+        results = []
+        while active:
+            _, sha = heapq.heappop(queue)
+            # Children have higher generations, so the flags of a commit are final once it is popped
+            commit_flags = flags[sha]
+            if not commit_flags & _STALE:
+                active -= 1
+                if commit_flags & (_PARENT1 | _PARENT2) == _PARENT1 | _PARENT2:
+                    results.append(sha)
+                    commit_flags |= _STALE
+            for parent in self._commits[sha][1]:
+                parent_flags = flags.get(parent)
+                new_flags = (parent_flags or 0) | commit_flags
+                if new_flags == parent_flags:
+                    continue
+                flags[parent] = new_flags
+                if parent_flags is None:
+                    heapq.heappush(queue, (-self._commits[parent][0], parent))
+                    active += not new_flags & _STALE
+                elif new_flags & _STALE and not parent_flags & _STALE:
+                    active -= 1
+        return [sha for sha in results
+                if not any(other != sha and self.is_ancestor(sha, other) for other in results)]
+
+    def merge_base(self, commit, others):
+        """Return one best common ancestor, or None if the commits share no history."""
+        bases = self.merge_bases(commit, others)
+        return bases[0] if bases else None
+
+    def is_ancestor(self, ancestor, commit):
+        """Check if `ancestor` is reachable from `commit`, which includes the commit itself."""
+        self._require([ancestor, commit])
+        if ancestor == commit:
+            return True
+        floor = self._commits[ancestor][0]
+        stack = [commit]
+        seen = {commit}
+        while stack:
+            for parent in self._commits[stack.pop()][1]:
+                if parent == ancestor:
+                    return True
+                if parent not in seen and self._commits[parent][0] > floor:
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _require(self, commits):
+        for sha in commits:
+            if sha not in self._commits:
+                raise ValueError(f"Commit {sha} is not indexed")
+
+    def _git_dir(self, repo_loc):
+        git_dir = self._git_dirs.get(repo_loc)
+        if git_dir is None:
+            output = _run_git(['git', 'rev-parse', '--git-common-dir'], repo_loc)
+            git_dir = self._git_dirs[repo_loc] = os.path.abspath(os.path.join(repo_loc, output.strip()))
+        return git_dir
+
+    def _refresh(self):
+        """Load the rows written since the last load, including those of other processes."""
+        rows = self._connection.execute(
+            "SELECT rowid, sha, generation, parents FROM commits WHERE rowid > ? ORDER BY rowid",
+            (self._last_rowid,)).fetchall()
+        if not rows:
+            return
+        loaded = {}
+        for rowid, sha, generation, parents in rows:
+            loaded[sha] = (generation, tuple(parents.split()))
+            self._last_rowid = rowid
+        self._remember(loaded)
+
+    def _import_commit_graph(self, git_dir):
+        """Index the commits of the repository's commit-graph file or chain, once per version of it."""
+        paths = _commit_graph_paths(git_dir)
+        if not paths:
+            return
+        try:
+            versions = [os.stat(path) for path in paths]
+        except OSError:
+            return
+        source = ';'.join(f'{path}:{stat.st_mtime_ns}:{stat.st_size}' for path, stat in zip(paths, versions))
+        if self._connection.execute("SELECT 1 FROM sources WHERE name = ?", (source,)).fetchone():
+            return
+        try:
+            with span('commit-graph'):
+                commits = read_commit_graph(paths)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read the commit-graph of {git_dir}: {e}")
+            return
+        if all(generation for generation, _ in commits.values()):
+            added = self._store({sha: entry for sha, entry in commits.items() if sha not in self._commits})
+        else:
+            # Written without generation numbers, so they are computed here
+            added = self._store(self._resolve({sha: parents for sha, (_, parents) in commits.items()}))
+        self._connection.execute("INSERT OR IGNORE INTO sources (name) VALUES (?)", (source,))
+        logger.info("Indexed %d commits from the commit-graph of %s", added, git_dir)
+
+    def _import_rev_list(self, commits, repo_loc):
+        """Index the history of commits that is not indexed yet with one rev-list walk."""
+        revisions = commits + [f'^{head}' for head in self._heads]
+        output = _run_git(['git', 'rev-list', '--parents', '--ignore-missing', '--stdin'], repo_loc,
+                          '\n'.join(revisions) + '\n')
+        listed = {}
+        for line in output.splitlines():
+            sha, *parents = line.split()
+            listed[sha] = tuple(parents)
+        added = self._store(self._resolve(listed))
+        logger.info("Indexed %d commits from the history of %s", added, repo_loc)
+
+    def _resolve(self, pending):
+        """Compute the generations of pending commits, parents first, skipping those with unknown history."""
+        resolved = {}
+        failed = set()
+        expanded = set()
+        for start in pending:
+            stack = [start]
+            while stack:
+                sha = stack[-1]
+                if sha in self._commits or sha in resolved or sha in failed:
+                    stack.pop()
+                    continue
+                parents = pending[sha]
+                if sha not in expanded:
+                    expanded.add(sha)
+                    stack.extend(parent for parent in parents
+                                 if parent in pending and parent not in resolved and parent not in expanded)
+                    continue
+                stack.pop()
+                generations = []
+                for parent in parents:
+                    entry = self._commits.get(parent) or resolved.get(parent)
+                    if entry is None:
+                        failed.add(sha)
+                        break
+                    generations.append(entry[0])
+                else:
+                    resolved[sha] = (max(generations, default=0) + 1, parents)
+        return resolved
+
+    def _store(self, commits):
+        """Persist and remember new commits given as {sha: (generation, parents)}."""
+        if not commits:
+            return 0
+        # Writers take turns, so the rows since the last load are exactly theirs and ours
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._refresh()
+            commits = {sha: entry for sha, entry in commits.items() if sha not in self._commits}
+            self._connection.executemany(
+                "INSERT INTO commits (sha, generation, parents) VALUES (?, ?, ?)",
+                ((sha, generation, ' '.join(parents)) for sha, (generation, parents) in commits.items()))
+            self._last_rowid = self._connection.execute("SELECT MAX(rowid) FROM commits").fetchone()[0] or 0
+            self._connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._connection.execute("ROLLBACK")
+            logger.error(f"Failed to store commits in {self.path}: {e}")
+            raise ValueError(f"Failed to store commits: {e}")
+        self._remember(commits)
+        return len(commits)
+
+    def _remember(self, commits):
+        self._commits.update(commits)
+        self._heads.update(commits)
+        for _, parents in commits.values():
+            self._heads.difference_update(parents)
+
+
+def read_commit_graph(paths):
+    """
+    Read the commits of a commit-graph file, or of the layers of a split commit-graph chain
+    (base layer first), as {sha: (generation, parents)}. A generation of 0 means the file
+    was written without generation numbers.
+    """
+    layers = []
+    oids = []
+    for path in paths:
+        with open(path, 'rb') as file:
+            data = file.read()
+        layer_oids, records, edges = _parse_commit_graph(data, path)
+        layers.append((records, edges))
+        oids.extend(layer_oids)
+
+    commits = {}
+    position = 0
+    for records, edges in layers:
+        for parent1, parent2, generation in records:
+            parents = []
+            if parent1 != _GRAPH_NO_PARENT:
+                parents.append(oids[parent1])
+            if parent2 & _GRAPH_EXTRA_EDGES:
+                edge = parent2 & ~_GRAPH_EXTRA_EDGES
+                while True:
+                    value = edges[edge]
+                    parents.append(oids[value & ~_GRAPH_LAST_EDGE])
+                    if value & _GRAPH_LAST_EDGE:
+                        break
+                    edge += 1
+            elif parent2 != _GRAPH_NO_PARENT:
+                parents.append(oids[parent2])
+            commits[oids[position]] = (generation, tuple(parents))
+            position += 1
+    return commits
+
+
+def _parse_commit_graph(data, path):
+    """Return the object ids, (parent1, parent2, generation) records and extra edges of one graph file."""
+    if len(data) < 8 or data[:4] != _GRAPH_SIGNATURE:
+        raise ValueError(f"{path} is not a commit-graph file")
+    version, hash_version, chunk_count = data[4], data[5], data[6]
+    if version != 1 or hash_version != 1:
+        raise ValueError(f"Unsupported commit-graph version {version} with hash version {hash_version}")
+    chunks = {}
+    # The table ends with a terminating entry at the end of the last chunk
+    ends = []
+    for n in range(chunk_count + 1):
+        chunk_id, offset = struct.unpack_from('>4sQ', data, 8 + 12 * n)
+        chunks.setdefault(chunk_id, offset)
+        ends.append(offset)
+    if not {b'OIDF', b'OIDL', b'CDAT'} <= set(chunks):
+        raise ValueError(f"{path} has no commit data")
+    count = struct.unpack_from('>I', data, chunks[b'OIDF'] + 255 * 4)[0]
+    start = chunks[b'OIDL']
+    oids = [data[offset:offset + _SHA1_SIZE].hex()
+            for offset in range(start, start + count * _SHA1_SIZE, _SHA1_SIZE)]
+    records = []
+    record_size = _SHA1_SIZE + 16
+    for offset in range(chunks[b'CDAT'], chunks[b'CDAT'] + count * record_size, record_size):
+        parent1, parent2, generation = struct.unpack_from('>III', data, offset + _SHA1_SIZE)
+        # The generation is stored in the upper 30 bits, next to the commit date
+        records.append((parent1, parent2, generation >> 2))
+    edges = []
+    if b'EDGE' in chunks:
+        end = min(offset for offset in ends if offset > chunks[b'EDGE'])
+        edges = [value for (value,) in struct.iter_unpack('>I', data[chunks[b'EDGE']:end])]
+    return oids, records, edges
+
+
+def _commit_graph_paths(git_dir):
+    """Return the commit-graph file of a repository, or the layers of its split chain, if any."""
+    info_dir = os.path.join(git_dir, 'objects', 'info')
+    chain = os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain')
+    try:
+        with open(chain) as file:
+            hashes = file.read().split()
+        return [os.path.join(info_dir, 'commit-graphs', f'graph-{name}.graph') for name in hashes]
+    except OSError:
+        pass
+    path = os.path.join(info_dir, 'commit-graph')
+    return [path] if os.path.exists(path) else []
+
+
+def _run_git(command, repo_loc, stdin=None):
+    try:
+        with span(f'git {command[1]}', SUBPROCESS) as attributes:
+            result = subprocess.run(command, cwd=repo_loc, input=stdin, capture_output=True, text=True)
+            attributes['bytes'] = len(result.stdout)
+    except OSError as e:
+        logger.error(f"Failed to run git command {command}: {e}")
+        raise ValueError(f"Failed to run git: {e}")
+    if result.returncode != 0:
+        logger.error(f"Error in git command: {command}, {result.stderr}")
+        raise ValueError(f"Git command failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+_index = None
+_configured = False
+_config_lock = threading.Lock()
+
+
+def configure_commit_index(path):
+    """Keep a persistent commit ancestry index at `path` and answer merge-base queries from it."""
+    global _index, _configured
+    with _config_lock:
+        if _index is not None:
+            _index.close()
+        _index = CommitIndex(path)
+        _configured = True
+        return _index
+
+
+def disable_commit_index():
+    """Answer merge-base queries with git again."""
+    global _index, _configured
+    with _config_lock:
+        if _index is not None:
+            _index.close()
+        _index = None
+        _configured = True
+
+
+def get_commit_index():
+    """
+    Return the configured commit index or None if there is none.
+    Unless configured explicitly, the index path is read from GIT_DIFF_ANALYZER_COMMIT_INDEX.
+    """
+    global _index, _configured
+    if _configured:
+        return _index
+    with _config_lock:
+        if not _configured:
+            path = os.environ.get(COMMIT_INDEX_ENV_VAR)
+            _index = CommitIndex(path) if path else None
+            _configured = True
+        return _index
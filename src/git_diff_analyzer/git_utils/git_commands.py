@@ -1,20 +1,36 @@
 import logging
 import subprocess
+import sys
+from contextlib import contextmanager
 from typing import List
 
+from git_diff_analyzer.cache import get_cache, is_commit_sha
+from git_diff_analyzer.git_utils.cat_file import PYTHON_BACKEND, get_backend, get_object_reader
+from git_diff_analyzer.git_utils.commit_index import get_commit_index
+from git_diff_analyzer.hunks import iter_diff_hunk_ranges
+from git_diff_analyzer.instrumentation import SUBPROCESS, span
+from git_diff_analyzer.models import ADDED, COPIED, DELETED, MODIFIED, NULL_SHA, RENAMED, ChangedFile
+from git_diff_analyzer.path_filter import PathFilter
+
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Cache namespace of changed entries, versioned since entries carry renames and copies
+LOCAL_CHANGES = 'local-changes/2'
+# Rename and copy detection; copies are only looked for among files changed in the same diff
+RENAME_OPTIONS = ['-M', '-C']
 
 
-def run_git_command(command: List[str], repo_loc: str) -> str:
+def run_git_command(command: List[str], repo_loc: str, strip: bool = True) -> str:
     """Helper function to run a git command and handle errors."""
     try:
-        result = subprocess.run(command, cwd=repo_loc,
-                                capture_output=True, text=True)
-        if result.returncode != 0:
-            logger.error(f"Error in git command: {command}, {result.stderr}")
-            raise ValueError(f"Git command failed: {result.stderr.strip()}")
-        return result.stdout.strip()
+        with span(_git_span_name(command), SUBPROCESS) as attributes:
+            result = subprocess.run(command, cwd=repo_loc,
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                logger.error(f"Error in git command: {command}, {result.stderr}")
+                raise ValueError(f"Git command failed: {result.stderr.strip()}")
+            attributes['bytes'] = len(result.stdout)
+        return result.stdout.strip() if strip else result.stdout
     except Exception as e:
         logger.error(
             f"Unexpected error while running git command {command}: {e}")
@@ -22,19 +38,95 @@ def run_git_command(command: List[str], repo_loc: str) -> str:
 
 
 def get_merge_base(branch_a, branch_b, repo_loc):
-    """Find the last common commit (merge base) between two branches."""
+    """
+    Find the last common commit (merge base) between two branches.
+    With a result cache the branches are resolved first, so the merge base of two commits is computed once.
+    With a commit index the merge base is found in memory.
+    """
+    cache = get_cache()
     try:
-        return run_git_command(['git', 'merge-base', branch_a, branch_b], repo_loc)
+        if cache is None and get_commit_index() is None:
+            return run_git_command(['git', 'merge-base', branch_a, branch_b], repo_loc)
+        commits = resolve_commits([branch_a, branch_b], repo_loc)
+        key = sorted(commits)
+        merge_base = cache.get('merge-base', key) if cache is not None else None
+        if merge_base is None:
+            merge_base = _compute_merge_base(commits[0], commits[1:], repo_loc)
+            if cache is not None:
+                cache.set('merge-base', key, merge_base)
+        return merge_base
     except ValueError as e:
         logger.error(
             f"Failed to get merge base for branches {branch_a} and {branch_b}: {e}")
         raise ValueError(f"Failed to get merge base: {e}")
 
 
+def get_merge_base_with_any(commit, candidates, repo_loc):
+    """
+    Find the merge base of a commit and a hypothetical merge of all `candidates`,
+    i.e. the best common ancestor of `commit` and any of them.
+    """
+    try:
+        if get_commit_index() is None:
+            return run_git_command(['git', 'merge-base', commit, *candidates], repo_loc)
+        commit, *candidates = resolve_commits([commit, *candidates], repo_loc)
+        return _compute_merge_base(commit, candidates, repo_loc)
+    except ValueError as e:
+        logger.error(f"Failed to get merge base of {commit} and {len(candidates)} commits: {e}")
+        raise ValueError(f"Failed to get merge base: {e}")
+
+
+def is_ancestor(ancestor, commit, repo_loc):
+    """Check if `ancestor` is reachable from `commit`, in memory with a commit index."""
+    try:
+        ancestor, commit = resolve_commits([ancestor, commit], repo_loc)
+        index = get_commit_index()
+        if index is not None and index.update([ancestor, commit], repo_loc):
+            return index.is_ancestor(ancestor, commit)
+        # Nothing is listed if the ancestor is reachable from the commit
+        return not run_git_command(['git', 'rev-list', '--max-count=1', ancestor, f'^{commit}'], repo_loc)
+    except ValueError as e:
+        logger.error(f"Failed to check if {ancestor} is an ancestor of {commit}: {e}")
+        raise ValueError(f"Failed to check ancestry: {e}")
+
+
+def _compute_merge_base(commit, others, repo_loc):
+    """Find the merge base of resolved commits through the commit index, or git for shallow repositories."""
+    index = get_commit_index()
+    if index is None or not index.update([commit, *others], repo_loc):
+        return run_git_command(['git', 'merge-base', commit, *others], repo_loc)
+    merge_base = index.merge_base(commit, others)
+    if merge_base is None:
+        raise ValueError(f"No common ancestor of {commit} and {', '.join(others)}")
+    return merge_base
+
+
+def get_known_commits(commits, repo_loc):
+    """Return the set of the given commit SHAs that exist in the local repository."""
+    infos = get_object_reader(repo_loc).object_infos(
+        [f'{commit}^{{commit}}' for commit in commits])
+    return {commit for commit, info in zip(commits, infos) if info is not None}
+
+
+def resolve_commits(revisions, repo_loc):
+    """Resolve revisions to full commit SHAs through the repository's object reader."""
+    unresolved = [rev for rev in revisions if not is_commit_sha(rev)]
+    if not unresolved:
+        return list(revisions)
+    infos = get_object_reader(repo_loc).object_infos(
+        [f'{rev}^{{commit}}' for rev in unresolved])
+    resolved = {}
+    for rev, info in zip(unresolved, infos):
+        if info is None:
+            raise ValueError(f"Unknown revision: {rev}")
+        resolved[rev] = info.sha
+    return [resolved.get(rev, rev) for rev in revisions]
+
+
 def get_local_last_commit(branch, repo_loc):
     """Get the last commit hash in the local branch."""
     try:
-        return run_git_command(['git', 'rev-parse', f"refs/heads/{branch}"], repo_loc)
+        return resolve_commits([f"refs/heads/{branch}"], repo_loc)[0]
     except ValueError as e:
         logger.error(f"Failed to get the last commit for branch {branch}: {e}")
         raise ValueError(f"Failed to get last commit: {e}")
@@ -52,30 +144,260 @@ def get_changed_files(repo_loc, base_commit_hash, commit_hash):
         raise ValueError(f"Failed to get changed files: {e}")
 
 
+def get_changed_entries(repo_loc, base_commit_hash, commit_hash, pathspecs=None):
+    """
+    Get the changed files between two commits in a single git invocation.
+    Renames and copies are detected in the same pass and reported with their old path.
+    Entries whose blob did not change (e.g. mode-only changes) are skipped.
+    Only paths matching `pathspecs` (e.g. from PathFilter.pathspecs()) are listed.
+    With the python backend the trees are diffed in-process, finding exact renames only.
+    """
+    cache = get_cache()
+    namespace = _local_changes_namespace()
+    key = [base_commit_hash, commit_hash, *(pathspecs or ())]
+    cacheable = cache is not None and is_commit_sha(base_commit_hash) and is_commit_sha(commit_hash)
+    if cacheable:
+        cached = cache.get(namespace, key)
+        if cached is not None:
+            return [ChangedFile.from_row(entry) for entry in cached]
+    try:
+        if get_backend() == PYTHON_BACKEND:
+            entries = list(_iter_object_store_diff(repo_loc, base_commit_hash, commit_hash, pathspecs))
+        else:
+            output = run_git_command(
+                _diff_tree_command(base_commit_hash, commit_hash, pathspecs), repo_loc, strip=False)
+            entries = _parse_raw_diff(output)
+    except ValueError as e:
+        logger.error(
+            f"Failed to get changed entries between {base_commit_hash} and {commit_hash}: {e}")
+        raise ValueError(f"Failed to get changed entries: {e}")
+    if cacheable:
+        cache.set(namespace, key, [list(entry) for entry in entries])
+    return entries
+
+
+def iter_changed_entries(repo_loc, base_commit_hash, commit_hash, pathspecs=None):
+    """
+    Yield the changed files between two commits while git is still writing them,
+    so memory is bounded by the read buffer instead of the size of the diff.
+    """
+    cache = get_cache()
+    namespace = _local_changes_namespace()
+    key = [base_commit_hash, commit_hash, *(pathspecs or ())]
+    cacheable = cache is not None and is_commit_sha(base_commit_hash) and is_commit_sha(commit_hash)
+    if cacheable:
+        cached = cache.get(namespace, key)
+        if cached is not None:
+            yield from (ChangedFile.from_row(entry) for entry in cached)
+            return
+
+    entries = [] if cacheable else None
+    try:
+        if get_backend() == PYTHON_BACKEND:
+            changes = _iter_object_store_diff(repo_loc, base_commit_hash, commit_hash, pathspecs)
+        else:
+            changes = _iter_diff_tree(repo_loc, base_commit_hash, commit_hash, pathspecs)
+        for entry in changes:
+            if entries is not None:
+                entries.append(entry)
+            yield entry
+    except ValueError as e:
+        logger.error(
+            f"Failed to get changed entries between {base_commit_hash} and {commit_hash}: {e}")
+        raise ValueError(f"Failed to get changed entries: {e}")
+    if entries is not None:
+        cache.set(namespace, key, [list(entry) for entry in entries])
+
+
+def _iter_diff_tree(repo_loc, base_commit_hash, commit_hash, pathspecs):
+    command = _diff_tree_command(base_commit_hash, commit_hash, pathspecs)
+    with _stream_git_command(command, repo_loc) as stdout:
+        yield from _parse_raw_records(_iter_nul_fields(stdout))
+
+
+def _iter_object_store_diff(repo_loc, base_commit_hash, commit_hash, pathspecs):
+    path_filter = PathFilter.from_pathspecs(pathspecs) if pathspecs else None
+    return get_object_reader(repo_loc).iter_changed_entries(base_commit_hash, commit_hash, path_filter)
+
+
+def _local_changes_namespace():
+    # The in-process diff finds exact renames only, so its entries are cached apart from git's
+    if get_backend() == PYTHON_BACKEND:
+        return f'{LOCAL_CHANGES}/{PYTHON_BACKEND}'
+    return LOCAL_CHANGES
+
+
+def iter_changed_hunks(repo_loc, base_commit_hash, commit_hash, pathspecs=None):
+    """
+    Yield (path, ranges) for every file changed between two commits, where ranges are
+    the base-file line ranges touched by its hunks (None for binary files).
+    Renamed and copied files are yielded under their new path.
+    All files are read from a single streamed `git diff -U0`.
+    """
+    command = ['git', '-c', 'core.quotepath=false', 'diff', '-U0', '--no-color', '--no-ext-diff',
+               *RENAME_OPTIONS, base_commit_hash, commit_hash, '--', *(pathspecs or ())]
+    try:
+        with _stream_git_command(command, repo_loc) as stdout:
+            lines = (line.decode('utf-8', 'surrogateescape') for line in stdout)
+            yield from iter_diff_hunk_ranges(lines)
+    except ValueError as e:
+        logger.error(
+            f"Failed to get changed hunks between {base_commit_hash} and {commit_hash}: {e}")
+        raise ValueError(f"Failed to get changed hunks: {e}")
+
+
+@contextmanager
+def _stream_git_command(command, repo_loc):
+    """Run a git command and provide its stdout as a binary stream that is read while git runs."""
+    with span(_git_span_name(command), SUBPROCESS):
+        try:
+            process = subprocess.Popen(command, cwd=repo_loc,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            logger.error(f"Unexpected error while running git command {command}: {e}")
+            raise ValueError(f"Unexpected error: {e}")
+        try:
+            yield process.stdout
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read().decode(errors='replace')
+            process.stderr.close()
+            returncode = process.wait()
+    if returncode != 0:
+        logger.error(f"Error in git command: {command}, {stderr}")
+        raise ValueError(f"Git command failed: {stderr.strip()}")
+
+
+def _git_span_name(command):
+    """Name a git command by its subcommand, skipping `-c name=value` options."""
+    args = iter(command[1:])
+    for arg in args:
+        if arg == '-c':
+            next(args, None)
+        elif not arg.startswith('-'):
+            return f'git {arg}'
+    return 'git'
+
+
+def _diff_tree_command(base_commit_hash, commit_hash, pathspecs=None):
+    return ['git', 'diff-tree', '-r', '--raw', '-z', *RENAME_OPTIONS, '--no-abbrev',
+            base_commit_hash, commit_hash, '--', *(pathspecs or ())]
+
+
+def _iter_nul_fields(stream, chunk_size=65536):
+    """Split a binary stream into NUL-terminated text fields without reading it whole."""
+    remainder = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        fields = (remainder + chunk).split(b'\0')
+        remainder = fields.pop()
+        for field in fields:
+            yield field.decode('utf-8', 'surrogateescape')
+    if remainder:
+        yield remainder.decode('utf-8', 'surrogateescape')
+
+
+def _parse_raw_diff(output):
+    """Parse `git diff-tree --raw -z` output into ChangedFile entries."""
+    return list(_parse_raw_records(iter(output.split('\0'))))
+
+
+def _parse_raw_records(fields):
+    """
+    Parse an iterator of `git diff-tree --raw -z` fields into ChangedFile entries.
+    Renames and copies (status R or C with a similarity score) are followed by two paths.
+    """
+    for header in fields:
+        path = next(fields, None)
+        if not header or path is None:
+            return
+        old_mode, new_mode, old_sha, new_sha, status = header.lstrip(':').split(' ')
+        if status[0] in 'RC':
+            old_path, path = sys.intern(path), sys.intern(next(fields))
+            yield ChangedFile(path, RENAMED if status[0] == 'R' else COPIED, old_sha, new_sha,
+                              sys.intern(old_mode), sys.intern(new_mode), old_path)
+            continue
+        if old_sha == new_sha:
+            continue
+        path, old_mode, new_mode = sys.intern(path), sys.intern(old_mode), sys.intern(new_mode)
+        if status == 'A':
+            yield ChangedFile(path, ADDED, None, new_sha, None, new_mode)
+        elif status == 'D':
+            yield ChangedFile(path, DELETED, old_sha, None, old_mode, None)
+        else:
+            yield ChangedFile(
+                path, MODIFIED,
+                None if old_sha == NULL_SHA else old_sha,
+                None if new_sha == NULL_SHA else new_sha,
+                old_mode, new_mode)
+
+
+def get_blob_sha(commit, file_path, repo_loc):
+    """Get the blob SHA of a file in a given commit, or None if the file does not exist."""
+    cache = get_cache()
+    cacheable = cache is not None and is_commit_sha(commit)
+    if cacheable:
+        cached = cache.get('blob-sha', [commit, file_path])
+        if cached is not None:
+            return cached[0]
+    info = get_object_reader(repo_loc).object_info(f'{commit}:{file_path}')
+    blob_sha = info.sha if info is not None else None
+    if cacheable:
+        cache.set('blob-sha', [commit, file_path], [blob_sha])
+    return blob_sha
+
+
 def get_file_exists(commit, file_path, repo_loc):
     """Check if the file exists in a given commit."""
     try:
-        output = run_git_command(
-            ['git', 'ls-tree', commit, file_path], repo_loc)
-        return output != ''
+        return get_blob_sha(commit, file_path, repo_loc) is not None
     except ValueError as e:
         logger.error(
             f"Failed to check if file {file_path} exists in commit {commit}: {e}")
         raise ValueError(f"Failed to check file existence: {e}")
 
 
+def is_diff(commit_a, file_ca, commit_b, file_cb, repo_loc):
+    """
+    Check if a file differs between two commits without reading or diffing its content.
+    Both blobs are looked up in one batch; different sizes or different blob SHAs, which
+    hash the content, decide it whatever the size of the files.
+    """
+    try:
+        info_a, info_b = get_object_reader(repo_loc).object_infos(
+            [f'{commit_a}:{file_ca}', f'{commit_b}:{file_cb}'])
+    except ValueError as e:
+        logger.error(
+            f"Failed to compare files {file_ca} and {file_cb} between commits {commit_a} and {commit_b}: {e}")
+        raise ValueError(f"Failed to compare files: {e}")
+    for info, file, commit in ((info_a, file_ca, commit_a), (info_b, file_cb, commit_b)):
+        if info is None:
+            raise FileNotFoundError(f"File '{file}' not found in commit {commit}.")
+    return info_a.size != info_b.size or info_a.sha != info_b.sha
+
+
 def get_diff(commit_a, file_ca, commit_b, file_cb, repo_loc):
-    """Get the diff between two files in two different commits."""
+    """
+    Get the diff between two files in two different commits.
+    Existence and identical blobs are checked through the object reader, so git diff only runs for real changes.
+    To only test whether the files differ, use is_diff.
+    """
     try:
         # Check if files exist in both commits
-        if not get_file_exists(commit_a, file_ca, repo_loc):
+        blob_a = get_blob_sha(commit_a, file_ca, repo_loc)
+        if blob_a is None:
             raise FileNotFoundError(
                 f"File '{file_ca}' not found in commit {commit_a}.")
-        if not get_file_exists(commit_b, file_cb, repo_loc):
+        blob_b = get_blob_sha(commit_b, file_cb, repo_loc)
+        if blob_b is None:
             raise FileNotFoundError(
                 f"File '{file_cb}' not found in commit {commit_b}.")
+        if blob_a == blob_b:
+            return ''
 
-        # If both files exist, proceed to get the diff
+        # If both files exist and differ, proceed to get the diff
         return run_git_command(['git', 'diff', f'{commit_a}:{file_ca}', f'{commit_b}:{file_cb}'], repo_loc)
     except FileNotFoundError:
         raise
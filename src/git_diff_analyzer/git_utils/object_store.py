@@ -0,0 +1,544 @@
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import List, Optional
+
+from git_diff_analyzer.git_utils.cat_file import ObjectInfo
+from git_diff_analyzer.remote.tree_diff import TREE, walk_tree_diff
+
+logger = logging.getLogger(__name__)
+
+OBJECT_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+OFS_DELTA = 6
+REF_DELTA = 7
+# Resolved delta bases kept in memory, since the objects of one delta chain share them
+DELTA_BASE_CACHE_SIZE = 256
+# Bytes of compressed data handed to zlib at a time
+READ_CHUNK_SIZE = 65536
+# Symbolic refs and tags followed before giving up
+MAX_INDIRECTIONS = 10
+
+_IDX_MAGIC = b'\377tOc'
+_SHA_PATTERN = re.compile(r'^[0-9a-f]{40}$')
+_PEEL_SUFFIXES = (('^{commit}', 'commit'), ('^{tree}', 'tree'))
+
+
+class ObjectStore:
+    """
+    Read objects and refs of a local repository in-process, without running git.
+    Pack indexes and packs are memory-mapped and objects are found by a binary search
+    of the index; loose objects, refs and packed-refs are read from their files.
+    It answers the same revisions as CatFileReader for the forms used here: full SHAs,
+    ref names, `<rev>^{commit}`, `<rev>^{tree}` and `<rev>:<path>`.
+    Only SHA-1 repositories are supported.
+    """
+
+    def __init__(self, repo_loc):
+        self.repo_loc = repo_loc
+        self.git_dir, self.common_dir = _find_git_dir(repo_loc)
+        self._object_dirs = _find_object_dirs(os.path.join(self.common_dir, 'objects'))
+        self._lock = threading.Lock()
+        self._packs = []
+        self._pack_paths = set()
+        self._packed_refs = {}
+        self._packed_refs_stamp = None
+        self._bases = OrderedDict()
+        self._scan_packs()
+
+    def object_info(self, rev) -> Optional[ObjectInfo]:
+        """Return the SHA, type and size of an object, or None if it does not exist."""
+        sha = self._resolve(rev)
+        if sha is None:
+            return None
+        header = self._header(sha)
+        return ObjectInfo(sha, *header) if header is not None else None
+
+    def object_infos(self, revs) -> List[Optional[ObjectInfo]]:
+        return [self.object_info(rev) for rev in revs]
+
+    def read_object(self, rev):
+        """Return (ObjectInfo, content bytes) of an object, or None if it does not exist."""
+        sha = self._resolve(rev)
+        found = self._read(sha) if sha is not None else None
+        if found is None:
+            return None
+        kind, content = found
+        return ObjectInfo(sha, kind, len(content)), content
+
+    def iter_changed_entries(self, base_rev, rev, path_filter=None):
+        """Yield the ChangedFile entries between the trees of two revisions, reading only trees that differ."""
+        trees = []
+        for name in (base_rev, rev):
+            tree = self._resolve(f'{name}^{{tree}}')
+            if tree is None:
+                raise ValueError(f"Unknown revision: {name}")
+            trees.append(tree)
+        return walk_tree_diff(trees[0], trees[1], self._list_trees, path_filter)
+
+    def close(self):
+        """Unmap the pack files."""
+        with self._lock:
+            for pack in self._packs:
+                pack.close()
+            self._packs = []
+            self._pack_paths = set()
+            self._bases.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _resolve(self, rev):
+        """Resolve a revision to an object SHA, or None if it does not exist."""
+        rev, separator, path = rev.partition(':')
+        peel = None
+        for suffix, kind in _PEEL_SUFFIXES:
+            if rev.endswith(suffix):
+                rev, peel = rev[:-len(suffix)], kind
+        sha = self._resolve_name(rev)
+        if sha is None:
+            return None
+        if separator:
+            peel = 'tree'
+        if peel is not None:
+            sha = self._peel(sha, peel)
+        if sha is not None and separator:
+            sha = self._lookup_path(sha, path)
+        return sha
+
+    def _resolve_name(self, name):
+        if _SHA_PATTERN.match(name):
+            return name if self._header(name) is not None else None
+        if not name or '..' in name or name.startswith('/') or '\\' in name:
+            return None
+        # The same order git uses to disambiguate a short ref name
+        for ref in (name, f'refs/{name}', f'refs/tags/{name}', f'refs/heads/{name}',
+                    f'refs/remotes/{name}', f'refs/remotes/{name}/HEAD'):
+            sha = self._read_ref(ref)
+            if sha is not None:
+                return sha
+        return None
+
+    def _read_ref(self, ref):
+        for _ in range(MAX_INDIRECTIONS):
+            value = self._read_loose_ref(ref)
+            if value is None:
+                return self._read_packed_refs().get(ref)
+            if not value.startswith('ref: '):
+                return value if _SHA_PATTERN.match(value) else None
+            ref = value[5:]
+        return None
+
+    def _read_loose_ref(self, ref):
+        # HEAD and other pseudo refs belong to the worktree, everything else to the common directory
+        directory = self.git_dir if '/' not in ref else self.common_dir
+        try:
+            with open(os.path.join(directory, ref)) as file:
+                return file.read().strip()
+        except (IsADirectoryError, FileNotFoundError, NotADirectoryError):
+            return None
+        except OSError as e:
+            raise ValueError(f"Failed to read ref {ref}: {e}")
+
+    def _read_packed_refs(self):
+        """Read packed-refs again only when the file changed."""
+        path = os.path.join(self.common_dir, 'packed-refs')
+        try:
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if stamp != self._packed_refs_stamp:
+                refs = {}
+                with open(path) as file:
+                    for line in file:
+                        if line.startswith(('#', '^')):
+                            continue
+                        sha, _, ref = line.strip().partition(' ')
+                        refs[ref] = sha
+                self._packed_refs, self._packed_refs_stamp = refs, stamp
+            return self._packed_refs
+
+    def _peel(self, sha, kind):
+        """Follow tags and commits until an object of `kind` is reached."""
+        for _ in range(MAX_INDIRECTIONS):
+            header = self._header(sha)
+            if header is None:
+                return None
+            if header[0] == kind:
+                return sha
+            if header[0] == 'tag':
+                sha = _read_header_field(self._read(sha)[1], b'object')
+            elif header[0] == 'commit' and kind == 'tree':
+                sha = _read_header_field(self._read(sha)[1], b'tree')
+            else:
+                return None
+        return None
+
+    def _lookup_path(self, tree, path):
+        for name in path.strip('/').split('/') if path.strip('/') else []:
+            if tree is None:
+                return None
+            found = self._read(tree)
+            if found is None or found[0] != 'tree':
+                return None
+            entry = _parse_tree(found[1]).get(name)
+            tree = entry[1] if entry is not None else None
+        return tree
+
+    def _list_trees(self, tree_shas):
+        listings = {}
+        for sha in tree_shas:
+            found = self._read(sha)
+            if found is None or found[0] != 'tree':
+                raise ValueError(f"Tree {sha} not found")
+            listings[sha] = _parse_tree(found[1])
+        return listings
+
+    def _locate(self, sha):
+        """Return (pack, offset) or the path of a loose object, or None if it does not exist."""
+        binary = bytes.fromhex(sha)
+        for rescan in (False, True):
+            if rescan and not self._scan_packs():
+                return None
+            for pack in self._packs:
+                offset = pack.find(binary)
+                if offset is not None:
+                    return pack, offset
+            if not rescan:
+                for directory in self._object_dirs:
+                    path = os.path.join(directory, sha[:2], sha[2:])
+                    if os.path.isfile(path):
+                        return path
+        return None
+
+    def _scan_packs(self):
+        """Map packs written since the last scan, e.g. by a fetch or gc. Returns True if any were added."""
+        added = False
+        with self._lock:
+            for directory in self._object_dirs:
+                try:
+                    names = sorted(os.listdir(os.path.join(directory, 'pack')))
+                except FileNotFoundError:
+                    continue
+                for name in names:
+                    path = os.path.join(directory, 'pack', name)
+                    if name.endswith('.idx') and path not in self._pack_paths:
+                        self._packs.append(_Pack(path))
+                        self._pack_paths.add(path)
+                        added = True
+        return added
+
+    def _header(self, sha):
+        """Return (type, size) of an object without inflating more than its header."""
+        location = self._locate(sha)
+        if location is None:
+            return None
+        if isinstance(location, str):
+            with open(location, 'rb') as file:
+                header = _inflate_prefix(file.read(), 0, 64)
+            kind, _, size = header[:header.index(b'\0')].decode().partition(' ')
+            return kind, int(size)
+        return self._packed_header(*location)
+
+    def _packed_header(self, pack, offset):
+        kind, size, position = _entry_header(pack.data, offset)
+        if kind in OBJECT_TYPES:
+            return OBJECT_TYPES[kind], size
+        if kind == OFS_DELTA:
+            base_offset, position = _base_offset(pack.data, offset, position)
+            base_kind = self._packed_header(pack, base_offset)[0]
+        elif kind == REF_DELTA:
+            base_sha = pack.data[position:position + 20].hex()
+            position += 20
+            base_kind = self._header(base_sha)[0]
+        else:
+            raise ValueError(f"Unknown object type {kind} in {pack.pack_path}")
+        # A delta starts with the sizes of its base and of the object it produces
+        delta = _inflate_prefix(pack.data, position, 20)
+        _, delta_position = _read_size(delta, 0)
+        target_size, _ = _read_size(delta, delta_position)
+        return base_kind, target_size
+
+    def _read(self, sha):
+        """Return (type, content) of an object, or None if it does not exist."""
+        location = self._locate(sha)
+        if location is None:
+            return None
+        if isinstance(location, str):
+            with open(location, 'rb') as file:
+                raw = zlib.decompress(file.read())
+            header, _, content = raw.partition(b'\0')
+            return header.split(b' ')[0].decode(), content
+        return self._read_packed(*location)
+
+    def _read_packed(self, pack, offset):
+        kind, size, position = _entry_header(pack.data, offset)
+        if kind in OBJECT_TYPES:
+            return OBJECT_TYPES[kind], _inflate(pack.data, position, size)
+        if kind == OFS_DELTA:
+            base_offset, position = _base_offset(pack.data, offset, position)
+            base = self._read_base(pack, base_offset)
+        elif kind == REF_DELTA:
+            base = self._read(pack.data[position:position + 20].hex())
+            position += 20
+            if base is None:
+                raise ValueError(f"Delta base missing in {pack.pack_path}")
+        else:
+            raise ValueError(f"Unknown object type {kind} in {pack.pack_path}")
+        return base[0], _apply_delta(base[1], _inflate(pack.data, position, size))
+
+    def _read_base(self, pack, offset):
+        key = (pack.pack_path, offset)
+        with self._lock:
+            base = self._bases.get(key)
+            if base is not None:
+                self._bases.move_to_end(key)
+                return base
+        base = self._read_packed(pack, offset)
+        with self._lock:
+            self._bases[key] = base
+            if len(self._bases) > DELTA_BASE_CACHE_SIZE:
+                self._bases.popitem(last=False)
+        return base
+
+
+class _Pack:
+    """A pack file with its version 2 index, both memory-mapped."""
+
+    def __init__(self, idx_path):
+        self.idx_path = idx_path
+        self.pack_path = idx_path[:-len('.idx')] + '.pack'
+        self.index = _map_file(idx_path)
+        self.data = _map_file(self.pack_path)
+        if self.index[:4] != _IDX_MAGIC or struct.unpack('>I', self.index[4:8])[0] != 2:
+            self.close()
+            raise ValueError(f"Unsupported pack index {idx_path}")
+        # fanout[b] is the number of objects whose SHA starts with a byte <= b
+        self._fanout = struct.unpack('>256I', self.index[8:8 + 1024])
+        count = self._fanout[255]
+        self._shas = 8 + 1024
+        self._offsets = self._shas + count * 24
+        self._large_offsets = self._offsets + count * 4
+
+    def find(self, sha):
+        """Binary search the index for a 20-byte SHA, returning its offset in the pack or None."""
+        low = self._fanout[sha[0] - 1] if sha[0] else 0
+        high = self._fanout[sha[0]]
+        index = self.index
+        while low < high:
+            middle = (low + high) // 2
+            start = self._shas + middle * 20
+            candidate = index[start:start + 20]
+            if candidate < sha:
+                low = middle + 1
+            elif candidate > sha:
+                high = middle
+            else:
+                return self._offset(middle)
+        return None
+
+    def _offset(self, position):
+        start = self._offsets + position * 4
+        offset = struct.unpack('>I', self.index[start:start + 4])[0]
+        if offset & 0x80000000:
+            start = self._large_offsets + (offset & 0x7fffffff) * 8
+            offset = struct.unpack('>Q', self.index[start:start + 8])[0]
+        return offset
+
+    def close(self):
+        self.index.close()
+        self.data.close()
+
+
+def _map_file(path):
+    with open(path, 'rb') as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _find_git_dir(repo_loc):
+    """Return the git directory and the common directory shared by its worktrees."""
+    directory = os.path.abspath(repo_loc)
+    while True:
+        dot_git = os.path.join(directory, '.git')
+        if os.path.isdir(dot_git):
+            git_dir = dot_git
+            break
+        if os.path.isfile(dot_git):
+            with open(dot_git) as file:
+                target = file.read().strip()
+            if not target.startswith('gitdir: '):
+                raise ValueError(f"Invalid .git file in {directory}")
+            git_dir = os.path.normpath(os.path.join(directory, target[len('gitdir: '):]))
+            break
+        if os.path.isfile(os.path.join(directory, 'HEAD')) and os.path.isdir(os.path.join(directory, 'objects')):
+            git_dir = directory
+            break
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            raise ValueError(f"Not a git repository: {repo_loc}")
+        directory = parent
+
+    common_dir = git_dir
+    try:
+        with open(os.path.join(git_dir, 'commondir')) as file:
+            common_dir = os.path.normpath(os.path.join(git_dir, file.read().strip()))
+    except FileNotFoundError:
+        pass
+    try:
+        with open(os.path.join(common_dir, 'config')) as file:
+            if re.search(r'^\s*objectformat\s*=\s*sha256', file.read(), re.IGNORECASE | re.MULTILINE):
+                raise ValueError(f"SHA-256 repositories are not supported: {repo_loc}")
+    except FileNotFoundError:
+        pass
+    return git_dir, common_dir
+
+
+def _find_object_dirs(objects_dir):
+    """The object directory followed by its alternates."""
+    directories = [objects_dir]
+    try:
+        with open(os.path.join(objects_dir, 'info', 'alternates')) as file:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    directories.append(os.path.normpath(os.path.join(objects_dir, line)))
+    except FileNotFoundError:
+        pass
+    return directories
+
+
+def _entry_header(data, offset):
+    """Parse the type and size of a pack entry, returning them with the position after the header."""
+    byte = data[offset]
+    kind = (byte >> 4) & 7
+    size = byte & 0x0f
+    shift = 4
+    offset += 1
+    while byte & 0x80:
+        byte = data[offset]
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        offset += 1
+    return kind, size, offset
+
+
+def _base_offset(data, offset, position):
+    """Decode the negative base offset of an OFS_DELTA entry."""
+    byte = data[position]
+    distance = byte & 0x7f
+    position += 1
+    while byte & 0x80:
+        byte = data[position]
+        distance = ((distance + 1) << 7) | (byte & 0x7f)
+        position += 1
+    return offset - distance, position
+
+
+def _inflate(data, position, size):
+    """Inflate the zlib stream starting at `position`, feeding it in chunks."""
+    decompressor = zlib.decompressobj()
+    parts = []
+    while not decompressor.eof:
+        chunk = data[position:position + READ_CHUNK_SIZE]
+        if not chunk:
+            raise ValueError("Truncated object data")
+        position += len(chunk)
+        parts.append(decompressor.decompress(chunk))
+    content = b''.join(parts)
+    if len(content) != size:
+        raise ValueError(f"Object size mismatch: expected {size}, got {len(content)}")
+    return content
+
+
+def _inflate_prefix(data, position, length):
+    """Inflate only the first `length` bytes of a zlib stream."""
+    decompressor = zlib.decompressobj()
+    output = b''
+    while len(output) < length and not decompressor.eof:
+        chunk = decompressor.unconsumed_tail
+        if not chunk:
+            chunk = data[position:position + 256]
+            if not chunk:
+                break
+            position += len(chunk)
+        output += decompressor.decompress(chunk, length - len(output))
+    return output
+
+
+def _read_size(data, position):
+    """Decode a little-endian base-128 size of a delta header."""
+    size = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, position
+
+
+def _apply_delta(base, delta):
+    """Rebuild an object from its delta base and a git delta of copy and insert instructions."""
+    base_size, position = _read_size(delta, 0)
+    target_size, position = _read_size(delta, position)
+    if base_size != len(base):
+        raise ValueError("Delta base size mismatch")
+    result = bytearray()
+    while position < len(delta):
+        opcode = delta[position]
+        position += 1
+        if opcode & 0x80:
+            offset = size = 0
+            for i in range(4):
+                if opcode & (1 << i):
+                    offset |= delta[position] << (8 * i)
+                    position += 1
+            for i in range(3):
+                if opcode & (0x10 << i):
+                    size |= delta[position] << (8 * i)
+                    position += 1
+            result += base[offset:offset + (size or 0x10000)]
+        elif opcode:
+            result += delta[position:position + opcode]
+            position += opcode
+        else:
+            raise ValueError("Invalid delta instruction")
+    if len(result) != target_size:
+        raise ValueError("Delta result size mismatch")
+    return bytes(result)
+
+
+def _parse_tree(content):
+    """Parse a tree object into {name: (type, sha, mode)}, the listing format of walk_tree_diff."""
+    entries = {}
+    position = 0
+    while position < len(content):
+        space = content.index(b' ', position)
+        end = content.index(b'\0', space)
+        mode = content[position:space].decode()
+        name = content[space + 1:end].decode('utf-8', 'surrogateescape')
+        kind = TREE if mode == '40000' else 'commit' if mode == '160000' else 'blob'
+        entries[name] = (kind, content[end + 1:end + 21].hex(), sys.intern(mode.zfill(6)))
+        position = end + 21
+    return entries
+
+
+def _read_header_field(content, field):
+    """Return the SHA of a `tree` or `object` header line of a commit or tag."""
+    for line in content.split(b'\n'):
+        if not line:
+            break
+        name, _, value = line.partition(b' ')
+        if name == field:
+            return value.decode()
+    return None
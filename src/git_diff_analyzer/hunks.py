@@ -0,0 +1,109 @@
+import re
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+\d+(?:,\d+)? @@')
+_DIFF_HEADER = 'diff --git '
+# Extended header lines naming the new path of a renamed or copied file
+_NEW_PATH_HEADERS = ('rename to ', 'copy to ')
+
+
+def parse_hunk_ranges(patch):
+    """
+    Return the line ranges of the base file touched by a unified diff, as sorted
+    inclusive (start, end) pairs. Context lines are not counted, and an insertion
+    after line n is recorded as (n, n), so it is adjacent to edits of lines n and n + 1.
+    """
+    parser = _HunkParser()
+    for line in patch.splitlines():
+        parser.feed(line)
+    return parser.ranges()
+
+
+def iter_diff_hunk_ranges(lines):
+    """
+    Parse a multi-file `git diff` output line by line and yield (path, ranges) for every file.
+    Renamed and copied files are yielded under their new path, with ranges of their old
+    version. Ranges are None for binary files, which have no hunks.
+    """
+    path = None
+    parser = None
+    binary = False
+    for line in lines:
+        line = line.rstrip('\n')
+        if line.startswith(_DIFF_HEADER):
+            if path is not None:
+                yield path, None if binary else parser.ranges()
+            path = _parse_diff_header_path(line)
+            parser = _HunkParser()
+            binary = False
+        elif parser is None:
+            continue
+        elif line.startswith('Binary files ') and not parser.in_hunk:
+            binary = True
+        elif line.startswith(_NEW_PATH_HEADERS) and not parser.in_hunk:
+            name = line.split(' to ', 1)[1]
+            path = _unquote(name) if name.startswith('"') else name
+        else:
+            parser.feed(line)
+    if path is not None:
+        yield path, None if binary else parser.ranges()
+
+
+def _parse_diff_header_path(line):
+    """
+    Extract the path from `diff --git a/<path> b/<path>`, where both paths are equal.
+    Renames and copies name their paths again in the extended header lines.
+    """
+    names = line[len(_DIFF_HEADER):]
+    if names.startswith('"'):
+        # Quoted names: "a/<path>" "b/<path>"
+        first = names[:names.index('" "') + 1] if '" "' in names else names
+        return _unquote(first)[2:]
+    # Both halves have the same length: "a/" + path + " b/" + path
+    return names[2:(len(names) - 1) // 2]
+
+
+def _unquote(name):
+    """Undo git's C-style quoting of a path."""
+    raw = name[1:-1].encode('latin-1', 'backslashreplace').decode('unicode_escape')
+    return raw.encode('latin-1').decode('utf-8', 'surrogateescape')
+
+
+class _HunkParser:
+    """Collect the base-file lines changed by the hunks of a single file."""
+
+    def __init__(self):
+        self.in_hunk = False
+        self._old_line = 0
+        self._ranges = []
+
+    def feed(self, line):
+        match = _HUNK_HEADER.match(line)
+        if match is not None:
+            self.in_hunk = True
+            start = int(match.group(1))
+            # With zero old lines the start is the line the insertion follows
+            self._old_line = start + 1 if match.group(2) == '0' else start
+            return
+        if not self.in_hunk:
+            return
+        marker = line[0] if line else ' '
+        if marker == ' ':
+            self._old_line += 1
+        elif marker == '-':
+            self._add(self._old_line, self._old_line)
+            self._old_line += 1
+        elif marker == '+':
+            self._add(self._old_line - 1, self._old_line - 1)
+        elif marker != '\\':
+            # Any other line ends the hunks of this file
+            self.in_hunk = False
+
+    def _add(self, start, end):
+        if self._ranges and start <= self._ranges[-1][1] + 1:
+            last_start, last_end = self._ranges[-1]
+            self._ranges[-1] = (min(last_start, start), max(last_end, end))
+        else:
+            self._ranges.append((start, end))
+
+    def ranges(self):
+        return list(self._ranges)
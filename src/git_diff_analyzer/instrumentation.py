@@ -0,0 +1,153 @@
+import bisect
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+PHASE = 'phase'
+SUBPROCESS = 'subprocess'
+PIPE = 'pipe'
+HTTP = 'http'
+
+# Upper bounds of the latency histogram buckets in milliseconds, the last bucket is unbounded
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+_collectors = []
+_hooks = []
+_lock = threading.Lock()
+_enabled = False
+# Attributes set on spans while instrumentation is disabled are written here and never read
+_DISCARDED = {}
+
+
+class Span(NamedTuple):
+    name: str
+    kind: str
+    start: float
+    duration: float
+    attributes: Dict[str, Any]
+
+
+class Stats:
+    """
+    Aggregated spans of everything run while collecting: total time per phase,
+    counts per span name, latency histograms and bytes transferred per kind.
+    """
+
+    def __init__(self):
+        self.phases = defaultdict(float)
+        self.counts = Counter()
+        self.latencies = {}
+        self.bytes = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        with self._lock:
+            self.counts[span.name] += 1
+            if span.kind == PHASE:
+                self.phases[span.name] += span.duration
+            else:
+                histogram = self.latencies.setdefault(span.kind, [0] * (len(LATENCY_BUCKETS_MS) + 1))
+                histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, span.duration * 1000)] += 1
+            size = span.attributes.get('bytes')
+            if size:
+                self.bytes[span.kind] += size
+
+    def to_dict(self):
+        """Return the stats as plain JSON-serializable data."""
+        with self._lock:
+            bounds = [str(bound) for bound in LATENCY_BUCKETS_MS] + ['inf']
+            return {
+                "phases": dict(self.phases),
+                "counts": dict(self.counts),
+                "latency_ms": {kind: dict(zip(bounds, histogram))
+                               for kind, histogram in self.latencies.items()},
+                "bytes": dict(self.bytes),
+            }
+
+
+@contextmanager
+def collect_stats():
+    """Collect the spans of all threads into a Stats object until the block exits."""
+    stats = Stats()
+    with _lock:
+        _collectors.append(stats)
+        _update_enabled()
+    try:
+        yield stats
+    finally:
+        with _lock:
+            _collectors.remove(stats)
+            _update_enabled()
+
+
+def add_span_hook(hook):
+    """
+    Call `hook(span)` with every finished Span, e.g. to export them as OpenTelemetry spans.
+    Span start times come from time.time() and durations are in seconds.
+    """
+    with _lock:
+        _hooks.append(hook)
+        _update_enabled()
+
+
+def remove_span_hook(hook):
+    with _lock:
+        _hooks.remove(hook)
+        _update_enabled()
+
+
+def _update_enabled():
+    global _enabled
+    _enabled = bool(_collectors or _hooks)
+
+
+def span(name, kind=PHASE, **attributes):
+    """
+    Time a block as a span. The block receives the attributes dict and may add to it,
+    e.g. `bytes`. Without collectors or hooks this returns a shared no-op context manager.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _timed_span(name, kind, attributes)
+
+
+@contextmanager
+def _timed_span(name, kind, attributes):
+    start = time.time()
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes['error'] = type(e).__name__
+        raise
+    finally:
+        _finish(Span(name, kind, start, time.perf_counter() - started, attributes))
+
+
+def _finish(finished):
+    with _lock:
+        collectors = list(_collectors)
+        hooks = list(_hooks)
+    for stats in collectors:
+        stats.record(finished)
+    for hook in hooks:
+        try:
+            hook(finished)
+        except Exception:
+            logger.warning("Span hook %r failed", hook, exc_info=True)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return _DISCARDED
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
@@ -0,0 +1,91 @@
+import sys
+from typing import List, NamedTuple, Optional, Tuple
+
+ADDED = 'added'
+MODIFIED = 'modified'
+DELETED = 'deleted'
+RENAMED = 'renamed'
+COPIED = 'copied'
+
+NULL_SHA = '0' * 40
+
+
+class ChangedFile(NamedTuple):
+    """
+    A file changed between two commits, described by its blob SHAs and modes.
+    Paths are interned where entries are created, so every entry and lookup table
+    for the same path shares one string object.
+    Renamed and copied files keep the path they came from in `old_path`.
+    """
+    path: str
+    status: str
+    old_sha: Optional[str] = None
+    new_sha: Optional[str] = None
+    old_mode: Optional[str] = None
+    new_mode: Optional[str] = None
+    old_path: Optional[str] = None
+
+    @property
+    def base_path(self):
+        """
+        The path the file had at the base commit, which identifies it on both sides.
+        A copy leaves its source in place, so it is identified by its own path.
+        """
+        return self.old_path if self.status == RENAMED else self.path
+
+    @classmethod
+    def from_row(cls, row):
+        """Rebuild an entry stored as a plain list, e.g. in the result cache."""
+        entry = cls(sys.intern(row[0]), *row[1:])
+        if entry.old_path is not None:
+            entry = entry._replace(old_path=sys.intern(entry.old_path))
+        return entry
+
+
+class BlobInfo(NamedTuple):
+    """The blob SHA and size of a file, either of which a remote may not report."""
+    sha: Optional[str]
+    size: Optional[int]
+
+
+class Overlap(NamedTuple):
+    """
+    A file changed on both the local and the remote side since the merge base.
+    Files are matched by their path at the merge base, so a file renamed on one side and
+    edited on the other is one overlap; `path` is its path on the local side.
+    """
+    path: str
+    local: ChangedFile
+    remote: ChangedFile
+
+    @property
+    def identical(self):
+        """True if both sides ended up with the same blob at the same path, so the change cannot conflict."""
+        if self.local.status == DELETED or self.remote.status == DELETED:
+            return self.local.status == self.remote.status
+        return (self.local.new_sha is not None and self.local.new_sha == self.remote.new_sha
+                and self.local.path == self.remote.path)
+
+    def to_dict(self):
+        """Return a JSON-serializable record of the overlap."""
+        local = {"status": self.local.status, "old_sha": self.local.old_sha,
+                 "new_sha": self.local.new_sha}
+        remote = {"status": self.remote.status, "new_sha": self.remote.new_sha}
+        for side, entry in ((local, self.local), (remote, self.remote)):
+            if entry.path != self.path:
+                side["path"] = entry.path
+            if entry.old_path is not None:
+                side["old_path"] = entry.old_path
+        return {"path": self.path, "identical": self.identical, "local": local, "remote": remote}
+
+
+class HunkConflict(NamedTuple):
+    """
+    A file whose local and remote edits touch overlapping or adjacent lines of the merge base version.
+    Ranges are inclusive (start, end) line pairs; they are None when the file is compared as a whole,
+    e.g. binary files or files added or deleted on one side.
+    """
+    path: str
+    local_ranges: Optional[List[Tuple[int, int]]]
+    remote_ranges: Optional[List[Tuple[int, int]]]
+    overlapping_ranges: Optional[List[Tuple[Tuple[int, int], Tuple[int, int]]]]
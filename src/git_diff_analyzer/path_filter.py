@@ -0,0 +1,140 @@
+import re
+
+# Paths skipped with skip_generated: vendored trees, lock files, generated sources and binaries.
+# Binaries are recognized by their extension only, since filters are applied to paths before
+# any content is read; other binary files are compared like text files.
+GENERATED_PATTERNS = (
+    '**/vendor/**', '**/third_party/**', '**/node_modules/**',
+    '**/package-lock.json', '**/yarn.lock', '**/pnpm-lock.yaml', '**/poetry.lock',
+    '**/Cargo.lock', '**/go.sum', '**/composer.lock', '**/Gemfile.lock',
+    '**/*.min.js', '**/*.min.css', '**/*.map', '**/*_pb2.py', '**/*.pb.go', '**/*.generated.*',
+    '**/*.png', '**/*.jpg', '**/*.jpeg', '**/*.gif', '**/*.ico', '**/*.pdf', '**/*.zip',
+    '**/*.gz', '**/*.tar', '**/*.jar', '**/*.so', '**/*.dylib', '**/*.dll', '**/*.exe',
+    '**/*.woff', '**/*.woff2', '**/*.ttf', '**/*.eot', '**/*.mp3', '**/*.mp4', '**/*.bin',
+)
+_WILDCARDS = re.compile(r'[*?\[]')
+_GLOB = ':(glob)'
+_GLOB_EXCLUDE = ':(glob,exclude)'
+
+
+class PathFilter:
+    """
+    Select paths with include and exclude patterns in git's glob pathspec syntax: `*` and `?`
+    stay within a directory, `**` spans directories, and, as in git, only a pattern without
+    wildcards matches everything below the directory it names. A path is selected if it matches any include pattern
+    (or there are none) and no exclude pattern.
+    The same patterns are handed to git as `:(glob)` pathspecs.
+    """
+
+    def __init__(self, include=None, exclude=None, skip_generated=False):
+        self.include = tuple(include or ())
+        self.exclude = tuple(exclude or ()) + (GENERATED_PATTERNS if skip_generated else ())
+        self._include = [_compile(pattern) for pattern in self.include]
+        self._exclude = [_compile(pattern) for pattern in self.exclude]
+        # Directories that must be entered to reach any include pattern
+        self._include_prefixes = [_literal_prefix(pattern) for pattern in self.include]
+
+    def __call__(self, path):
+        if self._include and not any(regex.match(path) for regex in self._include):
+            return False
+        return not any(regex.match(path) for regex in self._exclude)
+
+    def may_contain(self, directory):
+        """Return False if no path below `directory` can be selected, so it need not be listed."""
+        # Like git, an exclude pattern only prunes a directory if it matches everything below it
+        if any(regex.match(directory + '/') for regex in self._exclude):
+            return False
+        if not self._include:
+            return True
+        directory += '/'
+        return any(directory.startswith(prefix) or prefix.startswith(directory)
+                   for prefix in self._include_prefixes)
+
+    def pathspecs(self):
+        """Return the patterns as git pathspecs, to be passed after `--`."""
+        pathspecs = [_GLOB + pattern for pattern in self.include]
+        pathspecs += [_GLOB_EXCLUDE + pattern for pattern in self.exclude]
+        return pathspecs
+
+    def key(self):
+        """A stable description of the filter for cache keys."""
+        return self.pathspecs()
+
+    @classmethod
+    def from_pathspecs(cls, pathspecs):
+        """Rebuild a filter from the pathspecs made by pathspecs()."""
+        include, exclude = [], []
+        for pathspec in pathspecs:
+            if pathspec.startswith(_GLOB):
+                include.append(pathspec[len(_GLOB):])
+            elif pathspec.startswith(_GLOB_EXCLUDE):
+                exclude.append(pathspec[len(_GLOB_EXCLUDE):])
+            else:
+                raise ValueError(f"Unsupported pathspec: {pathspec}")
+        return cls(include, exclude)
+
+
+def make_path_filter(include=None, exclude=None, skip_generated=False):
+    """Build a PathFilter, or return None if nothing would be filtered."""
+    if not include and not exclude and not skip_generated:
+        return None
+    return PathFilter(include, exclude, skip_generated)
+
+
+def _compile(pattern):
+    """
+    Translate a glob pathspec into a regex. A pattern without wildcards also matches the paths
+    below the directory it names, while wildcard patterns must match the whole path.
+    """
+    pattern = pattern.strip('/')
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and _class_end(pattern, i) != -1:
+            end = _class_end(pattern, i)
+            start = i + 1
+            negated = pattern[start] in '!^'
+            if negated:
+                start += 1
+            body = re.sub(r'([\\\[\]])', r'\\\1', pattern[start:end])
+            # Like git, a negated class never matches the directory separator
+            regex.append('[^/' + body + ']' if negated else '[' + body + ']')
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    suffix = '(?:/.*)?$' if _WILDCARDS.search(pattern) is None else '$'
+    return re.compile(''.join(regex) + suffix)
+
+
+def _class_end(pattern, start):
+    """Return the index of the `]` closing the bracket expression at `start`, or -1 if it is not closed."""
+    i = start + 1
+    if pattern[i:i + 1] in ('!', '^'):
+        i += 1
+    # A `]` right after the opening bracket is part of the class
+    if pattern[i:i + 1] == ']':
+        i += 1
+    return pattern.find(']', i)
+
+
+def _literal_prefix(pattern):
+    """Return the directories of a pattern before its first wildcard, ending with '/'."""
+    pattern = pattern.strip('/')
+    match = _WILDCARDS.search(pattern)
+    literal = pattern if match is None else pattern[:match.start()]
+    if match is None:
+        return literal + '/'
+    return literal[:literal.rfind('/') + 1]
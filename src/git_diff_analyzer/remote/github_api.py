@@ -1,32 +1,62 @@
+import hashlib
 import logging
-import requests
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from git_diff_analyzer.cache import get_cache, is_commit_sha
+from git_diff_analyzer.models import ADDED, COPIED, DELETED, MODIFIED, RENAMED, BlobInfo, ChangedFile
+from git_diff_analyzer.remote.http_session import DEFAULT_POOL_SIZE, get_session
 from git_diff_analyzer.remote.remote_interface import RemoteInterface
+from git_diff_analyzer.remote.request_scheduler import get_scheduler
+from git_diff_analyzer.remote.tree_diff import walk_tree_diff
 
 logger = logging.getLogger(__name__)
 
+GITHUB_API_URL = "https://api.github.com"
+# GitHub lists at most this many files for a whole comparison
+COMPARE_FILES_LIMIT = 300
+COMMITS_PAGE_SIZE = 100
+# Bytes read at a time when file contents are streamed
+BLOB_CHUNK_SIZE = 1 << 20
+RAW_MEDIA_TYPE = "application/vnd.github.raw"
+# Cache namespace of changed entries, versioned since entries carry renames and copies
+REMOTE_CHANGES = 'remote-changes/2'
+
 
 class GithubAPI(RemoteInterface):
-    def __init__(self, owner, repo, access_token):
+    def __init__(self, owner, repo, access_token, pool_size=DEFAULT_POOL_SIZE, max_workers=None,
+                 scheduler=None, api_url=GITHUB_API_URL, deadline=None):
         """
         Initialize the GitHubAPI object with the
         repository owner, name, and personal access token.
+        Requests go through a shared keep-alive session with `pool_size` connections,
+        and independent requests run concurrently on up to `max_workers` threads.
+        The `scheduler` (by default the one shared by the token) handles rate limits and ETags.
+        `api_url` points to a GitHub Enterprise or other GitHub-compatible server.
+        With a `deadline` (a time.monotonic() value) each request times out with the time left.
         """
         self.owner = owner
         self.repo = repo
         self.access_token = access_token
-        self.base_url = f"https://api.github.com/repos/{owner}/{repo}"
+        self.base_url = f"{api_url.rstrip('/')}/repos/{owner}/{repo}"
+        self.session = get_session(pool_size)
+        self.scheduler = scheduler or get_scheduler(access_token)
+        self.deadline = deadline
+        self.max_workers = max_workers or pool_size
+        self._executor = None
+        self._executor_lock = threading.Lock()
         self.__check_connection()
 
-    def _make_request(self, method, endpoint, params=None):
+    def _make_request(self, method, endpoint, params=None, accept=None, stream=False):
         """Helper function to make API requests and handle errors."""
         url = self.base_url if not endpoint else f"{self.base_url}/{endpoint}"
         headers = {"Authorization": f"token {self.access_token}"}
-        if params is None:
-            response = requests.request(method, url, headers=headers)
-        else:
-            response = requests.request(
-                method, url, headers=headers, params=params)
+        if accept is not None:
+            headers["Accept"] = accept
+        response = self.scheduler.send(
+            self.session, method, url, headers=headers, params=params, stream=stream,
+            deadline=self.deadline)
 
         if response.status_code == 200:
             return response
@@ -43,6 +73,29 @@ class GithubAPI(RemoteInterface):
                 "Failed to connect to the GitHub repository", exc_info=True)
             raise
 
+    def _submit(self, func, *args):
+        """Schedule a call on the remote's thread pool."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="github-api")
+            return self._executor.submit(func, *args)
+
+    def run_concurrently(self, calls):
+        """
+        Run independent (func, *args) calls on the thread pool and return their results in order.
+        Must not be called from a pool thread.
+        """
+        futures = [self._submit(*call) for call in calls]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Shut down the thread pool. The shared session stays open for other remotes."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
     def get_latest_commit(self, branch):
         try:
             response = self._make_request("GET", f"branches/{branch}")
@@ -50,18 +103,134 @@ class GithubAPI(RemoteInterface):
         except ValueError:
             raise ValueError("Failed to fetch the latest commit from GitHub.")
 
-    def get_changed_files(self, base_commit_hash, commit_hash):
+    def get_latest_commits(self, branches):
+        """Fetch the latest commit of several branches concurrently."""
+        commits = self.run_concurrently(
+            [(self.get_latest_commit, branch) for branch in branches])
+        return dict(zip(branches, commits))
+
+    def get_merge_base(self, commit_a, commit_b):
+        """Get the merge base of two commits from the compare endpoint; both must exist on GitHub."""
         try:
             response = self._make_request(
-                "GET", f"compare/{base_commit_hash}...{commit_hash}")
-            changed_files = response.json().get("files", [])
-            return [file["filename"] for file in changed_files]
+                "GET", f"compare/{commit_a}...{commit_b}", {"per_page": 1})
+            return response.json()["merge_base_commit"]["sha"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Failed to fetch the merge base from GitHub.")
+
+    def iter_commit_parents(self, commit_hash):
+        """Yield (sha, parents) of the history of a commit, one page of commits per request."""
+        page = 1
+        while True:
+            response = self._make_request(
+                "GET", "commits", {"sha": commit_hash, "per_page": COMMITS_PAGE_SIZE, "page": page})
+            commits = response.json()
+            for commit in commits:
+                yield commit["sha"], [parent["sha"] for parent in commit["parents"]]
+            if not commits or not response.links.get("next"):
+                return
+            page += 1
+
+    def get_changed_files(self, base_commit_hash, commit_hash):
+        return [entry.path for entry in self.iter_changed_entries(base_commit_hash, commit_hash)]
+
+    def get_changed_entries(self, base_commit_hash, commit_hash):
+        """
+        Get changed files between two commits from the compare metadata alone.
+        Renames and copies keep the `previous_filename` GitHub reports as their old path.
+        """
+        return list(self.iter_changed_entries(base_commit_hash, commit_hash))
+
+    def iter_changed_entries(self, base_commit_hash, commit_hash, path_filter=None):
+        """
+        Yield changed files from the compare metadata.
+        Falls back to diffing the git trees when the compare file list is truncated.
+        Files not selected by `path_filter` are dropped as each page arrives.
+        Comparisons of two commit SHAs are stored in the result cache once fully read.
+        """
+        cache = get_cache()
+        if cache is None or not (is_commit_sha(base_commit_hash) and is_commit_sha(commit_hash)):
+            yield from (entry for entry, _ in self._iter_compare(base_commit_hash, commit_hash, path_filter))
+            return
+
+        key = [self.base_url, base_commit_hash, commit_hash, *(path_filter.key() if path_filter else ())]
+        cached = cache.get(REMOTE_CHANGES, key)
+        if cached is not None:
+            yield from (ChangedFile.from_row(entry) for entry in cached)
+            return
+        entries = []
+        for entry, _ in self._iter_compare(base_commit_hash, commit_hash, path_filter):
+            entries.append(entry)
+            yield entry
+        cache.set(REMOTE_CHANGES, key, [list(entry) for entry in entries])
+
+    def iter_changed_patches(self, base_commit_hash, commit_hash, path_filter=None):
+        """
+        Yield (entry, patch) pairs with the unified diff GitHub includes per file.
+        The patch is None for binary or very large files and for files beyond the
+        compare listing limit.
+        """
+        return self._iter_compare(base_commit_hash, commit_hash, path_filter)
+
+    def _iter_compare(self, base_commit_hash, commit_hash, path_filter=None):
+        """
+        Yield (entry, patch) pairs of a comparison. GitHub lists the files of a comparison
+        only on its first page, up to COMPARE_FILES_LIMIT of them, and pages through its
+        commits alone, so a single request with the smallest page of commits is made.
+        """
+        emitted = set()
+        try:
+            files = self._get_compare_files(base_commit_hash, commit_hash)
+            for file in files:
+                entry = _to_changed_file(file)
+                if entry is None or (path_filter is not None and not path_filter(entry.path)):
+                    continue
+                emitted.add(entry.base_path)
+                emitted.add(entry.path)
+                yield entry, _get_patch(file)
+
+            if len(files) >= COMPARE_FILES_LIMIT:
+                logger.info("Compare file list truncated at %d files, diffing trees instead",
+                            len(files))
+                for entry in self._iter_tree_diff(base_commit_hash, commit_hash, path_filter):
+                    if entry.path not in emitted and entry.base_path not in emitted:
+                        yield entry, None
         except ValueError as e:
             logger.error("Failed to fetch changed files: %s", e)
             raise ValueError(
                 "Failed to fetch changed files.")
 
+    def _get_compare_files(self, base_commit_hash, commit_hash):
+        """Fetch the files of a comparison, which only come with its first page."""
+        response = self._make_request(
+            "GET", f"compare/{base_commit_hash}...{commit_hash}", {"per_page": 1})
+        return response.json().get("files", [])
+
+    def _iter_tree_diff(self, base_commit_hash, commit_hash, path_filter=None):
+        """Yield changed files by walking the git trees of both commits."""
+        base_tree = self._make_request(
+            "GET", f"git/commits/{base_commit_hash}").json()["tree"]["sha"]
+        tree = self._make_request(
+            "GET", f"git/commits/{commit_hash}").json()["tree"]["sha"]
+        return walk_tree_diff(base_tree, tree, self._list_trees, path_filter)
+
+    def _list_trees(self, tree_shas):
+        """List the entries of several git trees concurrently."""
+        tree_shas = list(tree_shas)
+        listings = self.run_concurrently([(self._list_tree, sha) for sha in tree_shas])
+        return dict(zip(tree_shas, listings))
+
+    def _list_tree(self, tree_sha):
+        """List the entries of a git tree as {name: (type, sha, mode)}."""
+        response = self._make_request("GET", f"git/trees/{tree_sha}")
+        return {entry["path"]: (entry["type"], entry["sha"], entry["mode"])
+                for entry in response.json().get("tree", [])}
+
     def get_file_content(self, commit_sha, file_path):
+        """
+        Get the base64 content of a file. GitHub leaves it empty for files over 1 MB,
+        use iter_file_chunks to read files of any size.
+        """
         try:
             params = {"ref": commit_sha}
             response = self._make_request(
@@ -72,11 +241,85 @@ class GithubAPI(RemoteInterface):
             raise FileNotFoundError(
                 f"File '{file_path}' not found in commit {commit_sha}.")
 
+    def get_file_info(self, commit_sha, file_path):
+        """Get the blob SHA and size of a file from the contents metadata, whatever the file size."""
+        try:
+            response = self._make_request("GET", f"contents/{file_path}", {"ref": commit_sha})
+            data = response.json()
+        except ValueError:
+            raise FileNotFoundError(
+                f"File '{file_path}' not found in commit {commit_sha}.")
+        if not isinstance(data, dict):
+            raise FileNotFoundError(f"'{file_path}' is a directory in commit {commit_sha}.")
+        return BlobInfo(data.get("sha"), data.get("size"))
+
+    def iter_blob_chunks(self, blob_sha, chunk_size=BLOB_CHUNK_SIZE):
+        """Stream the raw content of a blob from the git blobs API."""
+        return self._iter_raw(f"git/blobs/{blob_sha}", None, chunk_size)
+
+    def iter_file_chunks(self, commit_sha, file_path, chunk_size=BLOB_CHUNK_SIZE):
+        """Stream the raw content of a file at a commit from the contents API."""
+        return self._iter_raw(f"contents/{file_path}", {"ref": commit_sha}, chunk_size)
+
+    def _iter_raw(self, endpoint, params, chunk_size):
+        response = self._make_request("GET", endpoint, params, accept=RAW_MEDIA_TYPE, stream=True)
+        try:
+            yield from response.iter_content(chunk_size)
+        finally:
+            response.close()
+
     def is_diff(self, commit_a, file_a, commit_b, file_b):
+        """
+        Compare two files by size and blob SHA first. Contents are only read when a SHA
+        is missing, streamed in chunks and hashed incrementally so memory stays constant.
+        """
         try:
-            content_a = self.get_file_content(commit_a, file_a)
-            content_b = self.get_file_content(commit_b, file_b)
-            return content_a != content_b
+            info_a, info_b = self.run_concurrently([
+                (self.get_file_info, commit_a, file_a),
+                (self.get_file_info, commit_b, file_b),
+            ])
+            if info_a.size is not None and info_b.size is not None and info_a.size != info_b.size:
+                return True
+            if info_a.sha is not None and info_b.sha is not None:
+                return info_a.sha != info_b.sha
+            digest_a, digest_b = self.run_concurrently([
+                (self._hash_content, commit_a, file_a, info_a),
+                (self._hash_content, commit_b, file_b, info_b),
+            ])
+            return digest_a != digest_b
         except ValueError as e:
             logger.error("Error in checking diff remote: %s", e)
             return False
+
+    def _hash_content(self, commit_sha, file_path, info):
+        chunks = self.iter_blob_chunks(info.sha) if info.sha is not None else \
+            self.iter_file_chunks(commit_sha, file_path)
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+def _to_changed_file(file):
+    """Convert a file record of the compare response into a ChangedFile, or None if its blob did not change."""
+    status = file.get("status")
+    path = sys.intern(file["filename"])
+    sha = file.get("sha")
+    if status == "added":
+        return ChangedFile(path, ADDED, None, sha)
+    if status == "removed":
+        return ChangedFile(path, DELETED)
+    if status == "renamed" or status == "copied":
+        return ChangedFile(path, RENAMED if status == "renamed" else COPIED, None, sha,
+                           old_path=sys.intern(file["previous_filename"]))
+    if status == "unchanged" or (status == "changed" and file.get("changes") == 0):
+        # Only the mode changed, the blob is the same
+        return None
+    return ChangedFile(path, MODIFIED, None, sha)
+
+
+def _get_patch(file):
+    """Return the patch of a compare file record; a rename without changes touches no lines."""
+    if file.get("status") == "renamed" and file.get("changes") == 0:
+        return file.get("patch", "")
+    return file.get("patch")
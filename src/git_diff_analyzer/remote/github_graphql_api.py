@@ -0,0 +1,191 @@
+import logging
+
+from git_diff_analyzer.cache import get_cache, is_commit_sha
+from git_diff_analyzer.remote.http_session import DEFAULT_POOL_SIZE, get_session
+from git_diff_analyzer.remote.remote_interface import RemoteInterface
+from git_diff_analyzer.remote.request_scheduler import get_scheduler
+from git_diff_analyzer.remote.tree_diff import walk_tree_diff
+
+logger = logging.getLogger(__name__)
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+# Number of aliased objects requested in one query
+BATCH_SIZE = 100
+HISTORY_PAGE_SIZE = 100
+
+
+class GithubGraphQLAPI(RemoteInterface):
+    def __init__(self, owner, repo, access_token, pool_size=DEFAULT_POOL_SIZE, max_workers=None,
+                 scheduler=None, deadline=None):
+        """
+        Initialize the GitHub GraphQL client with the
+        repository owner, name, and personal access token.
+        Lookups of many objects are batched into aliased queries, so `max_workers`
+        is only accepted for compatibility with the REST client options.
+        With a `deadline` (a time.monotonic() value) each query times out with the time left.
+        """
+        self.owner = owner
+        self.repo = repo
+        self.access_token = access_token
+        self.url = GRAPHQL_URL
+        self.session = get_session(pool_size)
+        self.scheduler = scheduler or get_scheduler(access_token)
+        self.deadline = deadline
+        self.__check_connection()
+
+    def _query(self, query, variables=None):
+        """Helper function to run a GraphQL query and handle errors."""
+        headers = {"Authorization": f"bearer {self.access_token}"}
+        response = self.scheduler.send(
+            self.session, "POST", self.url, headers=headers,
+            json={"query": query, "variables": variables or {}}, deadline=self.deadline)
+        if response.status_code != 200:
+            error_msg = response.json().get("message", "Unknown error")
+            raise ValueError(f"GitHub GraphQL request failed: {error_msg}")
+        data = response.json()
+        if data.get("errors"):
+            raise ValueError(f"GitHub GraphQL request failed: {data['errors'][0].get('message')}")
+        return data["data"]
+
+    def _query_repository(self, fields, variables):
+        """Run a query against the repository with extra String! variables."""
+        declarations = "".join(f", ${name}: String!" for name in variables)
+        query = (f"query($owner: String!, $name: String!{declarations}) "
+                 f"{{ repository(owner: $owner, name: $name) {{ {fields} }} }}")
+        data = self._query(query, {"owner": self.owner, "name": self.repo, **variables})
+        if data.get("repository") is None:
+            raise ValueError(f"Repository {self.owner}/{self.repo} not found")
+        return data["repository"]
+
+    def __check_connection(self):
+        """Check if the connection to GitHub is successful."""
+        try:
+            self._query_repository("id", {})
+        except ValueError:
+            logger.error(
+                "Failed to connect to the GitHub repository", exc_info=True)
+            raise
+
+    def get_latest_commit(self, branch):
+        return self.get_latest_commits([branch])[branch]
+
+    def get_latest_commits(self, branches):
+        """Fetch the latest commit of several branches in one query."""
+        try:
+            variables = {f"r{i}": f"refs/heads/{branch}" for i, branch in enumerate(branches)}
+            fields = " ".join(f"r{i}: ref(qualifiedName: $r{i}) {{ target {{ oid }} }}"
+                              for i in range(len(branches)))
+            repository = self._query_repository(fields, variables)
+            return {branch: repository[f"r{i}"]["target"]["oid"] for i, branch in enumerate(branches)}
+        except (ValueError, TypeError):
+            raise ValueError("Failed to fetch the latest commit from GitHub.")
+
+    def iter_commit_parents(self, commit_hash):
+        """Yield (sha, parents) of the history of a commit, one page of commits per query."""
+        variables = {"commit": commit_hash}
+        while True:
+            after = ", after: $cursor" if "cursor" in variables else ""
+            repository = self._query_repository(
+                f"object(expression: $commit) {{ ... on Commit {{ history(first: {HISTORY_PAGE_SIZE}{after}) {{ "
+                "pageInfo { hasNextPage endCursor } nodes { oid parents(first: 100) { nodes { oid } } } } } }",
+                variables)
+            if not repository.get("object"):
+                raise ValueError(f"Commit {commit_hash} not found")
+            history = repository["object"]["history"]
+            for node in history["nodes"]:
+                yield node["oid"], [parent["oid"] for parent in node["parents"]["nodes"]]
+            if not history["pageInfo"]["hasNextPage"]:
+                return
+            variables["cursor"] = history["pageInfo"]["endCursor"]
+
+    def get_blob_shas(self, lookups):
+        """
+        Get the blob SHAs of many (commit, path) pairs in batched queries.
+        Returns {(commit, path): sha}, where sha is None if the file does not exist.
+        """
+        cache = get_cache()
+        result = {}
+        missing = []
+        for commit, path in lookups:
+            cached = cache.get('blob-sha', [commit, path]) \
+                if cache is not None and is_commit_sha(commit) else None
+            if cached is not None:
+                result[(commit, path)] = cached[0]
+            else:
+                missing.append((commit, path))
+
+        for start in range(0, len(missing), BATCH_SIZE):
+            batch = missing[start:start + BATCH_SIZE]
+            variables = {f"e{i}": f"{commit}:{path}" for i, (commit, path) in enumerate(batch)}
+            fields = " ".join(f"e{i}: object(expression: $e{i}) {{ ... on Blob {{ oid }} }}"
+                              for i in range(len(batch)))
+            repository = self._query_repository(fields, variables)
+            for i, (commit, path) in enumerate(batch):
+                blob = repository.get(f"e{i}")
+                sha = blob.get("oid") if blob else None
+                result[(commit, path)] = sha
+                if cache is not None and is_commit_sha(commit):
+                    cache.set('blob-sha', [commit, path], [sha])
+        return result
+
+    def get_changed_files(self, base_commit_hash, commit_hash):
+        return [entry.path for entry in self.iter_changed_entries(base_commit_hash, commit_hash)]
+
+    def get_changed_entries(self, base_commit_hash, commit_hash):
+        return list(self.iter_changed_entries(base_commit_hash, commit_hash))
+
+    def iter_changed_entries(self, base_commit_hash, commit_hash, path_filter=None):
+        """
+        Yield changed files by diffing the git trees of both commits,
+        listing every changed tree of one level in a single query.
+        Directories `path_filter` cannot select from are not listed.
+        """
+        try:
+            fields = " ".join(
+                f"c{i}: object(expression: $c{i}) {{ ... on Commit {{ tree {{ oid }} }} }}"
+                for i in range(2))
+            repository = self._query_repository(
+                fields, {"c0": base_commit_hash, "c1": commit_hash})
+            base_tree = repository["c0"]["tree"]["oid"]
+            tree = repository["c1"]["tree"]["oid"]
+            yield from walk_tree_diff(base_tree, tree, self._list_trees, path_filter)
+        except (ValueError, TypeError) as e:
+            logger.error("Failed to fetch changed files: %s", e)
+            raise ValueError(
+                "Failed to fetch changed files.")
+
+    def _list_trees(self, tree_shas):
+        """List the entries of several git trees as {sha: {name: (type, sha, mode)}}."""
+        cache = get_cache()
+        listings = {}
+        missing = []
+        for sha in tree_shas:
+            cached = cache.get('tree', sha) if cache is not None else None
+            if cached is not None:
+                listings[sha] = {name: tuple(entry) for name, entry in cached.items()}
+            else:
+                missing.append(sha)
+
+        for start in range(0, len(missing), BATCH_SIZE):
+            batch = missing[start:start + BATCH_SIZE]
+            variables = {f"t{i}": sha for i, sha in enumerate(batch)}
+            fields = " ".join(
+                f"t{i}: object(expression: $t{i}) {{ ... on Tree {{ entries {{ name type oid mode }} }} }}"
+                for i in range(len(batch)))
+            repository = self._query_repository(fields, variables)
+            for i, sha in enumerate(batch):
+                listing = {entry["name"]: (entry["type"], entry["oid"], format(entry["mode"], "o"))
+                           for entry in repository[f"t{i}"]["entries"]}
+                listings[sha] = listing
+                if cache is not None:
+                    cache.set('tree', sha, listing)
+        return listings
+
+    def is_diff(self, commit_a, file_a, commit_b, file_b):
+        shas = self.get_blob_shas([(commit_a, file_a), (commit_b, file_b)])
+        sha_a, sha_b = shas[(commit_a, file_a)], shas[(commit_b, file_b)]
+        if sha_a is None or sha_b is None:
+            missing_file, commit = (file_a, commit_a) if sha_a is None else (file_b, commit_b)
+            raise FileNotFoundError(
+                f"File '{missing_file}' not found in commit {commit}.")
+        return sha_a != sha_b
@@ -0,0 +1,33 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Return a keep-alive session shared by every remote using the same pool size,
+    so connections are reused across requests and remote instances.
+    """
+    with _sessions_lock:
+        session = _sessions.get(pool_size)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[pool_size] = session
+        return session
+
+
+def close_sessions():
+    """Close all shared sessions and their pooled connections."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -12,11 +12,42 @@ class RemoteInterface:
         # Fetch the latest commit on the given branch
         pass
 
+    @abstractmethod
+    def get_latest_commits(self, branches):
+        # Fetch the latest commit of several branches, as {branch: sha}
+        pass
+
+    def get_merge_base(self, commit_a, commit_b):
+        # Get the merge base of two commits known to the remote, or None if the remote cannot
+        # compare commits
+        return None
+
+    @abstractmethod
+    def iter_commit_parents(self, commit_hash):
+        # Lazily yield (sha, [parent shas]) of the history of a commit, newest first
+        pass
+
     @abstractmethod
     def get_changed_files(self, base_commit_hash, commit_hash):
         # Get a list of changed files between two commits
         pass
 
+    @abstractmethod
+    def get_changed_entries(self, base_commit_hash, commit_hash):
+        # Get ChangedFile entries (status and blob SHA) between two commits
+        pass
+
+    @abstractmethod
+    def iter_changed_entries(self, base_commit_hash, commit_hash, path_filter=None):
+        # Yield ChangedFile entries between two commits as they are fetched, only for paths
+        # selected by the optional PathFilter
+        pass
+
+    def iter_changed_patches(self, base_commit_hash, commit_hash, path_filter=None):
+        # Yield (ChangedFile, unified diff or None) pairs; remotes without patches yield None
+        for entry in self.iter_changed_entries(base_commit_hash, commit_hash, path_filter):
+            yield entry, None
+
     @abstractmethod
     def is_diff(self, commit_a, file_ca, commit_b, file_cb):
         # Check if the file content in two commits is the same. Returns false if identical
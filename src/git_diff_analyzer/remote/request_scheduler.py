@@ -0,0 +1,276 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from git_diff_analyzer.instrumentation import HTTP, span
+
+logger = logging.getLogger(__name__)
+
+# Requests kept in hand for other clients of the same token
+DEFAULT_RESERVE = 50
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_MAX_ETAGS = 2048
+# Bytes of response bodies kept for ETag revalidation; a body over a quarter of it is not kept
+DEFAULT_MAX_ETAG_BYTES = 64 << 20
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+# GitHub asks to wait at least a minute after a secondary rate limit without Retry-After
+SECONDARY_RATE_LIMIT_WAIT = 60.0
+
+
+class RequestScheduler:
+    """
+    Send requests within the rate limit budget of one token.
+    Requests wait for the budget to reset once fewer than `reserve` calls remain,
+    throttled or failed requests are retried with jittered exponential backoff,
+    and GET responses are revalidated with their ETag, so unchanged resources
+    come back as 304s that do not count against the quota. Bodies kept for revalidation
+    are bounded by `max_etags` entries and `max_etag_bytes` bytes in total. A secondary
+    rate limit pauses every request of the token, not just the one that hit it.
+    """
+
+    def __init__(self, reserve=DEFAULT_RESERVE, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=1.0, max_backoff=60.0, max_etags=DEFAULT_MAX_ETAGS,
+                 max_etag_bytes=DEFAULT_MAX_ETAG_BYTES, sleep=time.sleep, clock=time.time):
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.max_etags = max_etags
+        self.max_etag_bytes = max_etag_bytes
+        self.remaining = None
+        self.reset_at = None
+        self.paused_until = None
+        self._sleep = sleep
+        self._clock = clock
+        self._budget_lock = threading.Lock()
+        self._etags = OrderedDict()
+        self._etag_bytes = 0
+        self._etags_lock = threading.Lock()
+
+    def send(self, session, method, url, headers=None, params=None, json=None, stream=False,
+             deadline=None):
+        """
+        Send a request through `session`, returning the final response.
+        With `stream` the body is left unread for the caller to consume in chunks,
+        and the response is not kept for ETag revalidation.
+        With a `deadline` (a time.monotonic() value) every attempt is sent with the time
+        left as its timeout, and TimeoutError is raised once it passes or as soon as a wait
+        for the rate limit would outlast it.
+        """
+        key = _request_key(url, params) if method == "GET" and not stream else None
+        response = None
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_budget(deadline)
+            request_headers = dict(headers or {})
+            cached = self._get_etag(key)
+            if cached is not None:
+                request_headers["If-None-Match"] = cached[0]
+
+            with span(_span_name(method, url), HTTP, attempt=attempt) as attributes:
+                try:
+                    response = session.request(
+                        method, url, headers=request_headers, params=params, json=json,
+                        stream=stream, timeout=_time_left(deadline))
+                except requests.Timeout as e:
+                    raise TimeoutError(f"Request to {url} timed out") from e
+                attributes['status'] = response.status_code
+                attributes['bytes'] = _response_size(response, stream)
+            self._update_budget(response)
+
+            if response.status_code == 304 and cached is not None:
+                return _cached_response(url, cached)
+            delay = self._retry_delay(response, attempt)
+            if delay is None:
+                break
+            if deadline is not None and delay >= _time_left(deadline):
+                raise TimeoutError(f"Request to {url} throttled past its deadline")
+            logger.warning("Request to %s throttled with status %d, retrying in %.1fs",
+                           url, response.status_code, delay)
+            self._sleep(delay)
+
+        etag = response.headers.get("ETag")
+        if key is not None and response.status_code == 200 and etag:
+            self._store_etag(key, etag, response)
+        return response
+
+    def _wait_for_budget(self, deadline=None):
+        """
+        Block until the budget allows another request. The lock is only held to read and
+        count the budget, so concurrent callers wait together and responses in flight
+        can still update it. Raises TimeoutError instead of waiting past `deadline`.
+        """
+        with self._budget_lock:
+            paused_until = self.paused_until
+        delay = paused_until - self._clock() if paused_until is not None else 0
+        if delay > 0:
+            if deadline is not None and delay >= _time_left(deadline):
+                raise TimeoutError("Secondary rate limit pause outlasts the request deadline")
+            logger.warning("Paused by a secondary rate limit, waiting %.1fs", delay)
+            self._sleep(delay)
+
+        with self._budget_lock:
+            if self.remaining is None or self.remaining > self.reserve or not self.reset_at:
+                if self.remaining is not None:
+                    # Count the request before its response arrives
+                    self.remaining -= 1
+                return
+            remaining, reset_at = self.remaining, self.reset_at
+        delay = reset_at - self._clock()
+        if delay > 0:
+            if deadline is not None and delay >= _time_left(deadline):
+                raise TimeoutError("Rate limit reset is past the request deadline")
+            logger.warning("Rate limit budget low (%d left), waiting %.1fs for reset", remaining, delay)
+            self._sleep(delay)
+        with self._budget_lock:
+            # The next response reports the budget of the new window
+            if self.reset_at == reset_at:
+                self.remaining = None
+
+    def _update_budget(self, response):
+        """Track the budget reported in the rate limit headers."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None:
+            return
+        with self._budget_lock:
+            self.remaining = int(remaining)
+            if reset is not None:
+                self.reset_at = float(reset)
+
+    def _retry_delay(self, response, attempt):
+        """Return how long to wait before retrying, or None if the response is final."""
+        status = response.status_code
+        retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+        exhausted = response.headers.get("X-RateLimit-Remaining") == "0"
+        secondary = status in (403, 429) and not exhausted and _is_secondary_rate_limit(response)
+        rate_limited = status == 403 and (retry_after is not None or exhausted or secondary)
+        if attempt >= self.max_retries or not (rate_limited or status in RETRYABLE_STATUS_CODES):
+            return None
+        if retry_after is not None:
+            delay = retry_after
+        elif exhausted and self.reset_at:
+            return max(self.reset_at - self._clock(), 0.0)
+        elif secondary:
+            delay = SECONDARY_RATE_LIMIT_WAIT * 2 ** attempt
+        else:
+            return random.uniform(0, min(self.max_backoff, self.backoff_base * 2 ** attempt))
+        if secondary:
+            with self._budget_lock:
+                self.paused_until = max(self.paused_until or 0.0, self._clock() + delay)
+        return delay
+
+    def _parse_retry_after(self, value):
+        """Return the seconds of a Retry-After header, given as seconds or as an HTTP date."""
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - self._clock(), 0.0)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring invalid Retry-After header %r", value)
+            return None
+
+    def _get_etag(self, key):
+        if key is None:
+            return None
+        with self._etags_lock:
+            cached = self._etags.get(key)
+            if cached is not None:
+                self._etags.move_to_end(key)
+            return cached
+
+    def _store_etag(self, key, etag, response):
+        # Only the parts needed to rebuild the response are kept, not its connection state
+        content = response.content
+        with self._etags_lock:
+            previous = self._etags.pop(key, None)
+            if previous is not None:
+                self._etag_bytes -= len(previous[1])
+            # A large body would push out many small ones, so it is fetched again instead
+            if len(content) > self.max_etag_bytes // 4:
+                return
+            self._etags[key] = (etag, content, dict(response.headers))
+            self._etag_bytes += len(content)
+            while len(self._etags) > self.max_etags or self._etag_bytes > self.max_etag_bytes:
+                _, evicted = self._etags.popitem(last=False)
+                self._etag_bytes -= len(evicted[1])
+
+
+def _is_secondary_rate_limit(response):
+    """Tell GitHub's secondary rate limits, which only say so in the message, from other errors."""
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and "secondary rate limit" in str(body.get("message", "")).lower()
+
+
+def _cached_response(url, cached):
+    """Rebuild the response of a revalidated request from its stored body and headers."""
+    _, content, headers = cached
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+def _time_left(deadline):
+    """Return the seconds left until a time.monotonic() deadline, or None without one."""
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("Request deadline exceeded")
+    return left
+
+
+def _request_key(url, params):
+    return url, tuple(sorted((params or {}).items()))
+
+
+def _span_name(method, url):
+    """Name a request by its endpoint, e.g. `GET compare` for /repos/<owner>/<repo>/compare/<range>."""
+    parts = urlsplit(url).path.strip('/').split('/')
+    if parts[0] == 'repos' and len(parts) > 3:
+        endpoint = '/'.join(parts[3:5]) if parts[3] == 'git' else parts[3]
+    elif parts[0] == 'repos':
+        endpoint = 'repository'
+    else:
+        endpoint = parts[-1]
+    return f"{method} {endpoint}"
+
+
+def _response_size(response, stream=False):
+    if stream:
+        # Reading the content would pull the whole body into memory
+        return int(response.headers.get('Content-Length') or 0)
+    content = getattr(response, 'content', None)
+    return len(content) if isinstance(content, (bytes, str)) else 0
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(access_token):
+    """Return the scheduler shared by every client using the same token."""
+    token_key = hashlib.sha256(access_token.encode()).hexdigest()
+    with _schedulers_lock:
+        scheduler = _schedulers.get(token_key)
+        if scheduler is None:
+            scheduler = _schedulers[token_key] = RequestScheduler()
+        return scheduler
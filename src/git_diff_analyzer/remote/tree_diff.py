@@ -0,0 +1,89 @@
+import sys
+
+from git_diff_analyzer.models import ADDED, DELETED, MODIFIED, RENAMED, ChangedFile
+
+TREE = 'tree'
+
+
+def walk_tree_diff(old_tree, new_tree, list_trees, path_filter=None):
+    """
+    Yield ChangedFile entries between two root trees, descending only into
+    subtrees whose SHA differs. `list_trees` receives a set of tree SHAs and
+    returns {tree_sha: {name: (type, sha, mode)}}, so one call per tree level
+    can be batched by the caller. With a `path_filter` only selected files are
+    yielded, and directories it cannot select from are not listed at all.
+    Modified files are yielded as they are found; additions and deletions are held
+    back until the walk ends, so that a deleted and an added blob with the same SHA
+    can be reported as one exact rename.
+    """
+    added_and_deleted = []
+    pending = [('', old_tree, new_tree)]
+    while pending:
+        listings = list_trees({sha for _, old, new in pending for sha in (old, new) if sha})
+        next_pending = []
+        for prefix, old, new in pending:
+            old_entries = listings[old] if old else {}
+            new_entries = listings[new] if new else {}
+            for name in sorted(old_entries.keys() | new_entries.keys()):
+                changes, subtree = _diff_entry(
+                    sys.intern(prefix + name), old_entries.get(name), new_entries.get(name))
+                if path_filter is not None:
+                    changes = [entry for entry in changes if path_filter(entry.path)]
+                    if subtree and not path_filter.may_contain(subtree[0][:-1]):
+                        subtree = None
+                for entry in changes:
+                    if entry.status == MODIFIED:
+                        yield entry
+                    else:
+                        added_and_deleted.append(entry)
+                if subtree:
+                    next_pending.append(subtree)
+        pending = next_pending
+    yield from pair_exact_renames(added_and_deleted)
+
+
+def pair_exact_renames(entries):
+    """
+    Replace a deletion and an addition of the same blob with a single rename,
+    the exact renames git finds by comparing SHAs before any content similarity.
+    """
+    deleted = {}
+    for entry in entries:
+        if entry.status == DELETED and entry.old_sha is not None:
+            deleted.setdefault(entry.old_sha, []).append(entry)
+    renamed_from = set()
+    renames = {}
+    for entry in entries:
+        sources = deleted.get(entry.new_sha) if entry.status == ADDED else None
+        if sources:
+            source = sources.pop(0)
+            renamed_from.add(source.path)
+            renames[entry.path] = ChangedFile(
+                entry.path, RENAMED, source.old_sha, entry.new_sha, source.old_mode, entry.new_mode,
+                source.path)
+    for entry in entries:
+        if entry.status == ADDED and entry.path in renames:
+            yield renames[entry.path]
+        elif not (entry.status == DELETED and entry.path in renamed_from):
+            yield entry
+
+
+def _diff_entry(path, old, new):
+    """Compare one tree entry on both sides, returning changed blobs and a subtree to descend into."""
+    if old is not None and new is not None and old[1] == new[1]:
+        return [], None
+    old_tree = old[1] if old is not None and old[0] == TREE else None
+    new_tree = new[1] if new is not None and new[0] == TREE else None
+    old_blob = old if old is not None and old_tree is None else None
+    new_blob = new if new is not None and new_tree is None else None
+
+    changes = []
+    if old_blob and new_blob:
+        changes.append(ChangedFile(path, MODIFIED, old_blob[1], new_blob[1], old_blob[2], new_blob[2]))
+    elif old_blob:
+        changes.append(ChangedFile(path, DELETED, old_blob[1], None, old_blob[2], None))
+    elif new_blob:
+        changes.append(ChangedFile(path, ADDED, None, new_blob[1], None, new_blob[2]))
+
+    subtree = (path + '/', old_tree, new_tree) if old_tree or new_tree else None
+    return changes, subtree
@@ -0,0 +1,377 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+from git_diff_analyzer.git_utils.commit_index import get_commit_index
+from git_diff_analyzer.git_utils.git_commands import (
+    get_blob_sha, get_changed_entries, get_local_last_commit, run_git_command)
+from git_diff_analyzer.models import ADDED, COPIED, DELETED, MODIFIED, RENAMED, ChangedFile, Overlap
+from git_diff_analyzer.path_filter import make_path_filter
+from git_diff_analyzer.remote.tree_diff import pair_exact_renames
+from git_diff_analyzer.services.diff_service import (
+    MERGE_BASE_LOCAL, compute_merge_base, connect_remote, get_pathspecs, index_changes,
+    iter_remote_changes)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_REMOTE_POLL_INTERVAL = 10.0
+
+
+class OverlapWatcher:
+    """
+    Keep the overlapping changes of a local and a remote branch up to date.
+    The remote session, its rate limit scheduler and the git object reader stay open between
+    updates. Local refs are watched through the modification times of their ref and reflog
+    files, and the remote head is polled with conditional requests. When only a head moved,
+    the changes between its previous and new commit are composed with the known changes
+    since the merge base, so only the paths touched by the move are looked at again.
+    Like find_overlapping_changes, changes are keyed by their path at the merge base, so a
+    file renamed on one side and edited on the other is one overlap. The local side is
+    diffed from the merge base again, a single git call that finds the same renames; on the
+    remote side a deletion and an addition of the same blob across moves become a rename.
+    """
+
+    def __init__(self, owner, repo, access_token, local_repo_path, branch_a, branch_b,
+                 provider='github', remote_options=None, merge_base_mode=MERGE_BASE_LOCAL,
+                 remote_poll_interval=DEFAULT_REMOTE_POLL_INTERVAL, clock=time.monotonic,
+                 include=None, exclude=None, skip_generated=False):
+        self.local_repo_path = local_repo_path
+        self.branch_a = branch_a
+        self.branch_b = branch_b
+        self.merge_base_mode = merge_base_mode
+        self.remote_poll_interval = remote_poll_interval
+        self.path_filter = make_path_filter(include, exclude, skip_generated)
+        self._pathspecs = get_pathspecs(self.path_filter)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.remote, self.remote_head = connect_remote(
+            provider, owner, repo, access_token, remote_options, branch_a)
+        # The last head the remote reported, which may not have been applied yet
+        self._latest_remote_head = self.remote_head
+        self._remote_checked_at = clock()
+        self._git_dir = run_git_command(['git', 'rev-parse', '--absolute-git-dir'], local_repo_path)
+        self._watched_refs = [f'refs/heads/{branch_b}']
+        if merge_base_mode == MERGE_BASE_LOCAL:
+            full_name = run_git_command(
+                ['git', 'rev-parse', '--symbolic-full-name', branch_a], local_repo_path)
+            if full_name:
+                self._watched_refs.append(full_name)
+        self._ref_signature = self._read_ref_signature()
+
+        self.local_head = get_local_last_commit(branch_b, local_repo_path)
+        self.base_commit = None
+        self.updated_at = None
+        self._local = {}
+        self._remote = {}
+        self._overlaps = {}
+        self._recompute()
+
+    def poll(self, force=False):
+        """
+        Check both heads and update the overlaps if one of them moved.
+        The remote is only asked every `remote_poll_interval` seconds unless `force` is set.
+        Returns True if the overlaps were updated.
+        """
+        with self._lock:
+            local_head, remote_head = self.local_head, self._latest_remote_head
+            signature = self._read_ref_signature()
+            if force or signature != self._ref_signature:
+                local_head = get_local_last_commit(self.branch_b, self.local_repo_path)
+            if force or self._clock() - self._remote_checked_at >= self.remote_poll_interval:
+                remote_head = self._latest_remote_head = self.remote.get_latest_commit(self.branch_a)
+                self._remote_checked_at = self._clock()
+            if local_head == self.local_head and remote_head == self.remote_head and not force:
+                self._ref_signature = signature
+                return False
+            self._update(local_head, remote_head)
+            # Only once the update succeeded, so a failed one is retried by the next poll
+            self._ref_signature = signature
+            return True
+
+    def snapshot(self):
+        """Return the current heads and overlaps as JSON-serializable data."""
+        with self._lock:
+            return {
+                "base": self.base_commit,
+                "local_head": self.local_head,
+                "remote_head": self.remote_head,
+                "updated_at": self.updated_at,
+                "overlaps": [overlap.to_dict()
+                             for overlap in sorted(self._overlaps.values(), key=lambda overlap: overlap.path)],
+            }
+
+    def close(self):
+        close = getattr(self.remote, 'close', None)
+        if close is not None:
+            close()
+
+    def _read_ref_signature(self):
+        """Modification times of the files that change when a watched ref moves."""
+        names = ['packed-refs', 'FETCH_HEAD']
+        for ref in self._watched_refs:
+            names += [ref, os.path.join('logs', ref)]
+        signature = []
+        for name in names:
+            try:
+                signature.append(os.stat(os.path.join(self._git_dir, name)).st_mtime_ns)
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _update(self, local_head, remote_head):
+        """
+        Bring the changes and overlaps up to the given heads. Everything is computed before
+        any of it is stored, so a failed update leaves the previous state and heads in place
+        and the next poll tries again.
+        """
+        base_commit = compute_merge_base(
+            self.merge_base_mode, self.branch_a, self.branch_b, self.local_repo_path, local_head,
+            lambda: (self.remote, remote_head))
+        if base_commit != self.base_commit:
+            logger.info("Merge base moved to %s, recomputing all changes", base_commit)
+            self._recompute(base_commit, local_head, remote_head)
+            return
+
+        local, remote = self._local, self._remote
+        touched = set()
+        if local_head != self.local_head:
+            local = index_changes(get_changed_entries(
+                self.local_repo_path, base_commit, local_head, self._pathspecs))
+            touched |= _changed_keys(self._local, local)
+        if remote_head != self.remote_head:
+            if self._is_fast_forward(self.remote_head, remote_head):
+                remote = dict(remote)
+                delta = self.remote.iter_changed_entries(
+                    self.remote_head, remote_head, path_filter=self.path_filter)
+                touched |= self._apply_delta(remote, delta, base_commit)
+            else:
+                logger.info("Remote head was rewritten, recomputing remote changes")
+                remote = index_changes(
+                    iter_remote_changes(self.remote, base_commit, remote_head, self.path_filter))
+                touched |= _changed_keys(self._remote, remote)
+        overlaps = dict(self._overlaps)
+        for path in touched:
+            _update_overlap(overlaps, local, remote, path)
+
+        self.local_head, self.remote_head = local_head, remote_head
+        self._local, self._remote, self._overlaps = local, remote, overlaps
+        self.updated_at = time.time()
+        logger.info("Updated %d paths, %d overlapping files", len(touched), len(overlaps))
+
+    def _recompute(self, base_commit=None, local_head=None, remote_head=None):
+        local_head = local_head or self.local_head
+        remote_head = remote_head or self.remote_head
+        base_commit = base_commit or compute_merge_base(
+            self.merge_base_mode, self.branch_a, self.branch_b, self.local_repo_path,
+            local_head, lambda: (self.remote, remote_head))
+        local = index_changes(
+            get_changed_entries(self.local_repo_path, base_commit, local_head, self._pathspecs))
+        remote = index_changes(
+            iter_remote_changes(self.remote, base_commit, remote_head, self.path_filter))
+        overlaps = {}
+        for path in remote:
+            _update_overlap(overlaps, local, remote, path)
+
+        self.base_commit, self.local_head, self.remote_head = base_commit, local_head, remote_head
+        self._local, self._remote, self._overlaps = local, remote, overlaps
+        self.updated_at = time.time()
+
+    def _is_fast_forward(self, old_head, new_head):
+        index = get_commit_index()
+        if index is not None and old_head in index and new_head in index:
+            return index.is_ancestor(old_head, new_head)
+        try:
+            return self.remote.get_merge_base(old_head, new_head) == old_head
+        except ValueError:
+            return False
+
+    def _apply_delta(self, changes, delta, base_commit):
+        """
+        Compose the changes since the merge base, keyed by their merge base path, with the
+        changes between the previous and the new head of one side. Returns the merge base
+        paths whose change was touched.
+        """
+        # Files at the previous head that differ from the merge base, by their path there
+        current = {entry.path: entry for entry in changes.values() if entry.status != DELETED}
+        before = dict(changes)
+        for entry in delta:
+            if entry.status in (ADDED, COPIED):
+                base_path, base_sha, base_mode = None, None, None
+            else:
+                previous = current.pop(entry.base_path, None)
+                if previous is None:
+                    # Untouched since the merge base
+                    base_path, base_sha, base_mode = entry.base_path, entry.old_sha, entry.old_mode
+                else:
+                    del changes[previous.base_path]
+                    if previous.status in (ADDED, COPIED):
+                        base_path, base_sha, base_mode = None, None, None
+                    else:
+                        base_path, base_sha, base_mode = previous.base_path, previous.old_sha, previous.old_mode
+                if base_path is not None and base_sha is None:
+                    base_sha = get_blob_sha(base_commit, base_path, self.local_repo_path)
+            for composed in _compose(changes, base_path, base_sha, base_mode, entry):
+                changes[composed.base_path] = composed
+                if composed.status != DELETED:
+                    current[composed.path] = composed
+        # A file deleted by one move and added back elsewhere by another is a rename, as in a full diff
+        paired = index_changes(pair_exact_renames(list(changes.values())))
+        changes.clear()
+        changes.update(paired)
+        return _changed_keys(before, changes)
+
+
+def _update_overlap(overlaps, local, remote, base_path):
+    local_entry = local.get(base_path)
+    remote_entry = remote.get(base_path)
+    if local_entry is not None and remote_entry is not None:
+        overlaps[base_path] = Overlap(local_entry.path, local_entry, remote_entry)
+    else:
+        overlaps.pop(base_path, None)
+
+
+def _changed_keys(before, after):
+    """Return the keys whose entry was added, removed or replaced."""
+    return {key for key in before.keys() | after.keys() if before.get(key) != after.get(key)}
+
+
+def _compose(changes, base_path, base_sha, base_mode, entry):
+    """
+    Build the changes since the merge base of a file that was at `base_path` there (None for
+    a new file) and was last changed as `entry` describes, removing what they replace from
+    `changes`. Returns the entries to store.
+    """
+    if entry.status == DELETED:
+        if base_path is None:
+            return []
+        return [ChangedFile(base_path, DELETED, base_sha, None, base_mode, None)]
+    path = entry.path
+    composed = []
+    occupied = changes.pop(path, None) if base_path != path else None
+    if occupied is not None:
+        # The merge base had another file at this path, deleted or renamed away since,
+        # so this is a change of that file
+        if occupied.status == RENAMED:
+            composed.append(ChangedFile(occupied.path, ADDED, None, occupied.new_sha, None, occupied.new_mode))
+        if base_path is not None:
+            composed.append(ChangedFile(base_path, DELETED, base_sha, None, base_mode, None))
+        base_path, base_sha, base_mode = path, occupied.old_sha, occupied.old_mode
+    if base_path is None:
+        composed.append(ChangedFile(path, ADDED, None, entry.new_sha, None, entry.new_mode))
+    elif base_path != path:
+        composed.append(ChangedFile(path, RENAMED, base_sha, entry.new_sha, base_mode, entry.new_mode, base_path))
+    elif base_sha != entry.new_sha or (base_mode is not None and base_mode != entry.new_mode):
+        composed.append(ChangedFile(path, MODIFIED, base_sha, entry.new_sha, base_mode, entry.new_mode))
+    # Otherwise it changed back to the merge base version
+    return composed
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer one JSON request per line with one JSON response per line."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = self.server.handle_request(request)
+            except Exception as e:
+                logger.warning("Failed to answer request: %s", e)
+                response = {"error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+
+class _Server:
+    def handle_request(self, request):
+        command = request.get("command", "overlaps")
+        if command == "refresh":
+            self.watcher.poll(force=True)
+        elif command != "overlaps":
+            raise ValueError(f"Unknown command: {command}")
+        return self.watcher.snapshot()
+
+
+class _UnixServer(_Server, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(_Server, socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class WatchServer:
+    """
+    Serve the overlaps of a watcher on a Unix socket path, or a (host, port) pair, and poll
+    for head moves every `poll_interval` seconds. Requests are JSON lines like
+    {"command": "overlaps"} or {"command": "refresh"}, answered with the watcher's snapshot.
+    """
+
+    def __init__(self, watcher, address, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.watcher = watcher
+        self.poll_interval = poll_interval
+        if isinstance(address, str):
+            _remove_stale_socket(address)
+            self._server = _UnixServer(address, _RequestHandler)
+        else:
+            self._server = _TCPServer(address, _RequestHandler)
+        self._server.watcher = watcher
+        self.address = self._server.server_address
+        self._stop = threading.Event()
+
+    def serve_forever(self):
+        """Answer requests until shutdown() is called from another thread."""
+        poller = threading.Thread(target=self._poll_forever, name="overlap-watcher", daemon=True)
+        poller.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stop.set()
+            poller.join()
+            self._server.server_close()
+            self.watcher.close()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def shutdown(self):
+        self._server.shutdown()
+
+    def _poll_forever(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.watcher.poll()
+            except Exception as e:
+                # Network errors included; the watcher keeps its state and the next poll retries
+                logger.warning(f"Failed to update overlaps: {e}")
+
+
+def _remove_stale_socket(path):
+    """Remove a socket left by an earlier server, refusing to touch anything that is not a socket."""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError(f"Cannot listen on {path}: it exists and is not a socket")
+    os.unlink(path)
+
+
+def query(address, command="overlaps", timeout=30.0):
+    """Send one request to a running watcher and return its response."""
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(address)
+        client.sendall((json.dumps({"command": command}) + "\n").encode())
+        with client.makefile("rb") as stream:
+            response = json.loads(stream.readline())
+    if "error" in response:
+        raise ValueError(response["error"])
+    return response
@@ -1,45 +1,243 @@
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from git_diff_analyzer.git_utils.git_commands import *
+from git_diff_analyzer.instrumentation import span
+from git_diff_analyzer.models import DELETED, Overlap
+from git_diff_analyzer.path_filter import make_path_filter
+from git_diff_analyzer.services.remote_merge_base import find_remote_merge_base
 from git_diff_analyzer.services.repo_mapper import get_remote_service
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Entries in flight between the producer threads and the join
+PIPELINE_QUEUE_SIZE = 1024
+_LOCAL, _REMOTE = 0, 1
+_DONE = object()
+
+# Where the merge base is computed: from the local refs of both branches, or with the remote
+MERGE_BASE_LOCAL = 'local'
+MERGE_BASE_REMOTE = 'remote'
 
 
-def compare_local_remote_changes(owner, repo, access_token, local_repo_path, branch_a, branch_b):
+def compare_local_remote_changes(owner, repo, access_token, local_repo_path, branch_a, branch_b,
+                                 provider='github', remote_options=None, pipelined=False,
+                                 merge_base_mode=MERGE_BASE_LOCAL, include=None, exclude=None,
+                                 skip_generated=False):
     """Find files that were changed in both local and remote branches since the merge base."""
+    overlaps = find_overlapping_changes(
+        owner, repo, access_token, local_repo_path, branch_a, branch_b,
+        provider, remote_options, pipelined, merge_base_mode,
+        include=include, exclude=exclude, skip_generated=skip_generated)
+    return [overlap.path for overlap in overlaps]
+
+
+def find_overlapping_changes(owner, repo, access_token, local_repo_path, branch_a, branch_b,
+                             provider='github', remote_options=None, pipelined=False,
+                             merge_base_mode=MERGE_BASE_LOCAL, include=None, exclude=None,
+                             skip_generated=False):
+    """
+    Find files changed in both branches since the merge base as Overlap records,
+    which carry the local and remote entries and whether both sides match.
+    `provider` selects the remote service ('github' for REST, 'github-graphql' for GraphQL)
+    and `remote_options` are passed to it (e.g. pool_size, max_workers).
+    With `pipelined` the local and remote sides run concurrently, see iter_overlapping_changes.
+    With `merge_base_mode='remote'` branch_a does not need to be fetched: the merge base
+    is found through the remote, see find_remote_merge_base.
+    Only paths matching the `include` and none of the `exclude` glob pathspecs are compared,
+    and `skip_generated` also excludes vendored, generated and binary files; the patterns
+    are applied by git and to the remote listings before any per-file work.
+    """
+    if pipelined:
+        return list(iter_overlapping_changes(
+            owner, repo, access_token, local_repo_path, branch_a, branch_b, provider, remote_options,
+            merge_base_mode, include=include, exclude=exclude, skip_generated=skip_generated))
+    path_filter = make_path_filter(include, exclude, skip_generated)
 
-    # Get merge base commit
-    base_commit = get_merge_base(branch_a, branch_b, local_repo_path)
+    # Get merge base commit, connecting to the remote first only if it is needed for it
+    connect = _once(lambda: connect_remote(
+        provider, owner, repo, access_token, remote_options, branch_a))
+    local_latest_commit = get_local_last_commit(branch_b, local_repo_path)
+    base_commit = compute_merge_base(
+        merge_base_mode, branch_a, branch_b, local_repo_path, local_latest_commit, connect)
 
     # Get the remote service
-    remote_service = get_remote_service('github')
+    remote, remote_latest_commit = connect()
+
+    # Get changed files locally
+    with span('local-changes'):
+        local_changes = get_changed_entries(
+            local_repo_path, base_commit, local_latest_commit, get_pathspecs(path_filter))
+
+    # Stream remote changes page by page into the join with the local ones
+    with span('remote-changes'):
+        remote_changes = iter_remote_changes(
+            remote, base_commit, remote_latest_commit, path_filter)
+        return join_changes(index_changes(local_changes), remote_changes)
+
+
+def iter_overlapping_changes(owner, repo, access_token, local_repo_path, branch_a, branch_b,
+                             provider='github', remote_options=None, merge_base_mode=MERGE_BASE_LOCAL,
+                             include=None, exclude=None, skip_generated=False):
+    """
+    Yield Overlap records as soon as a path is known to be changed on both sides.
+    The remote connection is set up while the merge base is computed, then the local
+    diff and the remote compare are produced on separate threads and fed into an
+    incremental hash join. Records are yielded in the order they are confirmed.
+    """
+    path_filter = make_path_filter(include, exclude, skip_generated)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        remote_future = executor.submit(
+            connect_remote, provider, owner, repo, access_token, remote_options, branch_a)
+        local_latest_commit = get_local_last_commit(branch_b, local_repo_path)
+        base_commit = compute_merge_base(
+            merge_base_mode, branch_a, branch_b, local_repo_path, local_latest_commit,
+            remote_future.result)
+        remote, remote_latest_commit = remote_future.result()
+
+        yield from _iter_incremental_join(
+            executor,
+            lambda: _iter_in_span('local-changes', iter_changed_entries(
+                local_repo_path, base_commit, local_latest_commit, get_pathspecs(path_filter))),
+            lambda: _iter_in_span('remote-changes', iter_remote_changes(
+                remote, base_commit, remote_latest_commit, path_filter)))
+
+
+def get_pathspecs(path_filter):
+    """Return the git pathspecs of an optional PathFilter."""
+    return path_filter.pathspecs() if path_filter is not None else None
+
+
+def _iter_in_span(name, iterable):
+    """Time the consumption of an iterable as one span."""
+    with span(name):
+        yield from iterable
+
+
+def compute_merge_base(merge_base_mode, branch_a, branch_b, local_repo_path, local_latest_commit,
+                       get_remote):
+    """Compute the merge base in the given mode, `get_remote` returns (remote, remote latest commit)."""
+    if merge_base_mode == MERGE_BASE_LOCAL:
+        with span('merge-base'):
+            return get_merge_base(branch_a, branch_b, local_repo_path)
+    if merge_base_mode == MERGE_BASE_REMOTE:
+        remote, remote_latest_commit = get_remote()
+        with span('merge-base'):
+            return find_remote_merge_base(
+                remote, remote_latest_commit, local_latest_commit, local_repo_path)
+    raise ValueError(f"Invalid merge base mode: {merge_base_mode}")
+
+
+def _once(func):
+    """Wrap a function without arguments so it runs on the first call only."""
+    results = []
+
+    def call():
+        if not results:
+            results.append(func())
+        return results[0]
+    return call
+
+
+def connect_remote(provider, owner, repo, access_token, remote_options, branch):
+    """Create the remote service and fetch the latest commit of the branch."""
+    remote_service = get_remote_service(provider)
     try:
-        remote = remote_service(owner, repo, access_token)
-        remote_latest_commit = remote.get_latest_commit(branch_a)
+        with span('remote-connect'):
+            remote = remote_service(owner, repo, access_token, **(remote_options or {}))
+            return remote, remote.get_latest_commit(branch)
     except ValueError as e:
         logger.error(f"Remote service error: {e}")
         raise
 
-    # Get changed files remotely
-    remote_changed_files = remote.get_changed_files(
-        base_commit, remote_latest_commit)
 
-    remote_filtered_files = _get_filtered_changed_files(
-        base_commit, remote_changed_files, remote_latest_commit, remote.is_diff
-    )
-    # Get changed files locally
-    local_latest_commit = get_local_last_commit(branch_b, local_repo_path)
-    local_changed_files = get_changed_files(
-        local_repo_path, base_commit, local_latest_commit)
-    local_filtered_files = _get_filtered_changed_files(
-        base_commit, local_changed_files, local_latest_commit,
-        lambda base, file, latest, _: get_diff(
-            base, file, latest, file, local_repo_path)
-    )
-
-    # Find common changed files
-    return [file for file in remote_filtered_files if file in local_filtered_files]
+def iter_remote_changes(remote, base_commit, latest_commit, path_filter=None):
+    """
+    Yield the remote changed entries, falling back to a content check
+    only for entries the remote could not report a blob SHA for.
+    """
+    for entry in remote.iter_changed_entries(base_commit, latest_commit, path_filter=path_filter):
+        if entry.new_sha is not None or entry.status == DELETED:
+            yield entry
+        elif _get_filtered_changed_files(base_commit, [entry.path], latest_commit, remote.is_diff):
+            yield entry
+
+
+def index_changes(changes):
+    """
+    Index changed entries by their path at the merge base for hash joins,
+    so a renamed file is found under the path the other side knows it by.
+    """
+    return {entry.base_path: entry for entry in changes}
+
+
+def join_changes(local_by_path, remote_changes):
+    """
+    Pair remote entries with the indexed local entries of the same merge base path.
+    Each remote entry costs one hash lookup, so the join is linear in the size of both sides.
+    """
+    overlaps = []
+    for entry in remote_changes:
+        local_entry = local_by_path.get(entry.base_path)
+        if local_entry is not None:
+            overlaps.append(Overlap(local_entry.path, local_entry, entry))
+    return overlaps
+
+
+def _iter_incremental_join(executor, make_local_changes, make_remote_changes):
+    """
+    Run both producers on the executor and join their entries as they arrive.
+    Once one side is complete the other side's entries are no longer stored,
+    since they can only match what has already been seen.
+    """
+    entries = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    executor.submit(_produce, entries, stop, _LOCAL, make_local_changes)
+    executor.submit(_produce, entries, stop, _REMOTE, make_remote_changes)
+
+    seen = ({}, {})
+    done = [False, False]
+    try:
+        while not all(done):
+            side, entry = entries.get()
+            if entry is _DONE:
+                done[side] = True
+                seen[1 - side].clear()
+                continue
+            if isinstance(entry, Exception):
+                raise entry
+            match = seen[1 - side].pop(entry.base_path, None)
+            if match is not None:
+                local_entry, remote_entry = (entry, match) if side == _LOCAL else (match, entry)
+                yield Overlap(local_entry.path, local_entry, remote_entry)
+            elif not done[1 - side]:
+                seen[side][entry.base_path] = entry
+    finally:
+        stop.set()
+
+
+def _produce(entries, stop, side, make_changes):
+    """Feed the entries of one side into the queue, followed by _DONE or the raised error."""
+    try:
+        for entry in make_changes():
+            if not _put(entries, stop, (side, entry)):
+                return
+        _put(entries, stop, (side, _DONE))
+    except Exception as e:
+        _put(entries, stop, (side, e))
+
+
+def _put(entries, stop, item):
+    """Put an item on the bounded queue unless the consumer has stopped."""
+    while not stop.is_set():
+        try:
+            entries.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
 
 
 def _get_filtered_changed_files(base_commit, changed_files, latest_commit, diff_func):
@@ -0,0 +1,169 @@
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from git_diff_analyzer.git_utils.cat_file import close_object_readers
+from git_diff_analyzer.git_utils.git_commands import (
+    get_changed_entries, get_local_last_commit, get_merge_base)
+from git_diff_analyzer.models import ChangedFile
+from git_diff_analyzer.services.diff_service import index_changes, iter_remote_changes, join_changes
+from git_diff_analyzer.services.repo_mapper import get_remote_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_REPOSITORIES = 16
+DEFAULT_TIMEOUT = 600.0
+
+OK = 'ok'
+FAILED = 'failed'
+TIMED_OUT = 'timeout'
+
+
+def load_manifest(path):
+    """
+    Read a fleet manifest: a JSON list of repositories like
+    {"owner": ..., "repo": ..., "local_path": ..., "branches": [[branch_a, branch_b], ...]},
+    optionally with "provider", "remote_options" and "token_env" (the variable holding its token).
+    """
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Failed to read manifest {path}: {e}")
+        raise ValueError(f"Failed to read manifest: {e}")
+    for entry in manifest:
+        missing = {"owner", "repo", "local_path", "branches"} - set(entry)
+        if missing:
+            raise ValueError(f"Manifest entry {entry} is missing {', '.join(sorted(missing))}")
+    return manifest
+
+
+def run_fleet(manifest, access_token, processes=None, max_repositories=DEFAULT_MAX_REPOSITORIES,
+              timeout=DEFAULT_TIMEOUT):
+    """
+    Find the overlapping changes of every branch pair of every repository in the manifest.
+    Local git work runs on a pool of `processes` worker processes (one per core by default),
+    while up to `max_repositories` repositories talk to their remotes from threads of this
+    process, sharing the keep-alive sessions and the rate limit scheduler of each token.
+    Each repository gets `timeout` seconds from the moment it starts: its remote requests
+    time out with the time left, and its local jobs are cancelled, or abort themselves and
+    their git processes once the time is up.
+    Returns a report with one result per repository and a summary.
+    """
+    start = time.perf_counter()
+    # Worker processes are spawned, since forking would copy the threads of the remote clients
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), mp_context=context) as local_pool, \
+            ThreadPoolExecutor(max_workers=max_repositories, thread_name_prefix="fleet") as repo_pool:
+        futures = [repo_pool.submit(_analyze_repository, entry, access_token, local_pool, timeout)
+                   for entry in manifest]
+        results = [future.result() for future in futures]
+
+    summary = {status: sum(result["status"] == status for result in results)
+               for status in (OK, FAILED, TIMED_OUT)}
+    summary["repositories"] = len(results)
+    summary["elapsed"] = time.perf_counter() - start
+    logger.info("Analyzed %d repositories in %.1fs: %d ok, %d failed, %d timed out",
+                len(results), summary["elapsed"], summary[OK], summary[FAILED], summary[TIMED_OUT])
+    return {"summary": summary, "repositories": results}
+
+
+def _analyze_repository(entry, access_token, local_pool, timeout):
+    """Analyze all branch pairs of one repository, never raising so one repository cannot stop the fleet."""
+    start = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    result = {"owner": entry["owner"], "repo": entry["repo"], "status": OK, "pairs": []}
+    pairs = [tuple(pair) for pair in entry["branches"]]
+    # Worker processes only share the wall clock with this one
+    local_deadline = time.time() + timeout
+    local_futures = {pair: local_pool.submit(_local_changes, entry["local_path"], *pair, local_deadline)
+                     for pair in dict.fromkeys(pairs)}
+    remote = None
+    try:
+        token = os.environ.get(entry["token_env"]) if entry.get("token_env") else access_token
+        remote_service = get_remote_service(entry.get("provider", "github"))
+        remote = remote_service(entry["owner"], entry["repo"], token, deadline=deadline,
+                                **entry.get("remote_options", {}))
+        remote_heads = remote.get_latest_commits(list(dict.fromkeys(pair[0] for pair in pairs)))
+
+        remote_changes = {}
+        for branch_a, branch_b in pairs:
+            base_commit, local_head, rows = local_futures[(branch_a, branch_b)].result(
+                timeout=max(deadline - time.monotonic(), 0))
+            # Pairs with the same merge base and remote head share one remote diff
+            key = (base_commit, remote_heads[branch_a])
+            if key not in remote_changes:
+                _check_deadline(deadline)
+                remote_changes[key] = list(iter_remote_changes(remote, *key))
+            overlaps = join_changes(
+                index_changes(ChangedFile.from_row(row) for row in rows), remote_changes[key])
+            result["pairs"].append({
+                "branch_a": branch_a, "branch_b": branch_b, "base": base_commit,
+                "local_head": local_head, "remote_head": remote_heads[branch_a],
+                "overlaps": [overlap.path for overlap in overlaps],
+            })
+    except (FutureTimeoutError, TimeoutError):
+        logger.error(f"Timed out analyzing {entry['owner']}/{entry['repo']} after {timeout}s")
+        result.update(status=TIMED_OUT, error=f"Timed out after {timeout}s")
+    except Exception as e:
+        logger.error(f"Failed to analyze {entry['owner']}/{entry['repo']}: {e}")
+        result.update(status=FAILED, error=str(e))
+    finally:
+        for future in local_futures.values():
+            future.cancel()
+        if remote is not None and hasattr(remote, "close"):
+            remote.close()
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+def _check_deadline(deadline):
+    if time.monotonic() >= deadline:
+        raise TimeoutError
+
+
+def _local_changes(local_path, branch_a, branch_b, deadline=None):
+    """
+    Run the local side of one pair in a worker process, returning plain data.
+    Past the wall clock `deadline` an alarm interrupts the job, which kills the running git
+    process and raises TimeoutError, so a repository that timed out does not hold the worker.
+    The worker's shared object readers are closed too, since the alarm may have struck between
+    the requests and the answers of a batch, leaving answers a later job would read.
+    """
+    if deadline is None or not hasattr(signal, "setitimer"):
+        return _run_local_changes(local_path, branch_a, branch_b)
+    left = deadline - time.time()
+    if left <= 0:
+        raise TimeoutError
+    alarms = []
+
+    def on_alarm(signum, frame):
+        alarms.append(signum)
+        raise TimeoutError
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, left)
+    try:
+        return _run_local_changes(local_path, branch_a, branch_b)
+    except Exception:
+        # Git helpers report every failure, the interruption included, as ValueError
+        if alarms:
+            close_object_readers()
+            raise TimeoutError
+        raise
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _run_local_changes(local_path, branch_a, branch_b):
+    base_commit = get_merge_base(branch_a, branch_b, local_path)
+    local_head = get_local_last_commit(branch_b, local_path)
+    rows = [list(entry) for entry in get_changed_entries(local_path, base_commit, local_head)]
+    return base_commit, local_head, rows
+
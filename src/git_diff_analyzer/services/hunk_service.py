@@ -0,0 +1,83 @@
+import logging
+
+from git_diff_analyzer.git_utils.git_commands import (
+    get_changed_entries, get_local_last_commit, iter_changed_hunks)
+from git_diff_analyzer.hunks import parse_hunk_ranges
+from git_diff_analyzer.models import MODIFIED, RENAMED, HunkConflict, Overlap
+from git_diff_analyzer.path_filter import make_path_filter
+from git_diff_analyzer.services.diff_service import (
+    MERGE_BASE_LOCAL, compute_merge_base, connect_remote, get_pathspecs, index_changes)
+from git_diff_analyzer.services.interval_tree import IntervalTree
+
+logger = logging.getLogger(__name__)
+
+# Statuses whose hunks refer to lines of the merge base version of the file
+_EDITED = (MODIFIED, RENAMED)
+
+
+def find_conflicting_hunks(owner, repo, access_token, local_repo_path, branch_a, branch_b,
+                           provider='github', remote_options=None, merge_base_mode=MERGE_BASE_LOCAL,
+                           include=None, exclude=None, skip_generated=False):
+    """
+    Predict merge conflicts at hunk level: among the files changed on both sides, report
+    only those whose local and remote edits touch overlapping or adjacent lines of the
+    merge base version, together with the ranges. Hunks come from the patches of the
+    remote compare and from a single `git diff -U0` locally. Paths are selected as in
+    find_overlapping_changes, and renamed files are matched by their merge base path.
+    """
+    path_filter = make_path_filter(include, exclude, skip_generated)
+    pathspecs = get_pathspecs(path_filter)
+    remote, remote_latest_commit = connect_remote(
+        provider, owner, repo, access_token, remote_options, branch_a)
+    local_latest_commit = get_local_last_commit(branch_b, local_repo_path)
+    base_commit = compute_merge_base(
+        merge_base_mode, branch_a, branch_b, local_repo_path, local_latest_commit,
+        lambda: (remote, remote_latest_commit))
+    local_by_path = index_changes(get_changed_entries(
+        local_repo_path, base_commit, local_latest_commit, pathspecs))
+
+    overlaps = []
+    remote_patches = {}
+    for entry, patch in remote.iter_changed_patches(
+            base_commit, remote_latest_commit, path_filter=path_filter):
+        local_entry = local_by_path.get(entry.base_path)
+        if local_entry is None:
+            continue
+        overlap = Overlap(local_entry.path, local_entry, entry)
+        # Files changed identically on both sides merge cleanly
+        if not overlap.identical:
+            overlaps.append(overlap)
+            remote_patches[overlap.path] = patch
+    if not overlaps:
+        return []
+
+    local_hunks = {path: ranges
+                   for path, ranges in iter_changed_hunks(
+                       local_repo_path, base_commit, local_latest_commit, pathspecs)
+                   if path in remote_patches}
+
+    conflicts = []
+    for overlap in overlaps:
+        both_modified = overlap.local.status in _EDITED and overlap.remote.status in _EDITED
+        patch = remote_patches[overlap.path]
+        local_ranges = local_hunks.get(overlap.path) if both_modified else None
+        remote_ranges = parse_hunk_ranges(patch) if both_modified and patch is not None else None
+        conflict = _find_conflict(overlap.path, local_ranges, remote_ranges)
+        if conflict is not None:
+            conflicts.append(conflict)
+    logger.info("%d of %d files changed on both sides have conflicting hunks",
+                len(conflicts), len(overlaps))
+    return conflicts
+
+
+def _find_conflict(path, local_ranges, remote_ranges):
+    """Match remote hunks against an interval tree of local hunks, counting adjacent lines as conflicts."""
+    if local_ranges is None or remote_ranges is None:
+        return HunkConflict(path, local_ranges, remote_ranges, None)
+    tree = IntervalTree(local_ranges)
+    overlapping = [(local_range, remote_range)
+                   for remote_range in remote_ranges
+                   for local_range in tree.overlapping(remote_range[0] - 1, remote_range[1] + 1)]
+    if not overlapping:
+        return None
+    return HunkConflict(path, local_ranges, remote_ranges, overlapping)
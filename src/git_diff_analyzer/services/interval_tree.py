@@ -0,0 +1,46 @@
+class IntervalTree:
+    """
+    Static interval tree over inclusive (start, end) ranges.
+    The intervals are kept sorted by start in an implicit balanced tree, where each
+    node stores the largest end of its subtree, so queries skip subtrees that end
+    before the queried range.
+    """
+
+    def __init__(self, intervals):
+        self._intervals = sorted(intervals)
+        self._max_end = [0] * len(self._intervals)
+        self._build(0, len(self._intervals))
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        max_end = self._intervals[mid][1]
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None:
+                max_end = max(max_end, child)
+        self._max_end[mid] = max_end
+        return max_end
+
+    def overlapping(self, start, end):
+        """Return the intervals that share at least one line with [start, end], sorted by start."""
+        result = []
+        stack = [(0, len(self._intervals))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < start:
+                continue
+            interval = self._intervals[mid]
+            # Intervals right of mid start even later
+            if interval[0] <= end:
+                stack.append((mid + 1, hi))
+                if interval[1] >= start:
+                    result.append(interval)
+            stack.append((lo, mid))
+        return sorted(result)
+
+    def __len__(self):
+        return len(self._intervals)
@@ -0,0 +1,60 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from git_diff_analyzer.git_utils.git_commands import get_changed_entries, get_merge_base, resolve_commits
+from git_diff_analyzer.services.diff_service import index_changes, iter_remote_changes, join_changes
+from git_diff_analyzer.services.repo_mapper import get_remote_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def compare_branch_matrix(owner, repo, access_token, local_repo_path, local_branches, remote_branches,
+                          provider='github', remote_options=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Find files changed on both sides for every (local branch, remote branch) pair.
+    Branch heads, merge bases and changed-file sets shared between pairs are computed once,
+    and the remaining work runs on a pool of `max_workers` threads.
+    Returns {(local_branch, remote_branch): [Overlap]}.
+    """
+    remote_service = get_remote_service(provider)
+    try:
+        remote = remote_service(owner, repo, access_token, **(remote_options or {}))
+        remote_heads = remote.get_latest_commits(remote_branches)
+    except ValueError as e:
+        logger.error(f"Remote service error: {e}")
+        raise
+
+    # Resolve every branch once, locally as well for the merge base
+    local_heads = dict(zip(local_branches, resolve_commits(
+        [f"refs/heads/{branch}" for branch in local_branches], local_repo_path)))
+    remote_tips = dict(zip(remote_branches, resolve_commits(remote_branches, local_repo_path)))
+
+    pairs = [(local_branch, remote_branch)
+             for local_branch in local_branches for remote_branch in remote_branches]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        merge_bases = _run_unique(executor, {
+            pair: (remote_tips[pair[1]], local_heads[pair[0]]) for pair in pairs},
+            lambda commits: get_merge_base(*commits, local_repo_path))
+
+        # Each distinct local diff is indexed once and probed by every pair using it
+        local_indexes = _run_unique(executor, {
+            pair: (merge_bases[pair], local_heads[pair[0]]) for pair in pairs},
+            lambda commits: index_changes(get_changed_entries(local_repo_path, *commits)))
+        remote_changes = _run_unique(executor, {
+            pair: (merge_bases[pair], remote_heads[pair[1]]) for pair in pairs},
+            lambda commits: list(iter_remote_changes(remote, *commits)))
+
+    logger.info("Compared %d branch pairs using %d merge bases, %d local and %d remote diffs",
+                len(pairs), len(set(merge_bases.values())),
+                len({(merge_bases[pair], local_heads[pair[0]]) for pair in pairs}),
+                len({(merge_bases[pair], remote_heads[pair[1]]) for pair in pairs}))
+    return {pair: join_changes(local_indexes[pair], remote_changes[pair]) for pair in pairs}
+
+
+def _run_unique(executor, keys_by_pair, func):
+    """Run `func` once per distinct key on the executor and map the results back to each pair."""
+    futures = {key: executor.submit(func, key) for key in set(keys_by_pair.values())}
+    return {pair: futures[key].result() for pair, key in keys_by_pair.items()}
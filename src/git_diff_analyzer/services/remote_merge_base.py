@@ -0,0 +1,85 @@
+import logging
+
+from git_diff_analyzer.cache import get_cache
+from git_diff_analyzer.git_utils.commit_index import get_commit_index
+from git_diff_analyzer.git_utils.git_commands import get_known_commits, get_merge_base_with_any
+
+logger = logging.getLogger(__name__)
+
+
+def find_remote_merge_base(remote, remote_commit, local_commit, repo_loc):
+    """
+    Find the merge base of a remote commit and a local commit without fetching the remote branch.
+    If the remote commit is known locally this is a local merge-base. Otherwise the remote
+    compare is asked first, which works once the local commit has been pushed, and then the
+    remote history is walked page by page until every path reaches a locally known commit.
+    With a commit index the walked remote commits are indexed too, so later walks stop at
+    them and the merge base is found in memory.
+    """
+    cache = get_cache()
+    key = sorted([remote_commit, local_commit])
+    if cache is not None:
+        cached = cache.get('merge-base', key)
+        if cached is not None:
+            return cached
+
+    index = get_commit_index()
+    if (index is not None and remote_commit in index) or get_known_commits([remote_commit], repo_loc):
+        merge_base = get_merge_base_with_any(local_commit, [remote_commit], repo_loc)
+    else:
+        try:
+            merge_base = remote.get_merge_base(remote_commit, local_commit)
+        except ValueError as e:
+            logger.info("Remote cannot compare with the local head (%s), walking the remote history", e)
+            merge_base = None
+        if merge_base is None:
+            known, walked = _find_known_ancestors(remote, remote_commit, repo_loc, index)
+            if index is not None and index.update(known, repo_loc):
+                index.add_commits(walked.items())
+            if index is not None and remote_commit in index:
+                merge_base = get_merge_base_with_any(local_commit, [remote_commit], repo_loc)
+            else:
+                merge_base = get_merge_base_with_any(local_commit, known, repo_loc)
+
+    if cache is not None:
+        cache.set('merge-base', key, merge_base)
+    return merge_base
+
+
+def _find_known_ancestors(remote, remote_commit, repo_loc, index=None):
+    """
+    Walk the remote history of a commit and return the newest known commit on every path,
+    along with the walked commits and their parents. Known commits exist locally or in the
+    commit index, and their parents are not followed since their history is already known.
+    """
+    pending = {remote_commit}
+    listed = {}
+    visited = set()
+    known = []
+    for sha, parents in remote.iter_commit_parents(remote_commit):
+        listed[sha] = parents
+        # Commits are listed by date, so a pending commit may have been listed before
+        stack = [sha] if sha in pending else []
+        while stack:
+            commit = stack.pop()
+            if commit in visited:
+                continue
+            pending.discard(commit)
+            visited.add(commit)
+            if (index is not None and commit in index) or get_known_commits([commit], repo_loc):
+                known.append(commit)
+                continue
+            for parent in listed[commit]:
+                if parent in visited:
+                    continue
+                if parent in listed or (index is not None and parent in index):
+                    stack.append(parent)
+                else:
+                    pending.add(parent)
+        if not pending:
+            break
+
+    if not known:
+        raise ValueError(f"No commit in the history of {remote_commit} exists locally")
+    logger.info("Walked %d remote commits to %d known ones", len(listed), len(known))
+    return known, {commit: listed[commit] for commit in visited if commit not in known}
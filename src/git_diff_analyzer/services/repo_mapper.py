@@ -1,12 +1,81 @@
-from git_diff_analyzer.remote.github_api import GithubAPI
-# More git remote providers can be added here(eg. GitLab, Bitbucket)
+import importlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Remote providers of other packages register "name = module:Class" entry points in this group
+ENTRY_POINT_GROUP = 'git_diff_analyzer.remotes'
+
+# Built-in providers; like entry points, their modules are only imported when first asked for
+BUILTIN_PROVIDERS = {
+    'github': 'git_diff_analyzer.remote.github_api:GithubAPI',
+    'github-graphql': 'git_diff_analyzer.remote.github_graphql_api:GithubGraphQLAPI',
+}
+
+_registry = dict(BUILTIN_PROVIDERS)
+_loaded = {}
+_discovered = False
+_lock = threading.Lock()
+
+
+def register_remote_service(provider_name, service):
+    """Register a remote service class, or a 'module:Class' path imported on first use, under a provider name."""
+    with _lock:
+        name = provider_name.lower()
+        _registry[name] = service
+        _loaded.pop(name, None)
 
 
 def get_remote_service(provider_name):
     """
     Return the appropriate remote service class based on the provider name.
+    Providers are looked up among the built-in and registered ones first, and then among
+    the entry points of installed packages, which are only scanned for unknown names.
     """
-    if provider_name.lower() == 'github':
-        return GithubAPI
-    else:
-        raise ValueError(f"Invalid Git remote provider: {provider_name}")
+    name = provider_name.lower()
+    with _lock:
+        service = _loaded.get(name)
+        if service is not None:
+            return service
+        if name not in _registry:
+            _discover_entry_points()
+        target = _registry.get(name)
+        if target is None:
+            raise ValueError(f"Invalid Git remote provider: {provider_name}")
+        service = _loaded[name] = _load(target) if isinstance(target, str) else target
+        return service
+
+
+def get_provider_names():
+    """Return the names of all built-in, registered and installed providers."""
+    with _lock:
+        _discover_entry_points()
+        return sorted(_registry)
+
+
+def _discover_entry_points():
+    global _discovered
+    if _discovered:
+        return
+    _discovered = True
+    from importlib.metadata import entry_points
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python 3.9 returns a dict of all groups
+        found = entry_points().get(ENTRY_POINT_GROUP, [])
+    for entry_point in found:
+        _registry.setdefault(entry_point.name.lower(), entry_point.value)
+
+
+def _load(target):
+    module_name, _, attribute = target.partition(':')
+    try:
+        service = importlib.import_module(module_name)
+        for part in attribute.split('.'):
+            service = getattr(service, part)
+        return service
+    except (ImportError, AttributeError) as e:
+        logger.error(f"Failed to load remote provider {target}: {e}")
+        raise ValueError(f"Failed to load remote provider {target}: {e}")
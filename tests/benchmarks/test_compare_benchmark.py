@@ -0,0 +1,77 @@
+"""
+End-to-end benchmarks of compare_local_remote_changes against the fake GitHub server.
+
+The smallest size runs with the regular suite as a smoke test; the others need
+`pytest tests/benchmarks --benchmark [--benchmark-json results.json]`.
+"""
+import statistics
+import subprocess
+import time
+
+import pytest
+
+from git_diff_analyzer import compare_local_remote_changes
+from git_diff_analyzer.git_utils.cat_file import close_object_readers
+from support.fake_github import FakeGithubServer
+from support.synthetic_repo import build_synthetic_repo
+
+# Added to every request, a fraction of the latency of api.github.com
+LATENCY = 0.005
+SIZES = [
+    (100, 3),
+    pytest.param(1_000, 3, marks=pytest.mark.benchmark),
+    pytest.param(10_000, 1, marks=pytest.mark.benchmark),
+    pytest.param(100_000, 1, marks=pytest.mark.benchmark),
+]
+
+
+@pytest.fixture
+def no_result_cache(monkeypatch):
+    """Measure cold runs regardless of GIT_DIFF_ANALYZER_CACHE."""
+    monkeypatch.setattr("git_diff_analyzer.cache._cache", None)
+    monkeypatch.setattr("git_diff_analyzer.cache._configured", True)
+
+
+@pytest.fixture
+def count_spawns(monkeypatch):
+    """Count the child processes started in this process."""
+    spawns = []
+    popen_init = subprocess.Popen.__init__
+
+    def counting_init(self, *args, **kwargs):
+        spawns.append(args[0] if args else kwargs.get("args"))
+        popen_init(self, *args, **kwargs)
+    monkeypatch.setattr(subprocess.Popen, "__init__", counting_init)
+    return spawns
+
+
+@pytest.mark.parametrize("changed_files, rounds", SIZES)
+def test_compare_local_remote_changes(changed_files, rounds, tmp_path, request, no_result_cache):
+    repo = build_synthetic_repo(tmp_path / "repo", changed_files)
+
+    with FakeGithubServer(repo.path, latency=LATENCY) as server:
+        spawns = request.getfixturevalue("count_spawns")
+        timings, http_requests, spawn_counts = [], [], []
+        for _ in range(rounds):
+            close_object_readers()
+            server.reset_stats()
+            del spawns[:]
+            start = time.perf_counter()
+            result = compare_local_remote_changes(
+                "owner", "repo", f"token-{changed_files}", repo.path,
+                repo.remote_branch, repo.local_branch, remote_options={"api_url": server.url})
+            timings.append(time.perf_counter() - start)
+            spawn_counts.append(len(spawns))
+            http_requests.append(server.stats()["requests"])
+        close_object_readers()
+
+    assert set(result) == repo.overlapping
+    request.config.benchmark_results.append({
+        "name": f"compare_local_remote_changes[{changed_files}]",
+        "changed_files": changed_files,
+        "rounds": rounds,
+        "min": min(timings),
+        "mean": statistics.mean(timings),
+        "http_requests": max(http_requests),
+        "subprocess_spawns": max(spawn_counts),
+    })
@@ -0,0 +1,61 @@
+"""
+Cold import times of the package, measured in fresh interpreters and held to a budget.
+
+Hooks that only run local checks import the package on every call, so importing it must
+not pull in the HTTP stack or configure logging. Runs with the regular suite.
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+
+ROUNDS = 5
+# Seconds for the fastest round, far above the usual times so that slow machines pass
+IMPORTS = [
+    ("package", "import git_diff_analyzer", 0.05),
+    ("find_overlapping_changes", "from git_diff_analyzer import find_overlapping_changes", 0.25),
+]
+# Only imported once a remote is used
+REMOTE_MODULES = ["requests", "urllib3", "git_diff_analyzer.remote.github_api"]
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+import logging
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules),
+                  "root_handlers": len(logging.getLogger().handlers)}}))
+"""
+
+
+def _measure(statement):
+    result = subprocess.run([sys.executable, "-c", _SCRIPT.format(statement=statement)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize("name, statement, budget", IMPORTS)
+def test_import_time(name, statement, budget, request):
+    runs = [_measure(statement) for _ in range(ROUNDS)]
+    fastest = min(run["elapsed"] for run in runs)
+
+    modules = set(runs[0]["modules"])
+    assert not modules & set(REMOTE_MODULES)
+    assert runs[0]["root_handlers"] == 0
+    assert fastest < budget, f"{statement} took {fastest:.3f}s, over the budget of {budget}s"
+    request.config.benchmark_results.append({
+        "name": f"import[{name}]",
+        "rounds": ROUNDS,
+        "min": fastest,
+        "mean": sum(run["elapsed"] for run in runs) / ROUNDS,
+        "http_requests": 0,
+        "subprocess_spawns": 0,
+    })
+
+
+def test_remote_modules_load_on_first_use():
+    statement = ("from git_diff_analyzer.services.repo_mapper import get_remote_service; "
+                 "get_remote_service('github')")
+    assert set(REMOTE_MODULES) <= set(_measure(statement)["modules"])
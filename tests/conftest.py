@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from git_diff_analyzer.cache import configure_cache, disable_cache
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+class GitRepo:
+    """Small helper to build real git repositories in tests."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(self.path)
+        self.git('init', '-q', '-b', 'main')
+
+    def git(self, *args):
+        result = subprocess.run(['git', *args], cwd=self.path, capture_output=True, text=True,
+                                env={**os.environ, **GIT_ENV}, check=True)
+        return result.stdout.strip()
+
+    def write(self, file_path, content):
+        full_path = os.path.join(self.path, file_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w') as file:
+            file.write(content)
+
+    def commit(self, message='commit'):
+        self.git('add', '-A')
+        self.git('commit', '-q', '--allow-empty', '-m', message)
+        return self.git('rev-parse', 'HEAD')
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """An empty git repository on branch main."""
+    return GitRepo(tmp_path / "repo")
+
+
+@pytest.fixture
+def result_cache(tmp_path):
+    """A result cache of 10 entries, configured for every caller until the test ends."""
+    yield configure_cache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    disable_cache()
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true",
+                     help="run the benchmarks with large synthetic repositories")
+    parser.addoption("--benchmark-json", metavar="PATH",
+                     help="write the benchmark results to a JSON file")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: slow benchmark, only run with --benchmark")
+    config.benchmark_results = []
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="needs --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config.benchmark_results
+    if not results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        f"{'name':<48} {'rounds':>6} {'min s':>9} {'mean s':>9} {'http':>7} {'spawns':>7}")
+    for result in results:
+        terminalreporter.write_line(
+            f"{result['name']:<48} {result['rounds']:>6} {result['min']:>9.3f} {result['mean']:>9.3f} "
+            f"{result['http_requests']:>7} {result['subprocess_spawns']:>7}")
+    path = config.getoption("--benchmark-json")
+    if path:
+        with open(path, 'w') as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from git_diff_analyzer.git_utils.cat_file import CatFileReader, get_object_reader, close_object_readers
+
+
+@pytest.fixture
+def repo_with_history(git_repo):
+    git_repo.write("file1.py", "print('a')\n")
+    git_repo.write("dir/file 2.txt", "text\n")
+    first = git_repo.commit("first")
+    git_repo.write("file1.py", "print('b')\n")
+    second = git_repo.commit("second")
+    return git_repo, first, second
+
+
+def test_object_info_resolves_refs_and_paths(repo_with_history):
+    repo, first, second = repo_with_history
+    with CatFileReader(repo.path) as reader:
+        assert reader.object_info("refs/heads/main").sha == second
+        info = reader.object_info(f"{first}:dir/file 2.txt")
+        assert info.type == "blob" and info.size == 5
+        assert info.sha == repo.git("rev-parse", f"{first}:dir/file 2.txt")
+
+
+def test_object_info_missing(repo_with_history):
+    repo, first, _ = repo_with_history
+    with CatFileReader(repo.path) as reader:
+        assert reader.object_info(f"{first}:missing.py") is None
+        assert reader.object_info("refs/heads/missing") is None
+
+
+def test_object_infos_pipelines_many_requests(repo_with_history, monkeypatch):
+    from git_diff_analyzer.git_utils import cat_file
+    monkeypatch.setattr(cat_file, "PIPELINE_DEPTH", 3)
+    repo, first, second = repo_with_history
+    revs = [f"{commit}:file1.py" for commit in (first, second)] * 4
+    with CatFileReader(repo.path) as reader:
+        infos = reader.object_infos(revs)
+    assert len(infos) == 8
+    assert infos[0].sha != infos[1].sha and infos[0] == infos[2]
+
+
+def test_read_object(repo_with_history):
+    repo, first, _ = repo_with_history
+    with CatFileReader(repo.path) as reader:
+        info, content = reader.read_object(f"{first}:file1.py")
+        assert content == b"print('a')\n" and info.size == len(content)
+        assert reader.read_object(f"{first}:missing.py") is None
+
+
+def test_reader_is_thread_safe(repo_with_history):
+    repo, first, second = repo_with_history
+    errors = []
+
+    def lookup(reader, commit):
+        expected = repo.git("rev-parse", f"{commit}:file1.py")
+        for _ in range(50):
+            if reader.object_info(f"{commit}:file1.py").sha != expected:
+                errors.append(commit)
+
+    with CatFileReader(repo.path) as reader:
+        threads = [threading.Thread(target=lookup, args=(reader, commit))
+                   for commit in (first, second) * 3]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert errors == []
+
+
+def test_invalid_revision_rejected(repo_with_history):
+    repo, _, _ = repo_with_history
+    with CatFileReader(repo.path) as reader:
+        with pytest.raises(ValueError):
+            reader.object_info("main\nHEAD")
+
+
+def test_reader_in_missing_repository():
+    with pytest.raises(ValueError):
+        CatFileReader("/path/to/missing/repo").object_info("HEAD")
+
+
+def test_get_object_reader_is_shared(repo_with_history):
+    repo, _, _ = repo_with_history
+    try:
+        assert get_object_reader(repo.path) is get_object_reader(repo.path + "/")
+    finally:
+        close_object_readers()
@@ -0,0 +1,171 @@
+import itertools
+import subprocess
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from git_diff_analyzer.git_utils.commit_index import (
+    CommitIndex, configure_commit_index, disable_commit_index, read_commit_graph)
+from git_diff_analyzer.git_utils.git_commands import get_merge_base, is_ancestor
+from git_diff_analyzer.services.remote_merge_base import find_remote_merge_base
+
+
+@pytest.fixture
+def merged_history(git_repo):
+    """Branches forking, merging and merging across each other (a criss-cross)."""
+    commits = {"root": git_repo.commit("root")}
+    commits["m1"] = git_repo.commit("m1")
+    git_repo.git("checkout", "-q", "-b", "feature")
+    commits["f1"] = git_repo.commit("f1")
+    git_repo.git("checkout", "-q", "-b", "other", "main")
+    commits["o1"] = git_repo.commit("o1")
+    git_repo.git("checkout", "-q", "main")
+    commits["m2"] = git_repo.commit("m2")
+    git_repo.git("merge", "-q", "--no-ff", "-m", "merge feature", "feature")
+    commits["merge"] = git_repo.git("rev-parse", "HEAD")
+    git_repo.git("checkout", "-q", "feature")
+    commits["f2"] = git_repo.commit("f2")
+    git_repo.git("merge", "-q", "--no-ff", "-m", "merge other", "other")
+    commits["cross-a"] = git_repo.git("rev-parse", "HEAD")
+    git_repo.git("checkout", "-q", "other")
+    git_repo.git("merge", "-q", "--no-ff", "-m", "merge feature", commits["f2"])
+    commits["cross-b"] = git_repo.git("rev-parse", "HEAD")
+    git_repo.git("checkout", "-q", "-b", "octopus", "main")
+    git_repo.git("merge", "-q", "--no-ff", "-m", "octopus", "feature", "other")
+    commits["octopus"] = git_repo.git("rev-parse", "HEAD")
+    git_repo.git("checkout", "-q", "main")
+    return git_repo, commits
+
+
+@pytest.fixture
+def configured_index(tmp_path):
+    yield configure_commit_index(str(tmp_path / "commits.sqlite3"))
+    disable_commit_index()
+
+
+def _git_merge_bases(repo, a, b):
+    try:
+        return set(repo.git("merge-base", "--all", a, b).split())
+    except subprocess.CalledProcessError:
+        return set()
+
+
+def test_queries_match_git(merged_history, tmp_path):
+    repo, commits = merged_history
+    index = CommitIndex(str(tmp_path / "commits.sqlite3"))
+    assert index.update(list(commits.values()), repo.path)
+
+    for a, b in itertools.product(commits.values(), repeat=2):
+        assert set(index.merge_bases(a, [b])) == _git_merge_bases(repo, a, b)
+        expected = subprocess.run(["git", "merge-base", "--is-ancestor", a, b], cwd=repo.path).returncode == 0
+        assert index.is_ancestor(a, b) == expected
+    assert len(index.merge_bases(commits["cross-a"], [commits["cross-b"]])) == 2
+    assert index.generation(commits["root"]) == 1
+    assert len(index.parents(commits["octopus"])) == 3
+
+
+def test_update_is_incremental_and_persistent(merged_history, tmp_path):
+    repo, commits = merged_history
+    path = str(tmp_path / "commits.sqlite3")
+    index = CommitIndex(path)
+    index.update([commits["merge"]], repo.path)
+    indexed = len(index)
+
+    new = repo.commit("new")
+    with patch.object(index, "_resolve", wraps=index._resolve) as resolve:
+        index.update([new], repo.path)
+    assert list(resolve.call_args.args[0]) == [new]
+    assert len(index) == indexed + 1
+
+    with patch("subprocess.run", side_effect=AssertionError("ran git")):
+        reopened = CommitIndex(path)
+        assert reopened.update([new, commits["m1"]], repo.path)
+        assert reopened.merge_base(new, [commits["f1"]]) == commits["f1"]
+    index.close()
+    reopened.close()
+
+
+def test_update_imports_the_commit_graph(merged_history, tmp_path):
+    repo, commits = merged_history
+    repo.git("commit-graph", "write", "--reachable")
+    index = CommitIndex(str(tmp_path / "graph.sqlite3"))
+    with patch.object(index, "_import_rev_list") as import_rev_list:
+        index.update([commits["octopus"], commits["cross-b"]], repo.path)
+    import_rev_list.assert_not_called()
+
+    walked = CommitIndex(str(tmp_path / "walked.sqlite3"))
+    walked.update(list(commits.values()), repo.path)
+    for sha in commits.values():
+        assert index.generation(sha) == walked.generation(sha)
+        assert index.parents(sha) == walked.parents(sha)
+
+
+def test_read_commit_graph_follows_split_chains(merged_history):
+    repo, commits = merged_history
+    repo.git("commit-graph", "write", "--reachable", "--split")
+    repo.git("checkout", "-q", "octopus")
+    newer = repo.commit("newer")
+    repo.git("commit-graph", "write", "--reachable", "--split=no-merge")
+    chain = f"{repo.path}/.git/objects/info/commit-graphs/commit-graph-chain"
+    with open(chain) as file:
+        paths = [f"{repo.path}/.git/objects/info/commit-graphs/graph-{name}.graph" for name in file.read().split()]
+    assert len(paths) == 2
+
+    graph = read_commit_graph(paths)
+    assert graph[newer] == (graph[commits["octopus"]][0] + 1, (commits["octopus"],))
+    assert set(graph[commits["octopus"]][1]) == {commits["merge"], commits["cross-a"], commits["cross-b"]}
+
+
+def test_add_commits_indexes_remote_history(merged_history, tmp_path):
+    repo, commits = merged_history
+    index = CommitIndex(str(tmp_path / "commits.sqlite3"))
+    index.update([commits["m2"]], repo.path)
+    remote = [("r3", ["r2"]), ("r2", ["r1", commits["m1"]]), ("r1", [commits["m2"]]), ("lost", ["unknown"])]
+
+    assert index.add_commits(remote) == 3
+    assert "lost" not in index
+    assert index.merge_base("r3", [commits["m2"]]) == commits["m2"]
+    assert index.is_ancestor(commits["root"], "r3")
+    assert not index.is_ancestor("r3", commits["m2"])
+
+
+def test_update_skips_shallow_repositories(merged_history, tmp_path):
+    repo, commits = merged_history
+    shallow = tmp_path / "shallow"
+    subprocess.run(["git", "clone", "-q", "--depth=1", f"file://{repo.path}", str(shallow)], check=True)
+    index = CommitIndex(str(tmp_path / "commits.sqlite3"))
+    assert not index.update([commits["merge"]], str(shallow))
+    assert len(index) == 0
+
+
+def test_git_commands_use_the_index(merged_history, configured_index):
+    repo, commits = merged_history
+    assert get_merge_base("main", "other", repo.path) == repo.git("merge-base", "main", "other")
+    assert commits["merge"] in configured_index
+    with patch("git_diff_analyzer.git_utils.git_commands.run_git_command",
+               side_effect=AssertionError("ran git")):
+        assert is_ancestor(commits["m1"], commits["merge"], repo.path)
+        assert not is_ancestor(commits["o1"], commits["merge"], repo.path)
+
+
+def test_is_ancestor_without_index(merged_history):
+    repo, commits = merged_history
+    assert is_ancestor(commits["m1"], "main", repo.path)
+    assert not is_ancestor(commits["o1"], "main", repo.path)
+
+
+def test_remote_walk_is_indexed_and_reused(merged_history, configured_index):
+    repo, commits = merged_history
+    r1, r2, r3 = (f"{n:040x}" for n in range(1, 4))
+    remote = MagicMock()
+    remote.get_merge_base.side_effect = ValueError("Not Found")
+    remote.iter_commit_parents.side_effect = lambda commit: iter(
+        [(r2, [r1]), (r1, [commits["m2"]]), (commits["m2"], [commits["m1"]])])
+
+    assert find_remote_merge_base(remote, r2, commits["f1"], repo.path) == commits["m1"]
+    assert r2 in configured_index and r1 in configured_index
+
+    # The next walk stops at the commits indexed by the first one
+    remote.iter_commit_parents.side_effect = lambda commit: iter([(r3, [r2])])
+    assert find_remote_merge_base(remote, r3, commits["o1"], repo.path) == commits["m1"]
+    assert configured_index.is_ancestor(r2, r3)
@@ -1,5 +1,8 @@
+import sys
+
 import pytest
 from unittest.mock import patch, Mock
+from git_diff_analyzer.git_utils.cat_file import ObjectInfo
 from git_diff_analyzer.git_utils.git_commands import *
 
 
@@ -47,18 +50,21 @@ def test_get_merge_base_failure(mock_run_git_command):
         get_merge_base('branchA', 'branchB', '/path/to/repo')
 
 
-@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
-def test_get_local_last_commit_success(mock_run_git_command):
+@patch('git_diff_analyzer.git_utils.git_commands.get_object_reader')
+def test_get_local_last_commit_success(mock_get_object_reader):
     """Test successful retrieval of the last commit hash."""
-    mock_run_git_command.return_value = "abc123"
+    mock_get_object_reader.return_value.object_infos.return_value = [
+        ObjectInfo("abc123", "commit", 200)]
     commit_hash = get_local_last_commit("main", "/path/to/repo")
     assert commit_hash == "abc123"
+    mock_get_object_reader.return_value.object_infos.assert_called_once_with(
+        ["refs/heads/main^{commit}"])
 
 
-@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
-def test_get_local_last_commit_failure(mock_run_git_command):
+@patch('git_diff_analyzer.git_utils.git_commands.get_object_reader')
+def test_get_local_last_commit_failure(mock_get_object_reader):
     """Test failure in retrieving the last commit hash."""
-    mock_run_git_command.side_effect = ValueError("Error message")
+    mock_get_object_reader.return_value.object_infos.return_value = [None]
     with pytest.raises(ValueError):
         get_local_last_commit("main", "/path/to/repo")
 
@@ -80,26 +86,41 @@ def test_get_changed_files_failure(mock_run_git_command):
         get_changed_files("/path/to/repo", "abc123", "def456")
 
 
-@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
-def test_get_file_exists_success(mock_run_git_command):
+@patch('git_diff_analyzer.git_utils.git_commands.get_object_reader')
+def test_get_file_exists_success(mock_get_object_reader):
     """Test successful file existence check."""
-    mock_run_git_command.return_value = "100644 blob abc123\tfile1.py"
+    mock_get_object_reader.return_value.object_info.return_value = ObjectInfo("abc123", "blob", 10)
     assert get_file_exists("abc123", "file1.py", "/path/to/repo") is True
+    mock_get_object_reader.return_value.object_info.assert_called_once_with("abc123:file1.py")
 
 
-@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
-def test_get_file_exists_failure(mock_run_git_command):
+@patch('git_diff_analyzer.git_utils.git_commands.get_object_reader')
+def test_get_file_exists_failure(mock_get_object_reader):
     """Test failure in file existence check."""
-    mock_run_git_command.side_effect = ValueError("Error message")
+    mock_get_object_reader.return_value.object_info.side_effect = ValueError("Error message")
     with pytest.raises(ValueError):
         get_file_exists("abc123", "file1.py", "/path/to/repo")
 
 
-@patch('git_diff_analyzer.git_utils.git_commands.get_file_exists')
+def test_is_diff_real_blobs(git_repo):
+    """Test comparing files by size and blob SHA, including binary content."""
+    git_repo.write("asset.bin", "\x00" * 100000)
+    git_repo.write("same.txt", "same\n")
+    first = git_repo.commit("first")
+    git_repo.write("asset.bin", "\x00" * 99999 + "\x01")
+    second = git_repo.commit("second")
+
+    assert is_diff(first, "asset.bin", second, "asset.bin", git_repo.path) is True
+    assert is_diff(first, "same.txt", second, "same.txt", git_repo.path) is False
+    with pytest.raises(FileNotFoundError):
+        is_diff(first, "missing.txt", second, "same.txt", git_repo.path)
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.get_blob_sha')
 @patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
-def test_get_diff_file_exists(mock_run_git_command, mock_get_file_exists):
+def test_get_diff_file_exists(mock_run_git_command, mock_get_blob_sha):
     """Test successful diff retrieval when files exist."""
-    mock_get_file_exists.side_effect = [True, True]
+    mock_get_blob_sha.side_effect = ["blob1", "blob2"]
     mock_run_git_command.return_value = "diff output"
 
     diff = get_diff("abc123", "file1.py", "def456",
@@ -107,9 +128,198 @@ def test_get_diff_file_exists(mock_run_git_command, mock_get_file_exists):
     assert diff == "diff output"
 
 
-@patch('git_diff_analyzer.git_utils.git_commands.get_file_exists')
-def test_get_diff_file_not_exists(mock_get_file_exists):
+@patch('git_diff_analyzer.git_utils.git_commands.get_blob_sha')
+@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
+def test_get_diff_same_blob(mock_run_git_command, mock_get_blob_sha):
+    """Test that identical blobs are reported without running git diff."""
+    mock_get_blob_sha.side_effect = ["blob1", "blob1"]
+
+    assert get_diff("abc123", "file1.py", "def456", "file1.py", "/path/to/repo") == ''
+    mock_run_git_command.assert_not_called()
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.get_blob_sha')
+def test_get_diff_file_not_exists(mock_get_blob_sha):
     """Test failure in diff retrieval when files do not exist."""
-    mock_get_file_exists.side_effect = [False, False]
+    mock_get_blob_sha.side_effect = [None, None]
     with pytest.raises(FileNotFoundError):
         get_diff("abc123", "file1.py", "def456", "file1.py", "/path/to/repo")
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
+def test_get_changed_entries_success(mock_run_git_command):
+    """Test parsing of raw diff-tree output into changed entries."""
+    sha_a, sha_b = 'a' * 40, 'b' * 40
+    null = '0' * 40
+    mock_run_git_command.return_value = (
+        f":100644 100644 {sha_a} {sha_b} M\0file1.py\0"
+        f":000000 100644 {null} {sha_b} A\0dir/new file.py\0"
+        f":100644 000000 {sha_a} {null} D\0old.py\0"
+        f":100644 100755 {sha_a} {sha_a} M\0mode_only.sh\0"
+    )
+
+    entries = get_changed_entries("/path/to/repo", "abc123", "def456")
+
+    assert entries == [
+        ChangedFile('file1.py', 'modified', sha_a, sha_b, '100644', '100644'),
+        ChangedFile('dir/new file.py', 'added', None, sha_b, None, '100644'),
+        ChangedFile('old.py', 'deleted', sha_a, None, '100644', None),
+    ]
+    command = mock_run_git_command.call_args[0][0]
+    assert command[:2] == ['git', 'diff-tree'] and '-z' in command
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
+def test_get_changed_entries_renames_and_copies(mock_run_git_command):
+    """Test that renames and copies are parsed with both of their paths."""
+    sha_a, sha_b = 'a' * 40, 'b' * 40
+    mock_run_git_command.return_value = (
+        f":100644 100644 {sha_a} {sha_a} R100\0old.py\0new.py\0"
+        f":100644 100644 {sha_a} {sha_b} C075\0src.py\0copy.py\0"
+        f":100644 100644 {sha_a} {sha_b} M\0src.py\0"
+    )
+
+    entries = get_changed_entries("/path/to/repo", "abc123", "def456")
+
+    assert entries == [
+        ChangedFile('new.py', 'renamed', sha_a, sha_a, '100644', '100644', 'old.py'),
+        ChangedFile('copy.py', 'copied', sha_a, sha_b, '100644', '100644', 'src.py'),
+        ChangedFile('src.py', 'modified', sha_a, sha_b, '100644', '100644'),
+    ]
+    assert [entry.base_path for entry in entries] == ['old.py', 'copy.py', 'src.py']
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
+def test_get_changed_entries_failure(mock_run_git_command):
+    """Test failure in retrieving changed entries."""
+    mock_run_git_command.side_effect = ValueError("Error message")
+
+    with pytest.raises(ValueError, match="Failed to get changed entries"):
+        get_changed_entries("/path/to/repo", "abc123", "def456")
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.get_object_reader')
+@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
+def test_get_merge_base_cached(mock_run_git_command, mock_get_object_reader, result_cache):
+    """Test that the merge base of two resolved commits is computed once."""
+    commit_a, commit_b, base = 'a' * 40, 'b' * 40, 'c' * 40
+    mock_get_object_reader.return_value.object_infos.return_value = [
+        ObjectInfo(commit_a, "commit", 200), ObjectInfo(commit_b, "commit", 200)]
+    mock_run_git_command.return_value = base
+
+    assert get_merge_base('branchA', 'branchB', '/path/to/repo') == base
+    assert get_merge_base('branchA', 'branchB', '/path/to/repo') == base
+    mock_run_git_command.assert_called_once_with(['git', 'merge-base', commit_a, commit_b], '/path/to/repo')
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
+def test_get_changed_entries_cached(mock_run_git_command, result_cache):
+    """Test that changed entries between two commit SHAs are served from the cache."""
+    sha_a, sha_b = 'a' * 40, 'b' * 40
+    mock_run_git_command.return_value = f":100644 100644 {sha_a} {sha_b} M\0file1.py\0"
+
+    first = get_changed_entries("/path/to/repo", sha_a, sha_b)
+    second = get_changed_entries("/path/to/repo", sha_a, sha_b)
+
+    assert first == second == [ChangedFile('file1.py', 'modified', sha_a, sha_b, '100644', '100644')]
+    mock_run_git_command.assert_called_once()
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.get_object_reader')
+def test_get_blob_sha_cached(mock_get_object_reader, result_cache):
+    """Test that blob lookups by commit SHA and path are cached, including missing files."""
+    commit = 'a' * 40
+    mock_object_info = mock_get_object_reader.return_value.object_info
+    mock_object_info.side_effect = [ObjectInfo("abc123", "blob", 10), None]
+
+    assert get_blob_sha(commit, "file1.py", "/path/to/repo") == "abc123"
+    assert get_blob_sha(commit, "file1.py", "/path/to/repo") == "abc123"
+    assert get_blob_sha(commit, "missing.py", "/path/to/repo") is None
+    assert get_blob_sha(commit, "missing.py", "/path/to/repo") is None
+    assert mock_object_info.call_count == 2
+
+
+@patch('git_diff_analyzer.git_utils.git_commands.run_git_command')
+def test_get_changed_entries_interns_paths(mock_run_git_command):
+    """Test that parsed paths share one string object with other occurrences of the path."""
+    sha_a, sha_b = 'a' * 40, 'b' * 40
+    mock_run_git_command.return_value = f":100644 100644 {sha_a} {sha_b} M\0src/module.py\0"
+
+    entry = get_changed_entries("/path/to/repo", "abc123", "def456")[0]
+
+    assert entry.path is sys.intern(''.join(['src/', 'module.py']))
+
+
+def test_iter_changed_entries_streams_real_diff(git_repo):
+    """Test streaming the changed entries between two commits of a real repository."""
+    git_repo.write("keep.txt", "same\n")
+    git_repo.write("edit.txt", "one\n")
+    git_repo.write("gone.txt", "bye\n")
+    base = git_repo.commit("base")
+    git_repo.write("edit.txt", "two\n")
+    git_repo.write("dir/new file.txt", "hi\n")
+    git_repo.git("rm", "-q", "gone.txt")
+    head = git_repo.commit("head")
+
+    entries = list(iter_changed_entries(git_repo.path, base, head))
+
+    assert [(entry.path, entry.status) for entry in entries] == [
+        ("dir/new file.txt", "added"), ("edit.txt", "modified"), ("gone.txt", "deleted")]
+    assert entries == get_changed_entries(git_repo.path, base, head)
+
+
+def test_changed_entries_pathspecs(git_repo):
+    """Test that glob pathspecs are applied by git to the diff."""
+    git_repo.write("src/app.py", "one\n")
+    git_repo.write("src/vendor/lib.py", "one\n")
+    git_repo.write("README.md", "one\n")
+    base = git_repo.commit("base")
+    git_repo.write("src/app.py", "two\n")
+    git_repo.write("src/vendor/lib.py", "two\n")
+    git_repo.write("README.md", "two\n")
+    head = git_repo.commit("head")
+    pathspecs = [":(glob)src/**", ":(glob,exclude)**/vendor/**"]
+
+    entries = get_changed_entries(git_repo.path, base, head, pathspecs)
+
+    assert [entry.path for entry in entries] == ["src/app.py"]
+    assert [entry.path for entry in iter_changed_entries(git_repo.path, base, head, pathspecs)] == ["src/app.py"]
+    assert [path for path, _ in iter_changed_hunks(git_repo.path, base, head, pathspecs)] == ["src/app.py"]
+
+
+def test_iter_changed_entries_failure(git_repo):
+    """Test that a failing diff-tree is reported as ValueError."""
+    with pytest.raises(ValueError, match="Failed to get changed entries"):
+        list(iter_changed_entries(git_repo.path, "missing1", "missing2"))
+
+
+def test_changed_entries_and_hunks_follow_renames(git_repo):
+    """Test that a renamed and edited file is one entry, with hunks under its new path."""
+    git_repo.write("old.txt", "".join(f"line {n}\n" for n in range(1, 21)))
+    base = git_repo.commit("base")
+    git_repo.git("mv", "old.txt", "new.txt")
+    git_repo.write("new.txt", "".join(
+        f"line {n}\n" if n != 5 else "changed\n" for n in range(1, 21)))
+    head = git_repo.commit("head")
+
+    entries = list(iter_changed_entries(git_repo.path, base, head))
+    hunks = dict(iter_changed_hunks(git_repo.path, base, head))
+
+    assert [(entry.path, entry.status, entry.old_path) for entry in entries] == [
+        ("new.txt", "renamed", "old.txt")]
+    assert hunks == {"new.txt": [(5, 5)]}
+
+
+def test_iter_changed_hunks_real_diff(git_repo):
+    """Test that hunk ranges of the base version are read from a real diff."""
+    git_repo.write("edit.txt", "".join(f"line {n}\n" for n in range(1, 11)))
+    git_repo.write("image.bin", "\x00\x01")
+    base = git_repo.commit("base")
+    git_repo.write("edit.txt", "".join(
+        f"line {n}\n" if n != 3 else "changed\n" for n in range(1, 11)) + "appended\n")
+    git_repo.write("image.bin", "\x00\x02")
+    head = git_repo.commit("head")
+
+    hunks = dict(iter_changed_hunks(git_repo.path, base, head))
+
+    assert hunks == {"edit.txt": [(3, 3), (10, 10)], "image.bin": None}
@@ -0,0 +1,105 @@
+import subprocess
+
+import pytest
+from unittest.mock import patch
+
+from git_diff_analyzer.git_utils import cat_file
+from git_diff_analyzer.git_utils.cat_file import CatFileReader, configure_backend, get_object_reader
+from git_diff_analyzer.git_utils.git_commands import (
+    get_blob_sha, get_changed_entries, get_local_last_commit, iter_changed_entries, _diff_tree_command,
+    _parse_raw_diff)
+from git_diff_analyzer.git_utils.object_store import ObjectStore
+
+
+@pytest.fixture(params=["loose", "ofs-delta", "ref-delta"])
+def repo_with_history(request, git_repo):
+    """A repository whose objects are loose, or packed with offset or SHA delta bases."""
+    lines = []
+    commits = []
+    for n in range(12):
+        lines.append(f"line {n} " + "x" * 60 + "\n")
+        git_repo.write("grow.txt", "".join(lines))
+        git_repo.write(f"dir/sub/file{n % 3}.py", f"print({n})\n")
+        commits.append(git_repo.commit(f"commit {n}"))
+    git_repo.git("rm", "-q", "dir/sub/file0.py")
+    git_repo.write("dir/new file.txt", "new\n")
+    commits.append(git_repo.commit("last"))
+    git_repo.git("tag", "-a", "v1", "-m", "release", commits[5])
+    git_repo.git("checkout", "-q", "-b", "feature")
+    if request.param == "ofs-delta":
+        git_repo.git("repack", "-q", "-a", "-d", "-f")
+        git_repo.git("pack-refs", "--all")
+    elif request.param == "ref-delta":
+        git_repo.git("-c", "repack.useDeltaBaseOffset=false", "repack", "-q", "-a", "-d", "-f")
+    return git_repo, commits
+
+
+def test_object_info_matches_cat_file(repo_with_history):
+    repo, commits = repo_with_history
+    revs = ["refs/heads/main", "main", "HEAD", "v1", "v1^{commit}", "tags/v1",
+            f"{commits[3]}^{{commit}}", f"{commits[3]}^{{tree}}", f"{commits[7]}:grow.txt",
+            f"{commits[7]}:dir/sub", f"{commits[-1]}:dir/new file.txt", f"{commits[-1]}:dir/sub/file0.py",
+            "refs/heads/missing", "0" * 40, f"{commits[2]}:missing.py"]
+    with CatFileReader(repo.path) as reader, ObjectStore(repo.path) as store:
+        assert store.object_infos(revs) == reader.object_infos(revs)
+
+
+def test_read_object_rebuilds_deltas(repo_with_history):
+    repo, commits = repo_with_history
+    with CatFileReader(repo.path) as reader, ObjectStore(repo.path) as store:
+        for commit in commits:
+            for rev in (f"{commit}:grow.txt", commit, f"{commit}^{{tree}}"):
+                assert store.read_object(rev) == reader.read_object(rev)
+        assert store.read_object(f"{commits[0]}:missing.py") is None
+
+
+def test_iter_changed_entries_matches_diff_tree(repo_with_history):
+    repo, commits = repo_with_history
+    expected = _parse_raw_diff(repo.git(*_diff_tree_command(commits[0], commits[-1])[1:]) + "\0")
+    with ObjectStore(repo.path) as store:
+        entries = list(store.iter_changed_entries(commits[0], commits[-1]))
+    assert sorted(entries) == sorted(expected)
+    with pytest.raises(ValueError, match="Unknown revision"):
+        ObjectStore(repo.path).iter_changed_entries("missing", commits[-1])
+
+
+def test_refs_and_packs_are_reread(git_repo):
+    git_repo.write("a.txt", "a\n")
+    first = git_repo.commit("first")
+    with ObjectStore(git_repo.path) as store:
+        assert store.object_info("main").sha == first
+        git_repo.git("pack-refs", "--all")
+        git_repo.write("a.txt", "b\n")
+        second = git_repo.commit("second")
+        git_repo.git("repack", "-q", "-a", "-d")
+        assert store.object_info("refs/heads/main").sha == second
+        assert store.read_object(f"{second}:a.txt")[1] == b"b\n"
+
+
+@pytest.fixture
+def python_backend():
+    configure_backend("python")
+    yield
+    configure_backend("git")
+
+
+def test_python_backend_runs_no_subprocesses(repo_with_history, python_backend):
+    repo, commits = repo_with_history
+    expected_blob = repo.git("rev-parse", f"{commits[4]}:grow.txt")
+    expected_head = repo.git("rev-parse", "feature")
+    with patch.object(subprocess, "Popen", side_effect=AssertionError("git was started")), \
+            patch.object(subprocess, "run", side_effect=AssertionError("git was started")):
+        assert isinstance(get_object_reader(repo.path), ObjectStore)
+        assert get_local_last_commit("feature", repo.path) == expected_head
+        assert get_blob_sha(commits[4], "grow.txt", repo.path) == expected_blob
+        entries = get_changed_entries(repo.path, commits[0], commits[-1], [":(glob)dir/**"])
+        assert sorted(entry.path for entry in entries) == [
+            "dir/new file.txt", "dir/sub/file0.py", "dir/sub/file1.py", "dir/sub/file2.py"]
+        assert list(iter_changed_entries(repo.path, commits[0], commits[-1])) == \
+            get_changed_entries(repo.path, commits[0], commits[-1])
+
+
+def test_configure_backend_rejects_unknown():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        configure_backend("svn")
+    assert cat_file.get_backend() in cat_file.BACKENDS
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import patch, Mock
 from git_diff_analyzer.remote.github_api import GithubAPI
+from git_diff_analyzer.path_filter import PathFilter
 
 
 @pytest.fixture
@@ -99,18 +100,266 @@ def test_get_file_content_failure(mock_make_request, github_api):
         github_api.get_file_content("commit_sha", "file_path")
 
 
-@patch("git_diff_analyzer.remote.github_api.GithubAPI.get_file_content")
-def test_is_diff_different(mock_get_file_content, github_api):
-    """Test successful diff check between two files."""
-    mock_get_file_content.side_effect = ["file1 content", "file2 content"]
-    is_diff = github_api.is_diff("commit1", "file1", "commit2", "file2")
-    assert is_diff is True
+def _contents_response(data):
+    response = Mock()
+    response.json.return_value = data
+    return response
 
 
-@patch("git_diff_analyzer.remote.github_api.GithubAPI.get_file_content")
-def test_is_diff_same(mock_get_file_content, github_api):
-    """Test failed diff check when file content fetch fails."""
-    mock_get_file_content.side_effect = [
-        ValueError("File not found"), "file2 content"]
-    result = github_api.is_diff("commit1", "file1", "commit2", "file2")
-    assert result is False
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_is_diff_compares_blob_shas(mock_make_request, github_api):
+    """Test that large files are compared by their metadata without reading contents."""
+    big = 300 * 1024 * 1024
+    mock_make_request.side_effect = lambda method, endpoint, params=None: _contents_response(
+        {"type": "file", "size": big, "sha": "sha-" + params["ref"], "content": "", "encoding": "none"})
+
+    assert github_api.is_diff("commit1", "asset.bin", "commit2", "asset.bin") is True
+    assert github_api.is_diff("commit1", "asset.bin", "commit1", "asset.bin") is False
+    assert {call.args[1] for call in mock_make_request.call_args_list} == {"contents/asset.bin"}
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_is_diff_different_sizes(mock_make_request, github_api):
+    mock_make_request.side_effect = [_contents_response({"size": 1}), _contents_response({"size": 2})]
+
+    assert github_api.is_diff("commit1", "file1", "commit2", "file2") is True
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_is_diff_streams_without_sha(mock_make_request, github_api):
+    """Test that contents are streamed in chunks and hashed when a SHA is missing."""
+    def make_request(method, endpoint, params=None, accept=None, stream=False):
+        if not stream:
+            return _contents_response({"size": 6, "sha": "abc" if params["ref"] == "c2" else None})
+        response = Mock()
+        response.iter_content.side_effect = lambda chunk_size: iter([b"sam", b"e!"])
+        return response
+    mock_make_request.side_effect = make_request
+
+    assert github_api.is_diff("c1", "file", "c2", "file") is False
+    streamed = sorted(call.args[1] for call in mock_make_request.call_args_list if call.kwargs.get("stream"))
+    assert streamed == ["contents/file", "git/blobs/abc"]
+    assert all(call.kwargs["accept"] == "application/vnd.github.raw"
+               for call in mock_make_request.call_args_list if call.kwargs.get("stream"))
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_is_diff_missing_file(mock_make_request, github_api):
+    """Test that a missing file is reported as FileNotFoundError."""
+    mock_make_request.side_effect = ValueError("GitHub API request failed: Not Found")
+    with pytest.raises(FileNotFoundError):
+        github_api.is_diff("commit1", "file1", "commit2", "file2")
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_get_changed_entries_success(mock_make_request, github_api):
+    """Test building changed entries from compare metadata without content requests."""
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {
+        "files": [
+            {"filename": "file1.py", "status": "modified", "sha": "sha1"},
+            {"filename": "file2.py", "status": "added", "sha": "sha2"},
+            {"filename": "file3.py", "status": "removed", "sha": "sha3"},
+            {"filename": "new.py", "status": "renamed", "sha": "sha4",
+             "previous_filename": "old.py"},
+            {"filename": "copy.py", "status": "copied", "sha": "sha6",
+             "previous_filename": "file1.py"},
+            {"filename": "run.sh", "status": "changed", "sha": "sha5", "changes": 0},
+        ]
+    }
+    mock_response.links = {}
+    mock_make_request.return_value = mock_response
+
+    entries = github_api.get_changed_entries("base_commit_hash", "commit_hash")
+
+    assert [(e.path, e.status, e.new_sha, e.old_path) for e in entries] == [
+        ("file1.py", "modified", "sha1", None),
+        ("file2.py", "added", "sha2", None),
+        ("file3.py", "deleted", None, None),
+        ("new.py", "renamed", "sha4", "old.py"),
+        ("copy.py", "copied", "sha6", "file1.py"),
+    ]
+    mock_make_request.assert_called_once()
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_get_changed_entries_failure(mock_make_request, github_api):
+    """Test failed fetch of changed entries when GitHub API returns an error."""
+    mock_make_request.side_effect = ValueError("Not Found")
+    with pytest.raises(ValueError, match="Failed to fetch changed files."):
+        github_api.get_changed_entries("base_commit_hash", "commit_hash")
+
+
+def _compare_response(files):
+    response = Mock()
+    response.json.return_value = {"files": files}
+    # The Link header of a comparison pages through its commits, not its files
+    response.links = {"next": {"url": "next"}}
+    return response
+
+
+def _json_response(data):
+    response = Mock()
+    response.json.return_value = data
+    return response
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_iter_changed_entries_reads_the_first_page(mock_make_request, github_api):
+    """Test that the files of a comparison are read from a single request."""
+    mock_make_request.return_value = _compare_response([
+        {"filename": "a.py", "status": "modified", "sha": "1"},
+        {"filename": "b.py", "status": "added", "sha": "2"},
+    ])
+
+    entries = list(github_api.iter_changed_entries("base", "head"))
+
+    assert [entry.path for entry in entries] == ["a.py", "b.py"]
+    mock_make_request.assert_called_once_with("GET", "compare/base...head", {"per_page": 1})
+
+
+@patch("git_diff_analyzer.remote.github_api.COMPARE_FILES_LIMIT", 2)
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_iter_changed_entries_falls_back_to_tree_diff(mock_make_request, github_api):
+    """Test that a truncated compare is completed by walking the git trees."""
+    trees = {
+        "root1": [{"path": "a.py", "type": "blob", "sha": "a1", "mode": "100644"},
+                  {"path": "src", "type": "tree", "sha": "src1", "mode": "040000"}],
+        "root2": [{"path": "a.py", "type": "blob", "sha": "a2", "mode": "100644"},
+                  {"path": "src", "type": "tree", "sha": "src2", "mode": "040000"}],
+        "src1": [{"path": "same.py", "type": "blob", "sha": "s", "mode": "100644"},
+                 {"path": "gone.py", "type": "blob", "sha": "g", "mode": "100644"}],
+        "src2": [{"path": "same.py", "type": "blob", "sha": "s", "mode": "100644"},
+                 {"path": "new.py", "type": "blob", "sha": "n", "mode": "100644"}],
+    }
+
+    def make_request(method, endpoint, params=None):
+        if endpoint.startswith("compare/"):
+            return _compare_response([{"filename": "a.py", "status": "modified", "sha": "a2"},
+                                      {"filename": "src/new.py", "status": "added", "sha": "n"}])
+        if endpoint.startswith("git/commits/"):
+            root = "root1" if endpoint.endswith("base") else "root2"
+            return _json_response({"tree": {"sha": root}})
+        return _json_response({"tree": trees[endpoint.split("/")[-1]]})
+    mock_make_request.side_effect = make_request
+
+    entries = list(github_api.iter_changed_entries("base", "head"))
+
+    assert [(entry.path, entry.status) for entry in entries] == [
+        ("a.py", "modified"), ("src/new.py", "added"), ("src/gone.py", "deleted")]
+
+
+@patch("git_diff_analyzer.remote.github_api.COMPARE_FILES_LIMIT", 2)
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_iter_changed_entries_path_filter(mock_make_request, github_api):
+    """Test that filtered paths are dropped and excluded subtrees are never listed."""
+    trees = {
+        "root1": [{"path": "src", "type": "tree", "sha": "src1", "mode": "040000"},
+                  {"path": "vendor", "type": "tree", "sha": "vendor1", "mode": "040000"}],
+        "root2": [{"path": "src", "type": "tree", "sha": "src2", "mode": "040000"},
+                  {"path": "vendor", "type": "tree", "sha": "vendor2", "mode": "040000"}],
+        "src1": [{"path": "a.py", "type": "blob", "sha": "a1", "mode": "100644"}],
+        "src2": [{"path": "a.py", "type": "blob", "sha": "a2", "mode": "100644"},
+                 {"path": "b.py", "type": "blob", "sha": "b", "mode": "100644"},
+                 {"path": "c.min.js", "type": "blob", "sha": "c", "mode": "100644"}],
+    }
+
+    def make_request(method, endpoint, params=None):
+        if endpoint.startswith("compare/"):
+            return _compare_response([{"filename": "src/a.py", "status": "modified", "sha": "a2"},
+                                      {"filename": "vendor/lib.py", "status": "modified", "sha": "v2"}])
+        if endpoint.startswith("git/commits/"):
+            root = "root1" if endpoint.endswith("base") else "root2"
+            return _json_response({"tree": {"sha": root}})
+        return _json_response({"tree": trees[endpoint.split("/")[-1]]})
+    mock_make_request.side_effect = make_request
+
+    entries = list(github_api.iter_changed_entries(
+        "base", "head", path_filter=PathFilter(skip_generated=True)))
+
+    assert [entry.path for entry in entries] == ["src/a.py", "src/b.py"]
+    listed = [call.args[1] for call in mock_make_request.call_args_list]
+    assert "git/trees/vendor1" not in listed and "git/trees/vendor2" not in listed
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_iter_changed_patches(mock_make_request, github_api):
+    """Test that each compare entry is paired with its patch."""
+    mock_make_request.return_value = _compare_response([
+        {"filename": "a.py", "status": "modified", "sha": "1", "patch": "@@ -1 +1 @@\n-a\n+b"},
+        {"filename": "logo.png", "status": "modified", "sha": "2"},
+        {"filename": "new.py", "previous_filename": "old.py", "status": "renamed", "sha": "3",
+         "patch": "@@ -1 +1 @@\n-c\n+d"},
+        {"filename": "moved.py", "previous_filename": "kept.py", "status": "renamed", "sha": "4",
+         "changes": 0},
+    ])
+
+    patches = [(entry.path, entry.status, patch)
+               for entry, patch in github_api.iter_changed_patches("base", "head")]
+
+    assert patches == [
+        ("a.py", "modified", "@@ -1 +1 @@\n-a\n+b"), ("logo.png", "modified", None),
+        ("new.py", "renamed", "@@ -1 +1 @@\n-c\n+d"), ("moved.py", "renamed", "")]
+
+
+def test_make_request_uses_shared_session(github_api):
+    """Test that requests go through the pooled session."""
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.headers = {}
+    with patch.object(github_api.session, "request", return_value=mock_response) as mock_request:
+        assert github_api._make_request("GET", "branches/main") is mock_response
+    mock_request.assert_called_once_with(
+        "GET", "https://api.github.com/repos/owner/repo/branches/main",
+        headers={"Authorization": "token access_token"}, params=None, json=None, stream=False,
+        timeout=None)
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI.get_latest_commit")
+def test_get_latest_commits_concurrently(mock_get_latest_commit, github_api):
+    """Test fetching the heads of several branches on the thread pool."""
+    mock_get_latest_commit.side_effect = lambda branch: f"sha-{branch}"
+
+    commits = github_api.get_latest_commits(["main", "release"])
+    github_api.close()
+
+    assert commits == {"main": "sha-main", "release": "sha-release"}
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_iter_changed_entries_cached(mock_make_request, github_api, result_cache):
+    """Test that a comparison between two commit SHAs is fetched once."""
+    mock_make_request.return_value = _compare_response(
+        [{"filename": "a.py", "status": "modified", "sha": "1"}])
+    first = list(github_api.iter_changed_entries("a" * 40, "b" * 40))
+    second = list(github_api.iter_changed_entries("a" * 40, "b" * 40))
+
+    assert first == second
+    mock_make_request.assert_called_once()
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_get_merge_base(mock_make_request, github_api):
+    """Test reading the merge base of a comparison."""
+    mock_make_request.return_value.json.return_value = {"merge_base_commit": {"sha": "base"}}
+
+    assert github_api.get_merge_base("remote", "local") == "base"
+    mock_make_request.assert_called_once_with("GET", "compare/remote...local", {"per_page": 1})
+
+
+@patch("git_diff_analyzer.remote.github_api.GithubAPI._make_request")
+def test_iter_commit_parents_is_lazy(mock_make_request, github_api):
+    """Test that the next page of history is only requested once the first is consumed."""
+    first, second = Mock(), Mock()
+    first.json.return_value = [{"sha": "c2", "parents": [{"sha": "c1"}]}]
+    first.links = {"next": {"url": "next"}}
+    second.json.return_value = [{"sha": "c1", "parents": []}]
+    second.links = {}
+    mock_make_request.side_effect = [first, second]
+
+    commits = github_api.iter_commit_parents("c2")
+
+    assert next(commits) == ("c2", ["c1"])
+    assert mock_make_request.call_count == 1
+    assert list(commits) == [("c1", [])]
@@ -0,0 +1,115 @@
+import pytest
+from unittest.mock import patch, Mock
+from git_diff_analyzer.remote.github_graphql_api import GithubGraphQLAPI
+
+
+@pytest.fixture
+@patch('git_diff_analyzer.remote.github_graphql_api.GithubGraphQLAPI._query')
+def graphql_api(mock_query):
+    """Fixture for GithubGraphQLAPI that mocks the connection call."""
+    mock_query.return_value = {"repository": {"id": "R_1"}}
+    return GithubGraphQLAPI("owner", "repo", "access_token")
+
+
+@patch('git_diff_analyzer.remote.github_graphql_api.GithubGraphQLAPI._query')
+def test_check_connection_failure(mock_query):
+    """Test failed connection when the repository is not visible."""
+    mock_query.return_value = {"repository": None}
+    with pytest.raises(ValueError):
+        GithubGraphQLAPI("owner", "repo", "access_token")
+
+
+def test_query_raises_on_graphql_errors(graphql_api):
+    """Test that GraphQL errors are reported as ValueError."""
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.headers = {}
+    mock_response.json.return_value = {"errors": [{"message": "Bad query"}]}
+    with patch.object(graphql_api.session, "request", return_value=mock_response):
+        with pytest.raises(ValueError, match="Bad query"):
+            graphql_api._query("query { viewer { login } }")
+
+
+@patch('git_diff_analyzer.remote.github_graphql_api.GithubGraphQLAPI._query')
+def test_get_latest_commits_single_query(mock_query, graphql_api):
+    """Test fetching several branch heads with aliases in one query."""
+    mock_query.return_value = {"repository": {
+        "r0": {"target": {"oid": "sha-main"}}, "r1": {"target": {"oid": "sha-dev"}}}}
+
+    commits = graphql_api.get_latest_commits(["main", "dev"])
+
+    assert commits == {"main": "sha-main", "dev": "sha-dev"}
+    mock_query.assert_called_once()
+    assert mock_query.call_args[0][1]["r1"] == "refs/heads/dev"
+
+
+@patch('git_diff_analyzer.remote.github_graphql_api.GithubGraphQLAPI._query')
+def test_get_latest_commit_missing_branch(mock_query, graphql_api):
+    """Test failed commit fetch when the branch does not exist."""
+    mock_query.return_value = {"repository": {"r0": None}}
+    with pytest.raises(ValueError, match="Failed to fetch the latest commit from GitHub."):
+        graphql_api.get_latest_commit("missing")
+
+
+@patch('git_diff_analyzer.remote.github_graphql_api.GithubGraphQLAPI._query')
+def test_get_merge_base_is_unsupported(mock_query, graphql_api):
+    """Test that the merge base is left to a walk of the history, GraphQL cannot compare commits."""
+    assert graphql_api.get_merge_base("remote", "local") is None
+    mock_query.assert_not_called()
+
+
+@patch('git_diff_analyzer.remote.github_graphql_api.BATCH_SIZE', 2)
+@patch('git_diff_analyzer.remote.github_graphql_api.GithubGraphQLAPI._query')
+def test_get_blob_shas_batched(mock_query, graphql_api):
+    """Test that blob lookups are split into batches of aliased expressions."""
+    mock_query.side_effect = [
+        {"repository": {"e0": {"oid": "1"}, "e1": None}},
+        {"repository": {"e0": {"oid": "3"}}},
+    ]
+
+    shas = graphql_api.get_blob_shas([("c1", "a.py"), ("c1", "b.py"), ("c2", "a.py")])
+
+    assert shas == {("c1", "a.py"): "1", ("c1", "b.py"): None, ("c2", "a.py"): "3"}
+    assert mock_query.call_count == 2
+
+
+@patch('git_diff_analyzer.remote.github_graphql_api.GithubGraphQLAPI._query')
+def test_iter_changed_entries_batches_tree_levels(mock_query, graphql_api):
+    """Test the tree diff lists all changed trees of a level in one query."""
+    def entry(name, type_, oid, mode=0o100644):
+        return {"name": name, "type": type_, "oid": oid, "mode": mode}
+
+    trees = {
+        "root1": [entry("a.py", "blob", "a1"), entry("src", "tree", "src1", 0o40000)],
+        "root2": [entry("a.py", "blob", "a2"), entry("src", "tree", "src2", 0o40000)],
+        "src1": [entry("old.py", "blob", "o")],
+        "src2": [entry("new.py", "blob", "n")],
+    }
+
+    def query(query, variables):
+        if "c0" in variables:
+            return {"repository": {"c0": {"tree": {"oid": "root1"}}, "c1": {"tree": {"oid": "root2"}}}}
+        return {"repository": {alias: {"entries": trees[sha]}
+                               for alias, sha in variables.items() if alias.startswith("t")}}
+    mock_query.side_effect = query
+
+    entries = graphql_api.get_changed_entries("base", "head")
+
+    assert [(e.path, e.status, e.new_sha, e.new_mode) for e in entries] == [
+        ("a.py", "modified", "a2", "100644"),
+        ("src/new.py", "added", "n", "100644"),
+        ("src/old.py", "deleted", None, None),
+    ]
+    # One query for the root commits and one per tree level
+    assert mock_query.call_count == 3
+
+
+@patch('git_diff_analyzer.remote.github_graphql_api.GithubGraphQLAPI.get_blob_shas')
+def test_is_diff(mock_get_blob_shas, graphql_api):
+    """Test the diff check compares blob SHAs and reports missing files."""
+    mock_get_blob_shas.return_value = {("c1", "a.py"): "1", ("c2", "a.py"): "2"}
+    assert graphql_api.is_diff("c1", "a.py", "c2", "a.py") is True
+
+    mock_get_blob_shas.return_value = {("c1", "a.py"): None, ("c2", "a.py"): "2"}
+    with pytest.raises(FileNotFoundError):
+        graphql_api.is_diff("c1", "a.py", "c2", "a.py")
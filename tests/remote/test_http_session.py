@@ -0,0 +1,19 @@
+from git_diff_analyzer.remote.http_session import close_sessions, get_session
+
+
+def test_get_session_is_shared_per_pool_size():
+    """Test that sessions are reused for the same pool size."""
+    try:
+        assert get_session(4) is get_session(4)
+        assert get_session(4) is not get_session(8)
+    finally:
+        close_sessions()
+
+
+def test_get_session_pool_size():
+    """Test that the session's adapters are sized to the pool."""
+    try:
+        adapter = get_session(3).get_adapter("https://api.github.com")
+        assert adapter._pool_maxsize == 3
+    finally:
+        close_sessions()
@@ -0,0 +1,235 @@
+import json
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+from unittest.mock import Mock
+from git_diff_analyzer.instrumentation import collect_stats
+from git_diff_analyzer.remote.request_scheduler import RequestScheduler, get_scheduler
+
+
+def _response(status_code=200, headers=None, body=None):
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = body
+    response.content = json.dumps(body).encode() if body is not None else b""
+    return response
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def scheduler(sleeps):
+    return RequestScheduler(reserve=10, max_retries=3, sleep=sleeps.append, clock=lambda: 1000.0)
+
+
+def test_send_returns_successful_response(scheduler):
+    session = Mock()
+    session.request.return_value = _response(body={"ok": True})
+
+    response = scheduler.send(session, "GET", "https://api/x", headers={"A": "b"})
+
+    assert response.json() == {"ok": True}
+    session.request.assert_called_once_with(
+        "GET", "https://api/x", headers={"A": "b"}, params=None, json=None, stream=False, timeout=None)
+
+
+def test_send_times_out_at_the_deadline(scheduler):
+    """Test that requests get the time left as their timeout and raise TimeoutError once it is up."""
+    session = Mock()
+    session.request.side_effect = requests.ReadTimeout("stalled")
+
+    with pytest.raises(TimeoutError):
+        scheduler.send(session, "GET", "https://api/x", deadline=time.monotonic() + 30)
+    assert 0 < session.request.call_args.kwargs["timeout"] <= 30
+
+    with pytest.raises(TimeoutError):
+        scheduler.send(session, "GET", "https://api/x", deadline=time.monotonic() - 1)
+    session.request.assert_called_once()
+
+
+def test_send_revalidates_with_etag(scheduler):
+    """Test that an unchanged resource is served from the stored response on 304."""
+    session = Mock()
+    first = _response(headers={"ETag": '"v1"', "Link": '<https://api/next>; rel="next"'},
+                      body={"sha": "1"})
+    session.request.side_effect = [first, _response(304)]
+
+    scheduler.send(session, "GET", "https://api/branches/main")
+    response = scheduler.send(session, "GET", "https://api/branches/main")
+
+    assert response.status_code == 200
+    assert response.json() == {"sha": "1"}
+    assert response.links["next"]["url"] == "https://api/next"
+    assert session.request.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+    # Only the ETag, body and headers are kept, not the response object
+    assert all(part is not first for part in scheduler._etags[("https://api/branches/main", ())])
+
+
+def test_etag_store_is_bounded_by_bytes(sleeps):
+    """Test that stored bodies are evicted oldest first once their total size is over the limit."""
+    scheduler = RequestScheduler(max_etag_bytes=100, sleep=sleeps.append)
+    session = Mock()
+    session.request.side_effect = [
+        _response(headers={"ETag": f'"{name}"'}, body="x" * size)
+        for name, size in [("a", 20), ("b", 20), ("c", 20), ("big", 30), ("a", 10)]]
+
+    for url in ["https://api/a", "https://api/b", "https://api/c", "https://api/big", "https://api/a"]:
+        scheduler.send(session, "GET", url)
+
+    # Bodies over a quarter of the limit are not kept, and a refreshed entry replaces its old size
+    assert [key[0] for key in scheduler._etags] == ["https://api/b", "https://api/c", "https://api/a"]
+    assert scheduler._etag_bytes == 22 + 22 + 12
+    scheduler.max_etag_bytes = 40
+    session.request.side_effect = [_response(headers={"ETag": '"d"'}, body="x" * 8)]
+    scheduler.send(session, "GET", "https://api/d")
+    assert [key[0] for key in scheduler._etags] == ["https://api/a", "https://api/d"]
+    assert scheduler._etag_bytes == 22
+
+
+def test_send_retries_with_retry_after(scheduler, sleeps):
+    """Test that secondary rate limits are retried after the advertised delay."""
+    session = Mock()
+    session.request.side_effect = [_response(403, {"Retry-After": "7"}), _response(200)]
+
+    response = scheduler.send(session, "GET", "https://api/x")
+
+    assert response.status_code == 200
+    assert sleeps == [7.0]
+
+
+def test_send_retries_after_an_http_date(scheduler, sleeps):
+    session = Mock()
+    session.request.side_effect = [
+        _response(503, {"Retry-After": formatdate(1012, usegmt=True)}), _response(200)]
+
+    assert scheduler.send(session, "GET", "https://api/x").status_code == 200
+    assert sleeps == [12.0]
+
+
+def test_send_backs_off_from_secondary_rate_limits(sleeps):
+    """Test that a 403 for a secondary rate limit pauses every request of the token."""
+    scheduler = RequestScheduler(sleep=sleeps.append, clock=lambda: 1000.0 + sum(sleeps))
+    session = Mock()
+    limited = _response(403, {"X-RateLimit-Remaining": "4000"},
+                        {"message": "You have exceeded a secondary rate limit. Please wait."})
+    session.request.side_effect = [limited, _response(200)]
+
+    assert scheduler.send(session, "GET", "https://api/x").status_code == 200
+    assert sleeps == [60.0]
+    assert scheduler.paused_until == 1060.0
+
+    # Other requests wait out a pause set while they were queued
+    scheduler.paused_until = 1090.0
+    session.request.side_effect = [_response(200)]
+    scheduler.send(session, "GET", "https://api/y")
+    assert sleeps == [60.0, 30.0]
+
+
+def test_send_does_not_retry_forbidden_requests(scheduler, sleeps):
+    session = Mock()
+    session.request.return_value = _response(403, {"X-RateLimit-Remaining": "4000"},
+                                             {"message": "Resource not accessible"})
+
+    assert scheduler.send(session, "GET", "https://api/x").status_code == 403
+    assert sleeps == []
+
+
+def test_rate_limit_waits_respect_the_deadline(scheduler, sleeps):
+    """Test that a request gives up instead of waiting for a reset or pause past its deadline."""
+    session = Mock()
+    scheduler.remaining, scheduler.reset_at = 5, 4000.0
+
+    with pytest.raises(TimeoutError, match="reset"):
+        scheduler.send(session, "GET", "https://api/x", deadline=time.monotonic() + 5)
+
+    scheduler.remaining, scheduler.paused_until = None, 1100.0
+    with pytest.raises(TimeoutError, match="pause"):
+        scheduler.send(session, "GET", "https://api/x", deadline=time.monotonic() + 5)
+    assert sleeps == []
+    session.request.assert_not_called()
+
+
+def test_budget_wait_does_not_hold_the_lock(sleeps):
+    """Test that responses can update the budget while other requests wait for the reset."""
+    scheduler = RequestScheduler(reserve=10)
+    scheduler.remaining, scheduler.reset_at = 5, 1030.0
+    scheduler._clock = lambda: 1000.0
+
+    def sleep(delay):
+        assert not scheduler._budget_lock.locked()
+        sleeps.append(delay)
+    scheduler._sleep = sleep
+
+    scheduler._wait_for_budget()
+    assert sleeps == [30.0]
+    assert scheduler.remaining is None
+
+
+def test_send_retries_server_errors_with_jittered_backoff(scheduler, sleeps):
+    session = Mock()
+    session.request.side_effect = [_response(502), _response(502), _response(200)]
+
+    response = scheduler.send(session, "GET", "https://api/x")
+
+    assert response.status_code == 200
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1 and 0 <= sleeps[1] <= 2
+
+
+def test_send_gives_up_after_max_retries(scheduler, sleeps):
+    session = Mock()
+    session.request.return_value = _response(503)
+
+    response = scheduler.send(session, "GET", "https://api/x")
+
+    assert response.status_code == 503
+    assert session.request.call_count == 4
+
+
+def test_send_does_not_retry_client_errors(scheduler, sleeps):
+    session = Mock()
+    session.request.return_value = _response(404)
+
+    assert scheduler.send(session, "GET", "https://api/x").status_code == 404
+    assert sleeps == []
+
+
+def test_send_waits_for_reset_when_budget_is_low(scheduler, sleeps):
+    """Test that requests are held back once the reserve is reached."""
+    session = Mock()
+    session.request.side_effect = [
+        _response(headers={"X-RateLimit-Remaining": "5", "X-RateLimit-Reset": "1030"}),
+        _response(headers={"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": "4600"}),
+    ]
+
+    scheduler.send(session, "GET", "https://api/x")
+    scheduler.send(session, "GET", "https://api/y")
+
+    assert sleeps == [30.0]
+    assert scheduler.remaining == 4999
+
+
+def test_get_scheduler_is_shared_per_token():
+    assert get_scheduler("token-a") is get_scheduler("token-a")
+    assert get_scheduler("token-a") is not get_scheduler("token-b")
+
+
+def test_send_records_http_spans(scheduler):
+    """Test that every attempt is recorded under its endpoint name."""
+    session = Mock()
+    throttled, ok = _response(503), _response(body={})
+    ok.content = b'{"files": []}'
+    session.request.side_effect = [throttled, ok]
+
+    with collect_stats() as stats:
+        scheduler.send(session, "GET", "https://api.github.com/repos/o/r/compare/a...b")
+
+    result = stats.to_dict()
+    assert result["counts"] == {"GET compare": 2}
+    assert result["bytes"] == {"http": 13}
@@ -0,0 +1,32 @@
+from git_diff_analyzer.models import ChangedFile
+from git_diff_analyzer.remote.tree_diff import pair_exact_renames, walk_tree_diff
+
+
+def test_walk_tree_diff_pairs_exact_renames():
+    """Test that a blob deleted in one place and added in another is reported as a rename."""
+    trees = {
+        "root1": {"a.py": ("blob", "a", "100644"), "src": ("tree", "src1", "040000")},
+        "root2": {"a.py": ("blob", "a2", "100644"), "lib": ("tree", "lib2", "040000")},
+        "src1": {"moved.py": ("blob", "m", "100644"), "gone.py": ("blob", "g", "100644")},
+        "lib2": {"moved.py": ("blob", "m", "100755"), "new.py": ("blob", "n", "100644")},
+    }
+
+    entries = list(walk_tree_diff("root1", "root2", lambda shas: {sha: trees[sha] for sha in shas}))
+
+    assert entries == [
+        ChangedFile("a.py", "modified", "a", "a2", "100644", "100644"),
+        ChangedFile("lib/moved.py", "renamed", "m", "m", "100644", "100755", "src/moved.py"),
+        ChangedFile("lib/new.py", "added", None, "n", None, "100644"),
+        ChangedFile("src/gone.py", "deleted", "g", None, "100644", None),
+    ]
+
+
+def test_pair_exact_renames_uses_each_deletion_once():
+    entries = [
+        ChangedFile("a.py", "deleted", "same", None, "100644", None),
+        ChangedFile("b.py", "added", None, "same", None, "100644"),
+        ChangedFile("c.py", "added", None, "same", None, "100644"),
+    ]
+
+    assert [(entry.path, entry.status) for entry in pair_exact_renames(entries)] == [
+        ("b.py", "renamed"), ("c.py", "added")]
@@ -0,0 +1,185 @@
+import socket
+import threading
+
+import pytest
+import requests
+from unittest.mock import patch
+
+from git_diff_analyzer import find_overlapping_changes
+from git_diff_analyzer.services.daemon import OverlapWatcher, WatchServer, query
+from support.fake_github import FakeGithubServer
+
+
+@pytest.fixture
+def watched_repo(git_repo):
+    git_repo.write("a.txt", "base\n")
+    git_repo.write("b.txt", "base\n")
+    git_repo.write("c.txt", "base\n")
+    git_repo.write("e.txt", "".join(f"line {n}\n" for n in range(20)))
+    git_repo.commit("base")
+    git_repo.git("checkout", "-q", "-b", "feature")
+    git_repo.write("a.txt", "local\n")
+    git_repo.commit("local")
+    git_repo.git("checkout", "-q", "main")
+    git_repo.write("a.txt", "remote\n")
+    git_repo.write("b.txt", "remote\n")
+    git_repo.commit("remote")
+    git_repo.git("checkout", "-q", "feature")
+    with FakeGithubServer(git_repo.path) as server:
+        yield git_repo, server
+
+
+def _paths(watcher):
+    return [overlap["path"] for overlap in watcher.snapshot()["overlaps"]]
+
+
+def _full_overlaps(git_repo, server):
+    overlaps = find_overlapping_changes("owner", "repo", "token", git_repo.path, "main", "feature",
+                                        remote_options={"api_url": server.url})
+    return [overlap.to_dict() for overlap in sorted(overlaps, key=lambda overlap: overlap.path)]
+
+
+def _full_paths(git_repo, server):
+    overlaps = find_overlapping_changes("owner", "repo", "token", git_repo.path, "main", "feature",
+                                        remote_options={"api_url": server.url})
+    return sorted(overlap.path for overlap in overlaps)
+
+
+def test_watcher_applies_local_and_remote_moves(watched_repo):
+    git_repo, server = watched_repo
+    watcher = OverlapWatcher("owner", "repo", "token", git_repo.path, "main", "feature",
+                             remote_options={"api_url": server.url}, remote_poll_interval=3600)
+    assert _paths(watcher) == ["a.txt"]
+    assert watcher.poll() is False
+
+    # Local commit: b.txt now overlaps, a.txt goes back to the merge base version
+    git_repo.write("b.txt", "local\n")
+    git_repo.write("a.txt", "base\n")
+    git_repo.commit("local 2")
+    assert watcher.poll() is True
+    assert _paths(watcher) == ["b.txt"] == _full_paths(git_repo, server)
+
+    # Remote commit, picked up on a forced poll
+    git_repo.git("checkout", "-q", "main")
+    git_repo.write("c.txt", "remote\n")
+    git_repo.git("rm", "-q", "b.txt")
+    git_repo.commit("remote 2")
+    git_repo.git("checkout", "-q", "feature")
+    git_repo.write("c.txt", "local\n")
+    git_repo.commit("local 3")
+    watcher.poll(force=True)
+    assert _paths(watcher) == ["b.txt", "c.txt"] == _full_paths(git_repo, server)
+    overlaps = {overlap["path"]: overlap for overlap in watcher.snapshot()["overlaps"]}
+    assert overlaps["b.txt"]["remote"]["status"] == "deleted"
+
+    # Remote rename of a file edited locally: one overlap under the local path
+    git_repo.git("checkout", "-q", "main")
+    git_repo.git("mv", "e.txt", "moved.txt")
+    git_repo.commit("remote rename")
+    git_repo.git("checkout", "-q", "feature")
+    git_repo.write("e.txt", "edited\n" + "".join(f"line {n}\n" for n in range(1, 20)))
+    git_repo.commit("local edit")
+    watcher.poll(force=True)
+    assert watcher.snapshot()["overlaps"] == _full_overlaps(git_repo, server)
+    overlaps = {overlap["path"]: overlap for overlap in watcher.snapshot()["overlaps"]}
+    assert overlaps["e.txt"]["remote"] == {"status": "renamed", "new_sha": overlaps["e.txt"]["remote"]["new_sha"],
+                                           "path": "moved.txt", "old_path": "e.txt"}
+
+    # Then renamed locally as well
+    git_repo.git("mv", "e.txt", "local.txt")
+    git_repo.commit("local rename")
+    watcher.poll(force=True)
+    assert _paths(watcher) == ["b.txt", "c.txt", "local.txt"]
+    assert watcher.snapshot()["overlaps"] == _full_overlaps(git_repo, server)
+    watcher.close()
+
+
+def test_watcher_pairs_renames_across_remote_moves(watched_repo):
+    git_repo, server = watched_repo
+    watcher = OverlapWatcher("owner", "repo", "token", git_repo.path, "main", "feature",
+                             remote_options={"api_url": server.url}, remote_poll_interval=3600)
+    git_repo.write("c.txt", "local\n")
+    git_repo.commit("local 2")
+    git_repo.git("checkout", "-q", "main")
+    git_repo.git("rm", "-q", "c.txt")
+    git_repo.commit("remote delete")
+    git_repo.git("checkout", "-q", "feature")
+    watcher.poll(force=True)
+    assert _paths(watcher) == ["a.txt", "c.txt"]
+
+    git_repo.git("checkout", "-q", "main")
+    git_repo.write("renamed.txt", "base\n")
+    git_repo.commit("remote add")
+    git_repo.git("checkout", "-q", "feature")
+    watcher.poll(force=True)
+    assert watcher.snapshot()["overlaps"] == _full_overlaps(git_repo, server)
+    assert watcher.snapshot()["overlaps"][1]["remote"]["path"] == "renamed.txt"
+    watcher.close()
+
+
+def test_watcher_recovers_from_a_failed_update(watched_repo):
+    git_repo, server = watched_repo
+    watcher = OverlapWatcher("owner", "repo", "token", git_repo.path, "main", "feature",
+                             remote_options={"api_url": server.url}, remote_poll_interval=3600)
+    git_repo.git("checkout", "-q", "main")
+    git_repo.write("c.txt", "remote\n")
+    git_repo.commit("remote 2")
+    git_repo.git("checkout", "-q", "feature")
+    git_repo.write("c.txt", "local\n")
+    git_repo.commit("local 2")
+
+    with patch.object(watcher.remote, "iter_changed_entries",
+                      side_effect=requests.ConnectionError("connection reset")):
+        with pytest.raises(requests.ConnectionError):
+            watcher.poll(force=True)
+    assert _paths(watcher) == ["a.txt"]
+    assert watcher.snapshot()["local_head"] != git_repo.git("rev-parse", "feature")
+
+    # Neither head moved since, and the remote is not due to be asked again
+    assert watcher.poll() is True
+    assert _paths(watcher) == ["a.txt", "c.txt"] == _full_paths(git_repo, server)
+    assert watcher.snapshot()["local_head"] == git_repo.git("rev-parse", "feature")
+    watcher.close()
+
+
+def test_watch_server_answers_queries(watched_repo, tmp_path):
+    git_repo, server = watched_repo
+    watcher = OverlapWatcher("owner", "repo", "token", git_repo.path, "main", "feature",
+                             remote_options={"api_url": server.url})
+    watch_server = WatchServer(watcher, str(tmp_path / "watch.sock"), poll_interval=3600)
+    thread = threading.Thread(target=watch_server.serve_forever)
+    thread.start()
+    try:
+        response = query(watch_server.address)
+        assert [overlap["path"] for overlap in response["overlaps"]] == ["a.txt"]
+        assert response["local_head"] == git_repo.git("rev-parse", "feature")
+
+        git_repo.write("b.txt", "local\n")
+        git_repo.commit("local 2")
+        response = query(watch_server.address, "refresh")
+        assert [overlap["path"] for overlap in response["overlaps"]] == ["a.txt", "b.txt"]
+
+        with pytest.raises(ValueError, match="Unknown command"):
+            query(watch_server.address, "stop")
+    finally:
+        watch_server.shutdown()
+        thread.join()
+
+
+def test_watch_server_refuses_to_replace_other_files(watched_repo, tmp_path):
+    git_repo, server = watched_repo
+    watcher = OverlapWatcher("owner", "repo", "token", git_repo.path, "main", "feature",
+                             remote_options={"api_url": server.url})
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    with pytest.raises(ValueError, match="not a socket"):
+        WatchServer(watcher, str(path))
+    assert path.read_text() == "keep me"
+
+    # A socket left behind by an earlier server is replaced
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(tmp_path / "watch.sock"))
+    stale.close()
+    watch_server = WatchServer(watcher, str(tmp_path / "watch.sock"), poll_interval=3600)
+    watch_server._server.server_close()
+    watcher.close()
@@ -1,7 +1,13 @@
+import threading
+
 import pytest
 from unittest.mock import patch, MagicMock
+from concurrent.futures import ThreadPoolExecutor
 
-from git_diff_analyzer.services.diff_service import compare_local_remote_changes, _get_filtered_changed_files
+from git_diff_analyzer.models import ChangedFile
+from git_diff_analyzer.services.diff_service import (
+    compare_local_remote_changes, _get_filtered_changed_files, _iter_incremental_join, index_changes,
+    iter_remote_changes, join_changes)
 
 
 def test_get_filtered_changed_files():
@@ -78,3 +84,133 @@ def test_compare_local_remote_changes_remote_error(
     with pytest.raises(ValueError):
         compare_local_remote_changes(
             'test-owner', 'test-repo', 'fake-token-123', '/path/to/local/repo', 'main', 'feature-branch')
+
+
+def test_join_changes_flags_identical_changes():
+    local_changes = [
+        ChangedFile('same.txt', 'modified', 'old', 'sha1'),
+        ChangedFile('differs.txt', 'modified', 'old', 'sha2'),
+        ChangedFile('local_only.txt', 'added', None, 'sha3'),
+        ChangedFile('gone.txt', 'deleted', 'old', None),
+    ]
+    remote_changes = [
+        ChangedFile('differs.txt', 'modified', None, 'sha4'),
+        ChangedFile('same.txt', 'modified', None, 'sha1'),
+        ChangedFile('remote_only.txt', 'modified', None, 'sha5'),
+        ChangedFile('gone.txt', 'deleted'),
+    ]
+
+    overlaps = join_changes(index_changes(local_changes), remote_changes)
+
+    assert [overlap.path for overlap in overlaps] == ['differs.txt', 'same.txt', 'gone.txt']
+    assert [overlap.identical for overlap in overlaps] == [False, True, True]
+
+
+def test_join_changes_matches_renames_by_base_path():
+    """Test that a file renamed on one side and edited on the other is one overlap."""
+    local_changes = [
+        ChangedFile('src/new.py', 'renamed', 'old', 'l1', old_path='src/old.py'),
+        ChangedFile('copy.py', 'copied', 'c', 'l2', old_path='kept.py'),
+    ]
+    remote_changes = [
+        ChangedFile('src/old.py', 'modified', None, 'r1'),
+        # The source of a copy is still in place, so its edits are not the copy's
+        ChangedFile('kept.py', 'modified', None, 'r2'),
+    ]
+
+    overlaps = join_changes(index_changes(local_changes), remote_changes)
+
+    assert [(overlap.path, overlap.remote.path) for overlap in overlaps] == [('src/new.py', 'src/old.py')]
+    assert overlaps[0].to_dict() == {
+        "path": "src/new.py", "identical": False,
+        "local": {"status": "renamed", "old_sha": "old", "new_sha": "l1", "old_path": "src/old.py"},
+        "remote": {"status": "modified", "new_sha": "r1", "path": "src/old.py"},
+    }
+
+
+def test_incremental_join_matches_renames():
+    local_changes = [ChangedFile('b.py', 'renamed', 'x', 'y', old_path='a.py')]
+    remote_changes = [ChangedFile('c.py', 'renamed', None, 'y', old_path='a.py')]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        overlaps = list(_iter_incremental_join(executor, lambda: local_changes, lambda: remote_changes))
+
+    # Renamed to different paths on both sides conflicts even with the same content
+    assert [(overlap.path, overlap.identical) for overlap in overlaps] == [('b.py', False)]
+
+
+def test_iter_remote_changes_checks_content_only_without_sha():
+    remote = MagicMock()
+    remote.iter_changed_entries.return_value = iter([
+        ChangedFile('known.txt', 'modified', None, 'sha1'),
+        ChangedFile('unknown.txt', 'modified'),
+        ChangedFile('reverted.txt', 'modified'),
+    ])
+    remote.is_diff.side_effect = lambda base, file, latest, _: file == 'unknown.txt'
+
+    entries = list(iter_remote_changes(remote, 'abc123', 'def456'))
+
+    assert [entry.path for entry in entries] == ['known.txt', 'unknown.txt']
+    assert remote.is_diff.call_count == 2
+
+
+def test_incremental_join_yields_before_sides_complete():
+    """Test that an overlap is emitted while the remote side is still producing."""
+    first_overlap_seen = threading.Event()
+
+    def remote_changes():
+        yield ChangedFile('a.txt', 'modified', None, 'remote-a')
+        assert first_overlap_seen.wait(timeout=5)
+        yield ChangedFile('b.txt', 'added', None, 'remote-b')
+
+    local_changes = [ChangedFile('a.txt', 'modified', 'old', 'local-a'),
+                     ChangedFile('b.txt', 'added', None, 'remote-b'),
+                     ChangedFile('c.txt', 'modified', 'old', 'local-c')]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        overlaps = _iter_incremental_join(executor, lambda: local_changes, remote_changes)
+        first = next(overlaps)
+        first_overlap_seen.set()
+        rest = list(overlaps)
+
+    assert (first.path, first.local.new_sha, first.remote.new_sha) == ('a.txt', 'local-a', 'remote-a')
+    assert [(o.path, o.identical) for o in rest] == [('b.txt', True)]
+
+
+def test_incremental_join_propagates_errors():
+    def failing_changes():
+        raise ValueError("Failed to fetch changed files.")
+        yield
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError, match="Failed to fetch changed files."):
+            list(_iter_incremental_join(executor, lambda: [], failing_changes))
+
+
+@patch('git_diff_analyzer.services.diff_service.iter_changed_entries')
+@patch('git_diff_analyzer.services.diff_service.get_local_last_commit')
+@patch('git_diff_analyzer.services.diff_service.get_merge_base')
+@patch('git_diff_analyzer.services.diff_service.get_remote_service')
+def test_compare_local_remote_changes_pipelined(
+    mock_get_remote_service, mock_get_merge_base, mock_get_local_last_commit, mock_iter_changed_entries
+):
+    remote = MagicMock()
+    mock_get_remote_service.return_value.return_value = remote
+    remote.get_latest_commit.return_value = 'remote-head'
+    remote.iter_changed_entries.return_value = iter([
+        ChangedFile('shared.txt', 'modified', None, 'sha1'),
+        ChangedFile('remote.txt', 'modified', None, 'sha2'),
+    ])
+    mock_get_merge_base.return_value = 'base'
+    mock_get_local_last_commit.return_value = 'local-head'
+    mock_iter_changed_entries.return_value = iter([
+        ChangedFile('shared.txt', 'modified', 'old', 'sha3'),
+        ChangedFile('local.txt', 'modified', 'old', 'sha4'),
+    ])
+
+    result = compare_local_remote_changes(
+        'owner', 'repo', 'token', '/path/to/repo', 'main', 'feature', pipelined=True)
+
+    assert result == ['shared.txt']
+    remote.iter_changed_entries.assert_called_once_with('base', 'remote-head', path_filter=None)
+    mock_iter_changed_entries.assert_called_once_with('/path/to/repo', 'base', 'local-head', None)
@@ -0,0 +1,117 @@
+import json
+import time
+
+import pytest
+from unittest.mock import patch
+
+from git_diff_analyzer.cli import fleet_main
+from git_diff_analyzer.git_utils.git_commands import run_git_command
+from git_diff_analyzer.services.fleet import _local_changes, load_manifest, run_fleet
+from support.fake_github import FakeGithubServer
+from conftest import GitRepo
+
+
+def _diverged_repo(path, name):
+    git_repo = GitRepo(path)
+    git_repo.write(f"{name}.txt", "base\n")
+    git_repo.write("other.txt", "base\n")
+    git_repo.commit("base")
+    git_repo.git("checkout", "-q", "-b", "feature")
+    git_repo.write(f"{name}.txt", "local\n")
+    git_repo.commit("local")
+    git_repo.git("checkout", "-q", "main")
+    git_repo.write(f"{name}.txt", "remote\n")
+    git_repo.write("other.txt", "remote\n")
+    git_repo.commit("remote")
+    return git_repo
+
+
+@pytest.fixture
+def fleet(tmp_path):
+    repos = [_diverged_repo(tmp_path / name, name) for name in ("one", "two")]
+    servers = [FakeGithubServer(repo.path).start() for repo in repos]
+    manifest = [
+        {"owner": "owner", "repo": name, "local_path": repo.path,
+         "branches": [["main", "feature"], ["main", "main"]],
+         "remote_options": {"api_url": server.url}}
+        for name, repo, server in zip(("one", "two"), repos, servers)
+    ]
+    yield manifest
+    for server in servers:
+        server.stop()
+
+
+def test_run_fleet_reports_every_repository(fleet):
+    fleet.append({"owner": "owner", "repo": "missing", "local_path": "/does/not/exist",
+                  "branches": [["main", "feature"]], "remote_options": fleet[0]["remote_options"]})
+
+    report = run_fleet(fleet, "token", processes=2)
+
+    results = {result["repo"]: result for result in report["repositories"]}
+    assert report["summary"]["repositories"] == 3
+    assert report["summary"]["ok"] == 2
+    assert report["summary"]["failed"] == 1
+    assert [pair["overlaps"] for pair in results["one"]["pairs"]] == [["one.txt"], []]
+    assert [pair["overlaps"] for pair in results["two"]["pairs"]] == [["two.txt"], []]
+    assert results["missing"]["status"] == "failed"
+
+
+def test_run_fleet_times_out(fleet):
+    report = run_fleet(fleet[:1], "token", processes=1, timeout=0)
+
+    assert report["repositories"][0]["status"] == "timeout"
+
+
+def test_run_fleet_times_out_stalled_remotes(tmp_path):
+    repo = _diverged_repo(tmp_path / "one", "one")
+    with FakeGithubServer(repo.path, stall=["compare"]) as server:
+        manifest = [{"owner": "owner", "repo": "one", "local_path": repo.path,
+                     "branches": [["main", "feature"]], "remote_options": {"api_url": server.url}}]
+        start = time.perf_counter()
+        report = run_fleet(manifest, "token", processes=1, timeout=2)
+        elapsed = time.perf_counter() - start
+
+    assert report["repositories"][0]["status"] == "timeout"
+    assert elapsed < 10
+
+
+def test_local_changes_abort_at_the_deadline(tmp_path):
+    """Test that a local job past its deadline kills its git process instead of holding the worker."""
+    def stalled_merge_base(branch_a, branch_b, repo_loc):
+        return run_git_command(["sleep", "30"], repo_loc)
+
+    start = time.perf_counter()
+    with patch("git_diff_analyzer.services.fleet.get_merge_base", side_effect=stalled_merge_base), \
+            patch("git_diff_analyzer.services.fleet.close_object_readers") as close_object_readers:
+        with pytest.raises(TimeoutError):
+            _local_changes(str(tmp_path), "main", "feature", time.time() + 0.5)
+    assert time.perf_counter() - start < 5
+    # Readers the alarm may have interrupted mid-batch are not left to the next job
+    close_object_readers.assert_called_once()
+
+
+def test_local_changes_keep_readers_on_other_failures(tmp_path):
+    with patch("git_diff_analyzer.services.fleet.get_merge_base", side_effect=ValueError("bad ref")), \
+            patch("git_diff_analyzer.services.fleet.close_object_readers") as close_object_readers:
+        with pytest.raises(ValueError, match="bad ref"):
+            _local_changes(str(tmp_path), "main", "feature", time.time() + 30)
+    close_object_readers.assert_not_called()
+
+
+def test_fleet_main_writes_report(fleet, tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps(fleet))
+    output = tmp_path / "report.json"
+
+    exit_code = fleet_main([str(manifest_path), "--token", "token", "--output", str(output)])
+
+    assert exit_code == 0
+    assert json.loads(output.read_text())["summary"]["ok"] == 2
+
+
+def test_load_manifest_rejects_incomplete_entries(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps([{"owner": "owner", "repo": "repo"}]))
+
+    with pytest.raises(ValueError, match="branches, local_path"):
+        load_manifest(str(manifest_path))
@@ -0,0 +1,88 @@
+from unittest.mock import patch, MagicMock
+
+from git_diff_analyzer.models import ChangedFile, HunkConflict
+from git_diff_analyzer.services.hunk_service import find_conflicting_hunks
+from support.fake_github import FakeGithubServer
+
+_PATCH = "@@ -10,2 +10,2 @@\n-a\n-b\n+c\n+d"
+
+
+@patch('git_diff_analyzer.services.hunk_service.iter_changed_hunks')
+@patch('git_diff_analyzer.services.hunk_service.get_changed_entries')
+@patch('git_diff_analyzer.services.hunk_service.get_local_last_commit')
+@patch('git_diff_analyzer.services.diff_service.get_merge_base')
+@patch('git_diff_analyzer.services.diff_service.get_remote_service')
+def test_find_conflicting_hunks(mock_get_remote_service, mock_get_merge_base, mock_get_local_last_commit,
+                                mock_get_changed_entries, mock_iter_changed_hunks):
+    """Test that only files with overlapping or adjacent hunks are reported."""
+    mock_get_merge_base.return_value = 'base'
+    mock_get_local_last_commit.return_value = 'local'
+    mock_get_changed_entries.return_value = [
+        ChangedFile('clash.py', 'modified', 'o1', 'l1'),
+        ChangedFile('adjacent.py', 'modified', 'o2', 'l2'),
+        ChangedFile('apart.py', 'modified', 'o3', 'l3'),
+        ChangedFile('same.py', 'modified', 'o4', 's4'),
+        ChangedFile('new.py', 'added', None, 'l5'),
+        ChangedFile('local_only.py', 'modified', 'o6', 'l6'),
+    ]
+    remote = MagicMock()
+    remote.get_latest_commit.return_value = 'remote'
+    remote.iter_changed_patches.return_value = [
+        (ChangedFile('clash.py', 'modified', 'o1', 'r1'), _PATCH),
+        (ChangedFile('adjacent.py', 'modified', 'o2', 'r2'), _PATCH),
+        (ChangedFile('apart.py', 'modified', 'o3', 'r3'), _PATCH),
+        (ChangedFile('same.py', 'modified', 'o4', 's4'), _PATCH),
+        (ChangedFile('new.py', 'added', None, 'r5'), None),
+        (ChangedFile('remote_only.py', 'modified', 'o7', 'r7'), _PATCH),
+    ]
+    mock_get_remote_service.return_value = MagicMock(return_value=remote)
+    mock_iter_changed_hunks.return_value = iter([
+        ('adjacent.py', [(1, 2), (12, 12)]),
+        ('apart.py', [(1, 5), (30, 31)]),
+        ('clash.py', [(11, 14)]),
+        ('local_only.py', [(1, 1)]),
+        ('new.py', [(1, 3)]),
+    ])
+
+    conflicts = find_conflicting_hunks('owner', 'repo', 'token', '/repo', 'main', 'feature')
+
+    assert conflicts == [
+        HunkConflict('clash.py', [(11, 14)], [(10, 11)], [((11, 14), (10, 11))]),
+        HunkConflict('adjacent.py', [(1, 2), (12, 12)], [(10, 11)], [((12, 12), (10, 11))]),
+        HunkConflict('new.py', None, None, None),
+    ]
+    remote.iter_changed_patches.assert_called_once_with('base', 'remote', path_filter=None)
+    mock_iter_changed_hunks.assert_called_once_with('/repo', 'base', 'local', None)
+
+
+def _lines(edited=()):
+    return "".join(f"edited {n}\n" if n in edited else f"line {n}\n" for n in range(1, 41))
+
+
+def test_find_conflicting_hunks_against_github(git_repo):
+    """Test hunk conflicts end to end, with the patches of the fake GitHub compare."""
+    for name in ("clash.txt", "adjacent.txt", "apart.txt", "moved.txt"):
+        git_repo.write(name, _lines())
+    git_repo.commit("base")
+    git_repo.git("checkout", "-q", "-b", "feature")
+    git_repo.write("clash.txt", _lines({10}))
+    git_repo.write("adjacent.txt", _lines({10}))
+    git_repo.write("apart.txt", _lines({2}))
+    git_repo.write("moved.txt", _lines({35}))
+    git_repo.commit("local")
+    git_repo.git("checkout", "-q", "main")
+    git_repo.write("clash.txt", _lines({10, 11}))
+    git_repo.write("adjacent.txt", _lines({11}))
+    git_repo.write("apart.txt", _lines({30}))
+    git_repo.git("mv", "moved.txt", "renamed.txt")
+    git_repo.write("renamed.txt", _lines({3}))
+    git_repo.commit("remote")
+
+    with FakeGithubServer(git_repo.path) as server:
+        conflicts = find_conflicting_hunks("owner", "repo", "token", git_repo.path, "main", "feature",
+                                           remote_options={"api_url": server.url})
+
+    assert conflicts == [
+        HunkConflict('adjacent.txt', [(10, 10)], [(11, 11)], [((10, 10), (11, 11))]),
+        HunkConflict('clash.txt', [(10, 10)], [(10, 11)], [((10, 10), (10, 11))]),
+    ]
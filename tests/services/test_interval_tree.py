@@ -0,0 +1,27 @@
+from git_diff_analyzer.services.interval_tree import IntervalTree
+
+
+def test_overlapping_returns_sorted_matches():
+    """Test that all intervals sharing a line with the query are returned."""
+    tree = IntervalTree([(20, 25), (1, 3), (5, 30), (8, 8), (40, 41)])
+
+    assert tree.overlapping(8, 21) == [(5, 30), (8, 8), (20, 25)]
+    assert tree.overlapping(3, 3) == [(1, 3)]
+    assert tree.overlapping(31, 39) == []
+    assert len(tree) == 5
+
+
+def test_overlapping_matches_linear_scan():
+    """Test the tree against a linear scan over many intervals."""
+    intervals = [(start, start + (start * 7) % 13) for start in range(0, 500, 3)]
+    tree = IntervalTree(intervals)
+
+    for start in range(0, 520, 11):
+        end = start + 4
+        expected = sorted(i for i in intervals if i[0] <= end and i[1] >= start)
+        assert tree.overlapping(start, end) == expected
+
+
+def test_empty_tree():
+    """Test querying a tree without intervals."""
+    assert IntervalTree([]).overlapping(1, 10) == []
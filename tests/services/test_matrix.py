@@ -0,0 +1,40 @@
+from unittest.mock import patch, MagicMock
+
+from git_diff_analyzer.models import ChangedFile
+from git_diff_analyzer.services.matrix import compare_branch_matrix
+
+
+@patch('git_diff_analyzer.services.matrix.get_changed_entries')
+@patch('git_diff_analyzer.services.matrix.get_merge_base')
+@patch('git_diff_analyzer.services.matrix.resolve_commits')
+@patch('git_diff_analyzer.services.matrix.get_remote_service')
+def test_compare_branch_matrix_shares_work(
+    mock_get_remote_service, mock_resolve_commits, mock_get_merge_base, mock_get_changed_entries
+):
+    remote = MagicMock()
+    mock_get_remote_service.return_value.return_value = remote
+    remote.get_latest_commits.return_value = {'release-1': 'r1', 'release-2': 'r2'}
+    remote.iter_changed_entries.side_effect = lambda base, head, path_filter=None: iter([
+        ChangedFile('shared.py', 'modified', None, f'remote-{head}'),
+        ChangedFile(f'{head}.py', 'added', None, 'x'),
+    ])
+    mock_resolve_commits.side_effect = lambda revs, repo: [f'sha-{rev.split("/")[-1]}' for rev in revs]
+    # Both remote branches fork from the same commit
+    mock_get_merge_base.return_value = 'base'
+    mock_get_changed_entries.side_effect = lambda repo, base, head: [
+        ChangedFile('shared.py', 'modified', 'old', f'local-{head}'),
+        ChangedFile('r1.py', 'modified', 'old', 'y'),
+    ]
+
+    matrix = compare_branch_matrix('owner', 'repo', 'token', '/path/to/repo',
+                                   ['feature-a', 'feature-b'], ['release-1', 'release-2'])
+
+    assert set(matrix) == {('feature-a', 'release-1'), ('feature-a', 'release-2'),
+                           ('feature-b', 'release-1'), ('feature-b', 'release-2')}
+    assert [o.path for o in matrix[('feature-a', 'release-1')]] == ['shared.py', 'r1.py']
+    assert [o.path for o in matrix[('feature-b', 'release-2')]] == ['shared.py']
+    # One remote lookup for all heads, one diff per distinct (base, head)
+    remote.get_latest_commits.assert_called_once_with(['release-1', 'release-2'])
+    assert mock_get_merge_base.call_count == 4
+    assert mock_get_changed_entries.call_count == 2
+    assert remote.iter_changed_entries.call_count == 2
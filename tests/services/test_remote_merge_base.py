@@ -0,0 +1,91 @@
+import subprocess
+
+import pytest
+from unittest.mock import MagicMock
+
+from git_diff_analyzer import find_overlapping_changes
+from git_diff_analyzer.services.remote_merge_base import find_remote_merge_base
+from support.fake_github import FakeGithubServer
+
+
+@pytest.fixture
+def diverged_repo(git_repo):
+    """A repository with a base commit and a local branch; the remote commits are not fetched."""
+    git_repo.write("a.txt", "base\n")
+    base = git_repo.commit("base")
+    git_repo.git("checkout", "-q", "-b", "feature")
+    git_repo.write("a.txt", "local\n")
+    local = git_repo.commit("local")
+    return git_repo, base, local
+
+
+def _remote(history, merge_base_error=ValueError("Not Found")):
+    """A remote whose compare fails with `merge_base_error`, or is unsupported if it is None."""
+    remote = MagicMock()
+    remote.get_merge_base.side_effect = merge_base_error
+    remote.get_merge_base.return_value = None
+    remote.iter_commit_parents.side_effect = lambda commit: iter(history)
+    return remote
+
+
+def test_find_remote_merge_base_walks_unknown_history(diverged_repo):
+    git_repo, base, local = diverged_repo
+    remote = _remote([("r3", ["r2", "r1"]), ("r1", [base]), ("r2", ["r1"]), (base, [])])
+
+    assert find_remote_merge_base(remote, "r3", local, git_repo.path) == base
+    remote.get_merge_base.assert_called_once_with("r3", local)
+
+
+def test_find_remote_merge_base_stops_at_known_commits(diverged_repo):
+    git_repo, base, local = diverged_repo
+
+    def history(commit):
+        yield "r1", [base]
+        yield base, []
+        raise AssertionError("walked past the known commit")
+    remote = _remote([])
+    remote.iter_commit_parents.side_effect = history
+
+    assert find_remote_merge_base(remote, "r1", local, git_repo.path) == base
+
+
+def test_find_remote_merge_base_uses_compare(diverged_repo):
+    git_repo, base, local = diverged_repo
+    remote = _remote([])
+    remote.get_merge_base.side_effect = None
+    remote.get_merge_base.return_value = base
+
+    assert find_remote_merge_base(remote, "r1", local, git_repo.path) == base
+    remote.iter_commit_parents.assert_not_called()
+
+
+def test_find_remote_merge_base_without_common_history(diverged_repo):
+    git_repo, _, local = diverged_repo
+    remote = _remote([("r2", ["r1"]), ("r1", [])], None)
+
+    with pytest.raises(ValueError, match="exists locally"):
+        find_remote_merge_base(remote, "r2", local, git_repo.path)
+
+
+def test_find_overlapping_changes_without_fetching_branch_a(git_repo, tmp_path):
+    """Test an end-to-end comparison against a clone that only has the local branch."""
+    git_repo.write("a.txt", "base\n")
+    git_repo.write("b.txt", "base\n")
+    git_repo.commit("base")
+    git_repo.git("checkout", "-q", "-b", "feature")
+    git_repo.write("a.txt", "local\n")
+    git_repo.commit("local")
+    git_repo.git("checkout", "-q", "main")
+    git_repo.write("a.txt", "remote\n")
+    git_repo.write("b.txt", "remote\n")
+    git_repo.commit("remote")
+    clone = str(tmp_path / "clone")
+    subprocess.run(["git", "clone", "-q", "--single-branch", "-b", "feature", git_repo.path, clone],
+                   check=True)
+
+    with FakeGithubServer(git_repo.path) as server:
+        overlaps = find_overlapping_changes(
+            "owner", "repo", "token", clone, "main", "feature",
+            remote_options={"api_url": server.url}, merge_base_mode="remote")
+
+    assert [overlap.path for overlap in overlaps] == ["a.txt"]
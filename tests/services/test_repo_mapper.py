@@ -1,5 +1,9 @@
+from importlib.metadata import EntryPoint
+from unittest.mock import patch
+
 import pytest
 from git_diff_analyzer.remote.github_api import GithubAPI
+from git_diff_analyzer.remote.github_graphql_api import GithubGraphQLAPI
 from git_diff_analyzer.services.repo_mapper import get_remote_service
 
 
@@ -24,3 +28,45 @@ def test_get_remote_service_invalid(invalid_provider_name):
     """
     with pytest.raises(ValueError, match=f"Invalid Git remote provider: {invalid_provider_name}"):
         get_remote_service(invalid_provider_name)
+
+
+@pytest.mark.parametrize("provider_name", ['github-graphql', 'GitHub-GraphQL'])
+def test_get_remote_service_graphql(provider_name):
+    """
+    Test that the GraphQL backend is registered.
+    """
+    assert get_remote_service(provider_name) is GithubGraphQLAPI
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A fresh provider registry that has not scanned the entry points yet."""
+    from git_diff_analyzer.services import repo_mapper
+    monkeypatch.setattr(repo_mapper, "_registry", dict(repo_mapper.BUILTIN_PROVIDERS))
+    monkeypatch.setattr(repo_mapper, "_loaded", {})
+    monkeypatch.setattr(repo_mapper, "_discovered", False)
+    return repo_mapper
+
+
+def test_register_remote_service(registry):
+    registry.register_remote_service("GitLab", "git_diff_analyzer.remote.github_api:GithubAPI")
+    assert get_remote_service("gitlab") is GithubAPI
+
+    registry.register_remote_service("gitlab", GithubGraphQLAPI)
+    assert get_remote_service("gitlab") is GithubGraphQLAPI
+
+
+def test_get_remote_service_discovers_entry_points(registry):
+    entry_point = EntryPoint("bitbucket", "git_diff_analyzer.remote.github_api:GithubAPI", registry.ENTRY_POINT_GROUP)
+    with patch("importlib.metadata.entry_points", return_value=[entry_point]) as entry_points:
+        assert get_remote_service("github") is GithubAPI
+        entry_points.assert_not_called()
+        assert get_remote_service("Bitbucket") is GithubAPI
+        assert registry.get_provider_names() == ["bitbucket", "github", "github-graphql"]
+    entry_points.assert_called_once_with(group=registry.ENTRY_POINT_GROUP)
+
+
+def test_get_remote_service_reports_broken_providers(registry):
+    registry.register_remote_service("broken", "git_diff_analyzer.remote.missing:Remote")
+    with pytest.raises(ValueError, match="Failed to load remote provider"):
+        get_remote_service("broken")
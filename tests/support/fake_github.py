@@ -0,0 +1,324 @@
+"""
+A GitHub REST stand-in serving a local git repository, for benchmarks and end-to-end tests.
+
+It answers the endpoints used by GithubAPI (repository, branches, commits, compare,
+contents, git/commits and git/trees) with configurable latency, page size, compare file limit
+and rate limit, and counts the requests it receives. Endpoints listed in `stall` never answer. Comparisons follow GitHub: their files,
+with the patch of each, only come with the first page and are capped at the file limit,
+while further pages list the remaining commits.
+
+The server runs in its own process, so its git calls and threads do not show up in
+the measurements of the client. It can also be started by hand:
+
+    python tests/support/fake_github.py /path/to/repo --latency 0.05
+"""
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+STATUSES = {"A": "added", "D": "removed", "M": "modified", "T": "modified",
+            "R": "renamed", "C": "copied"}
+STATS_PATH = "/_stats"
+# Seconds a stalled request hangs, far longer than any test waits
+STALL_SECONDS = 3600
+
+
+class FakeGithubServer:
+    """Run the stand-in server in a child process for the duration of a `with` block."""
+
+    def __init__(self, repo_path, latency=0.0, page_limit=100, files_limit=300,
+                 rate_limit=None, rate_limit_window=60.0, stall=()):
+        self.repo_path = str(repo_path)
+        self.options = {
+            "latency": latency, "page_limit": page_limit, "files_limit": files_limit,
+            "rate_limit": rate_limit, "rate_limit_window": rate_limit_window,
+            "stall": ",".join(stall) or None,
+        }
+        self.url = None
+        self._process = None
+
+    def start(self):
+        args = [sys.executable, os.path.abspath(__file__), self.repo_path]
+        for name, value in self.options.items():
+            if value is not None:
+                args += [f"--{name.replace('_', '-')}", str(value)]
+        self._process = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+        self.url = self._process.stdout.readline().strip()
+        if not self.url:
+            self.stop()
+            raise RuntimeError("Fake GitHub server did not start")
+        return self
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+    def stats(self):
+        """Return {"requests": total, "endpoints": {endpoint: count}} since the last reset."""
+        with urllib.request.urlopen(self.url + STATS_PATH) as response:
+            return json.load(response)
+
+    def reset_stats(self):
+        request = urllib.request.Request(self.url + STATS_PATH, method="DELETE")
+        urllib.request.urlopen(request).close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class FakeGithub:
+    """Answer GitHub REST requests from a local repository."""
+
+    def __init__(self, repo_path, latency=0.0, page_limit=100, files_limit=300,
+                 rate_limit=None, rate_limit_window=60.0, stall=(), clock=time.time):
+        self.repo_path = repo_path
+        self.latency = latency
+        self.stall = set(stall)
+        self.page_limit = page_limit
+        self.files_limit = files_limit
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._compare_cache = {}
+        self._used = 0
+        self._reset_at = clock() + rate_limit_window
+        self.counts = Counter()
+
+    def handle(self, path, query):
+        """Return (status, headers, body) for a GET request."""
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts[:1] != ["repos"] or len(parts) < 3:
+            return 404, {}, {"message": "Not Found"}
+        endpoint = parts[3:]
+
+        headers = {}
+        if self.rate_limit is not None:
+            remaining, reset_at = self._take_budget()
+            headers = {"X-RateLimit-Limit": str(self.rate_limit),
+                       "X-RateLimit-Remaining": str(max(remaining, 0)),
+                       "X-RateLimit-Reset": str(int(reset_at))}
+            if remaining < 0:
+                return 403, headers, {"message": "API rate limit exceeded"}
+
+        name = endpoint[0] if endpoint else "repository"
+        with self._lock:
+            self.counts[name] += 1
+        if name in self.stall:
+            time.sleep(STALL_SECONDS)
+        if self.latency:
+            time.sleep(self.latency)
+
+        try:
+            if not endpoint:
+                status, body = 200, {"full_name": f"{parts[1]}/{parts[2]}"}
+            elif endpoint[0] == "branches":
+                status, body = self._branch("/".join(endpoint[1:]))
+            elif endpoint == ["commits"]:
+                status, body, link = self._commits(query)
+                if link:
+                    headers["Link"] = link
+            elif endpoint[0] == "compare":
+                status, body, link = self._compare("/".join(endpoint[1:]), query)
+                if link:
+                    headers["Link"] = link
+            elif endpoint[0] == "contents":
+                status, body = self._contents("/".join(endpoint[1:]), query.get("ref"))
+            elif endpoint[:2] == ["git", "commits"]:
+                status, body = 200, {"sha": endpoint[2],
+                                     "tree": {"sha": self._git("rev-parse", f"{endpoint[2]}^{{tree}}")}}
+            elif endpoint[:2] == ["git", "trees"]:
+                status, body = self._tree(endpoint[2])
+            else:
+                status, body = 404, {"message": "Not Found"}
+        except subprocess.CalledProcessError:
+            status, body = 404, {"message": "Not Found"}
+        return status, headers, body
+
+    def _take_budget(self):
+        with self._lock:
+            now = self._clock()
+            if now >= self._reset_at:
+                self._used = 0
+                self._reset_at = now + self.rate_limit_window
+            self._used += 1
+            return self.rate_limit - self._used, self._reset_at
+
+    def _branch(self, name):
+        sha = self._git("rev-parse", "--verify", f"refs/heads/{name}^{{commit}}")
+        return 200, {"name": name, "commit": {"sha": sha}}
+
+    def _commits(self, query):
+        per_page = min(int(query.get("per_page", 30)), self.page_limit)
+        page = int(query.get("page", 1))
+        output = self._git("rev-list", "--parents", "--date-order", f"--skip={(page - 1) * per_page}",
+                           f"--max-count={per_page + 1}", query.get("sha", "HEAD"))
+        commits = [line.split() for line in output.splitlines()]
+        link = None
+        if len(commits) > per_page:
+            link = f'<commits?per_page={per_page}&page={page + 1}>; rel="next"'
+        body = [{"sha": shas[0], "parents": [{"sha": sha} for sha in shas[1:]]}
+                for shas in commits[:per_page]]
+        return 200, body, link
+
+    def _compare(self, spec, query):
+        # Like GitHub, pages go through the commits; the files only come with the first page
+        base, _, head = spec.partition("...")
+        files, commits, merge_base, ahead_by, behind_by = self._get_comparison(base, head)
+        per_page = min(int(query.get("per_page", 250)), self.page_limit)
+        page = int(query.get("page", 1))
+        link = None
+        if page * per_page < len(commits):
+            link = f'<{spec}?per_page={per_page}&page={page + 1}>; rel="next"'
+        status = "diverged" if ahead_by and behind_by else "ahead" if ahead_by else \
+            "behind" if behind_by else "identical"
+        body = {
+            "status": status, "ahead_by": ahead_by, "behind_by": behind_by,
+            "total_commits": ahead_by, "merge_base_commit": {"sha": merge_base},
+            "commits": [{"sha": sha} for sha in commits[(page - 1) * per_page:page * per_page]],
+            "files": files[:self.files_limit] if page == 1 else [],
+        }
+        return 200, body, link
+
+    def _get_comparison(self, base, head):
+        key = (base, head)
+        with self._lock:
+            cached = self._compare_cache.get(key)
+        if cached is not None:
+            return cached
+        merge_base = self._git("merge-base", base, head)
+        behind_by, ahead_by = (int(count) for count in self._git(
+            "rev-list", "--left-right", "--count", f"{base}...{head}").split())
+        commits = self._git("rev-list", "--reverse", f"{merge_base}..{head}").split()
+        output = self._git("diff-tree", "-r", "--raw", "-z", "-M", "--no-abbrev", merge_base, head)
+        fields = iter(output.split("\0"))
+        files = []
+        for meta in fields:
+            if not meta:
+                break
+            _, _, old_sha, new_sha, status = meta.lstrip(":").split(" ")
+            file = {"filename": next(fields), "status": STATUSES.get(status[0], "modified"),
+                    "sha": old_sha if status == "D" else new_sha}
+            if status[0] in "RC":
+                file["previous_filename"], file["filename"] = file["filename"], next(fields)
+                file["changes"] = 0 if old_sha == new_sha else 1
+            files.append(file)
+        for file, patch in zip(files[:self.files_limit], self._iter_patches(merge_base, head)):
+            if patch is not None:
+                file["patch"] = patch
+        comparison = (files, commits, merge_base, ahead_by, behind_by)
+        with self._lock:
+            self._compare_cache[key] = comparison
+        return comparison
+
+    def _iter_patches(self, base, head):
+        """
+        Yield the patch of every file of a comparison, in the order of `diff-tree --raw`,
+        as GitHub lists it: the hunks of `git diff -U3` without the file headers, or
+        None for binary files and changes without hunks.
+        """
+        output = subprocess.run(
+            ["git", "diff-tree", "-r", "-p", "-M", "-U3", "--no-color", "--no-ext-diff", base, head],
+            cwd=self.repo_path, capture_output=True, check=True).stdout.decode("utf-8", "replace")
+        # Content lines start with a space, + or -, so only file headers start with "diff "
+        for chunk in ("\n" + output).split("\ndiff --git ")[1:]:
+            hunks = chunk.find("\n@@")
+            yield chunk[hunks + 1:].rstrip("\n") if hunks != -1 else None
+
+    def _contents(self, path, ref):
+        content = subprocess.run(["git", "cat-file", "blob", f"{ref or 'HEAD'}:{path}"],
+                                 cwd=self.repo_path, capture_output=True, check=True).stdout
+        return 200, {"type": "file", "path": path, "size": len(content),
+                     "sha": self._git("rev-parse", f"{ref or 'HEAD'}:{path}"), "encoding": "base64",
+                     "content": base64.b64encode(content).decode("ascii")}
+
+    def _tree(self, sha):
+        entries = []
+        for line in self._git("ls-tree", "-z", sha).split("\0"):
+            if line:
+                meta, path = line.split("\t", 1)
+                mode, kind, entry_sha = meta.split(" ")
+                entries.append({"path": path, "mode": mode, "type": kind, "sha": entry_sha})
+        return 200, {"sha": sha, "tree": entries, "truncated": False}
+
+    def _git(self, *args):
+        return subprocess.run(["git", *args], cwd=self.repo_path, capture_output=True,
+                              text=True, check=True).stdout.strip("\n\0")
+
+
+def make_handler(github):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == STATS_PATH:
+                with github._lock:
+                    counts = dict(github.counts)
+                self._send(200, {}, {"requests": sum(counts.values()), "endpoints": counts})
+                return
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            self._send(*github.handle(url.path, query))
+
+        def do_DELETE(self):
+            with github._lock:
+                github.counts.clear()
+            self._send(204, {}, None)
+
+        def _send(self, status, headers, body):
+            data = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local git repository as a GitHub REST API.")
+    parser.add_argument("repo_path")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--page-limit", type=int, default=100, help="largest per_page honoured")
+    parser.add_argument("--files-limit", type=int, default=300, help="files listed per comparison")
+    parser.add_argument("--rate-limit", type=int, default=None, help="requests per window")
+    parser.add_argument("--rate-limit-window", type=float, default=60.0)
+    parser.add_argument("--stall", default="", help="comma separated endpoints that never answer")
+    args = parser.parse_args(argv)
+
+    github = FakeGithub(args.repo_path, args.latency, args.page_limit, args.files_limit,
+                        args.rate_limit, args.rate_limit_window,
+                        [name for name in args.stall.split(",") if name])
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(github))
+    server.daemon_threads = True
+    print(f"http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
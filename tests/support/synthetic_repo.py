@@ -0,0 +1,90 @@
+"""Generate git repositories with two diverging branches of configurable size."""
+import os
+import subprocess
+from typing import NamedTuple, Set
+
+FILES_PER_DIRECTORY = 100
+
+
+class SyntheticRepo(NamedTuple):
+    path: str
+    base: str
+    remote_branch: str
+    local_branch: str
+    overlapping: Set[str]
+
+
+def file_path(index):
+    """Spread files over directories like a real source tree."""
+    return f"dir{index // FILES_PER_DIRECTORY:05d}/file{index:07d}.txt"
+
+
+def build_synthetic_repo(path, changed_files, file_count=None, overlap=0.5, identical=0.1,
+                         remote_branch="main", local_branch="feature"):
+    """
+    Build a repository whose `remote_branch` and `local_branch` each change `changed_files`
+    files since their merge base. A fraction `overlap` of the changes touches the same
+    files on both sides, and a fraction `identical` of those overlaps has the same content
+    on both sides. The history is written with a single `git fast-import`, so repositories
+    with hundreds of thousands of files take seconds to build.
+    """
+    path = str(path)
+    overlapping_count = int(changed_files * overlap)
+    file_count = file_count or 2 * changed_files - overlapping_count
+    if file_count < 2 * changed_files - overlapping_count:
+        raise ValueError("file_count is too small for the requested changes")
+
+    # Remote changes the first files, local the files starting where the overlap begins
+    remote_changes = range(changed_files)
+    local_changes = range(changed_files - overlapping_count, 2 * changed_files - overlapping_count)
+    identical_count = int(overlapping_count * identical)
+
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(["git", "init", "-q", "-b", remote_branch], cwd=path, check=True)
+    stream = _FastImportStream()
+    stream.commit(f"refs/heads/{remote_branch}", "base", None,
+                  ((index, f"file {index}\n") for index in range(file_count)))
+    stream.reset(f"refs/heads/{local_branch}", ":1")
+    stream.commit(f"refs/heads/{remote_branch}", "remote changes", ":1",
+                  ((index, f"file {index}\nremote\n") for index in remote_changes))
+    stream.commit(f"refs/heads/{local_branch}", "local changes", ":1",
+                  ((index, f"file {index}\nremote\n" if index < changed_files - overlapping_count
+                    + identical_count else f"file {index}\nlocal\n") for index in local_changes))
+    subprocess.run(["git", "fast-import", "--quiet"], cwd=path, input=stream.getvalue(),
+                   check=True)
+    # Point HEAD at the local branch without writing out a working tree
+    subprocess.run(["git", "symbolic-ref", "HEAD", f"refs/heads/{local_branch}"], cwd=path, check=True)
+
+    base = subprocess.run(["git", "rev-parse", f"refs/heads/{remote_branch}~1"], cwd=path,
+                          capture_output=True, text=True, check=True).stdout.strip()
+    overlapping = {file_path(index) for index in remote_changes if index in local_changes}
+    return SyntheticRepo(path, base, remote_branch, local_branch, overlapping)
+
+
+class _FastImportStream:
+    """Build a `git fast-import` stream of commits with inline file contents."""
+
+    def __init__(self):
+        self._chunks = []
+        self._marks = 0
+
+    def commit(self, ref, message, parent, files):
+        self._marks += 1
+        message = message.encode()
+        self._chunks.append(
+            f"commit {ref}\nmark :{self._marks}\n"
+            f"committer Test <test@example.com> 1700000000 +0000\n"
+            f"data {len(message)}\n".encode() + message + b"\n")
+        if parent:
+            self._chunks.append(f"from {parent}\n".encode())
+        for index, content in files:
+            data = content.encode()
+            self._chunks.append(
+                f"M 100644 inline {file_path(index)}\ndata {len(data)}\n".encode() + data + b"\n")
+        self._chunks.append(b"\n")
+
+    def reset(self, ref, commit):
+        self._chunks.append(f"reset {ref}\nfrom {commit}\n\n".encode())
+
+    def getvalue(self):
+        return b"".join(self._chunks)
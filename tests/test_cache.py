@@ -0,0 +1,64 @@
+import pytest
+
+from git_diff_analyzer import cache as cache_module
+from git_diff_analyzer.cache import ResultCache, is_commit_sha
+
+
+def test_get_missing_returns_none(result_cache):
+    assert result_cache.get("blob-sha", ["abc", "file.py"]) is None
+
+
+def test_set_and_get_round_trip(result_cache):
+    result_cache.set("local-changes", ["a", "b"], [["file.py", "modified", "1", "2", None, None]])
+    assert result_cache.get("local-changes", ["a", "b"]) == [["file.py", "modified", "1", "2", None, None]]
+    assert result_cache.get("remote-changes", ["a", "b"]) is None
+
+
+def test_cache_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer, reader = ResultCache(path), ResultCache(path)
+    try:
+        writer.set("merge-base", ["a", "b"], "c")
+        assert reader.get("merge-base", ["a", "b"]) == "c"
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_least_recently_used_entries_are_evicted(result_cache, monkeypatch):
+    monkeypatch.setattr(cache_module, "EVICTION_INTERVAL", 1)
+    monkeypatch.setattr(cache_module, "TOUCH_INTERVAL", 0)
+    clock = iter(range(1000))
+    monkeypatch.setattr(cache_module.time, "time", lambda: next(clock))
+    for i in range(10):
+        result_cache.set("blob-sha", [str(i)], [str(i)])
+    result_cache.get("blob-sha", ["0"])
+
+    result_cache.set("blob-sha", ["10"], ["10"])
+
+    assert len(result_cache) == 9
+    assert result_cache.get("blob-sha", ["0"]) == ["0"]
+    assert result_cache.get("blob-sha", ["1"]) is None
+
+
+def test_hits_only_touch_stale_entries(result_cache, monkeypatch):
+    """Test that repeated hits do not write the access time again within TOUCH_INTERVAL."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    result_cache.set("blob-sha", ["a"], ["a"])
+    statements = []
+    result_cache._connection.set_trace_callback(statements.append)
+
+    now[0] += 1
+    assert result_cache.get("blob-sha", ["a"]) == ["a"]
+    assert not [statement for statement in statements if statement.startswith("UPDATE")]
+
+    now[0] += cache_module.TOUCH_INTERVAL
+    assert result_cache.get("blob-sha", ["a"]) == ["a"]
+    assert len([statement for statement in statements if statement.startswith("UPDATE")]) == 1
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("a" * 40, True), ("0123456789abcdef" * 4, True), ("main", False), ("abc123", False), (None, False)])
+def test_is_commit_sha(value, expected):
+    assert is_commit_sha(value) is expected
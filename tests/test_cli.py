@@ -0,0 +1,82 @@
+import json
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from git_diff_analyzer.cli import main
+from git_diff_analyzer.models import ChangedFile, Overlap
+
+
+@patch('git_diff_analyzer.cli.iter_overlapping_changes')
+def test_main_writes_ndjson(mock_iter_overlapping_changes, capsys):
+    mock_iter_overlapping_changes.return_value = (overlap for overlap in [
+        Overlap('a.py', ChangedFile('a.py', 'modified', 'old', 'sha1'),
+                ChangedFile('a.py', 'modified', None, 'sha2')),
+        Overlap('b.py', ChangedFile('b.py', 'added', None, 'sha3'),
+                ChangedFile('b.py', 'added', None, 'sha3')),
+    ])
+
+    exit_code = main(['owner', 'repo', '/path/to/repo', 'main', 'feature', '--token', 'token'])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert exit_code == 0
+    assert [json.loads(line) for line in lines] == [
+        {"path": "a.py", "identical": False,
+         "local": {"status": "modified", "old_sha": "old", "new_sha": "sha1"},
+         "remote": {"status": "modified", "new_sha": "sha2"}},
+        {"path": "b.py", "identical": True,
+         "local": {"status": "added", "old_sha": None, "new_sha": "sha3"},
+         "remote": {"status": "added", "new_sha": "sha3"}},
+    ]
+    mock_iter_overlapping_changes.assert_called_once_with(
+        'owner', 'repo', 'token', '/path/to/repo', 'main', 'feature', provider='github',
+        merge_base_mode='local', include=None, exclude=None, skip_generated=False)
+
+
+@pytest.mark.parametrize("error", [
+    ValueError("Failed to get merge base: bad revision"),
+    TimeoutError("Request deadline exceeded"),
+    requests.ConnectionError("Connection refused"),
+    FileNotFoundError("File 'a.py' not found in commit abc."),
+])
+@patch('git_diff_analyzer.cli.iter_overlapping_changes')
+def test_main_reports_errors(mock_iter_overlapping_changes, error, capsys):
+    def failing():
+        yield Overlap('a.py', ChangedFile('a.py', 'modified', 'old', 'sha1'),
+                      ChangedFile('a.py', 'modified', None, 'sha2'))
+        raise error
+    mock_iter_overlapping_changes.return_value = failing()
+
+    exit_code = main(['owner', 'repo', '/path/to/repo', 'main', 'feature', '--token', 'token'])
+
+    captured = capsys.readouterr()
+    assert exit_code == 1
+    assert captured.err == f"error: {error}\n"
+    assert len(captured.out.splitlines()) == 1
+
+
+@patch('git_diff_analyzer.services.daemon.OverlapWatcher')
+def test_watch_reports_errors(mock_overlap_watcher, capsys):
+    mock_overlap_watcher.side_effect = requests.ConnectionError("Connection refused")
+
+    exit_code = main(['owner', 'repo', '/path/to/repo', 'main', 'feature', '--token', 'token',
+                      '--watch', '/tmp/overlaps.sock'])
+
+    assert exit_code == 1
+    assert capsys.readouterr().err == "error: Connection refused\n"
+
+
+def test_main_requires_token(capsys, monkeypatch):
+    monkeypatch.delenv('GITHUB_TOKEN', raising=False)
+    assert main(['owner', 'repo', '/path/to/repo', 'main', 'feature']) == 2
+
+
+@patch('git_diff_analyzer.cli.iter_overlapping_changes')
+def test_main_prints_stats(mock_iter_overlapping_changes, capsys):
+    mock_iter_overlapping_changes.return_value = (overlap for overlap in [])
+
+    exit_code = main(['owner', 'repo', '/path/to/repo', 'main', 'feature', '--token', 'token', '--stats'])
+
+    assert exit_code == 0
+    assert set(json.loads(capsys.readouterr().err)) == {"phases", "counts", "latency_ms", "bytes"}
@@ -0,0 +1,75 @@
+from git_diff_analyzer.hunks import iter_diff_hunk_ranges, parse_hunk_ranges
+
+
+def test_parse_hunk_ranges_modifications_and_insertions():
+    """Test that removed lines and insertion points are mapped to base lines."""
+    patch = "\n".join([
+        "@@ -2,3 +2,3 @@ def f():",
+        " context",
+        "-old",
+        "+new",
+        " context",
+        "@@ -10,0 +11,2 @@",
+        "+inserted",
+        "+inserted",
+    ])
+
+    assert parse_hunk_ranges(patch) == [(3, 3), (10, 10)]
+
+
+def test_parse_hunk_ranges_coalesces_adjacent_lines():
+    """Test that consecutive removals form a single range."""
+    patch = "@@ -5,3 +5,0 @@\n-a\n-b\n-c\n\\ No newline at end of file"
+
+    assert parse_hunk_ranges(patch) == [(5, 7)]
+
+
+def test_iter_diff_hunk_ranges_multiple_files():
+    """Test parsing paths, hunks and binary files of a multi-file diff."""
+    lines = [
+        "diff --git a/src/a b.py b/src/a b.py\n",
+        "index 1111111..2222222 100644\n",
+        "--- a/src/a b.py\n",
+        "+++ b/src/a b.py\n",
+        "@@ -4 +4 @@\n",
+        "-x\n",
+        "+y\n",
+        "diff --git a/logo.png b/logo.png\n",
+        "index 3333333..4444444 100644\n",
+        "Binary files a/logo.png and b/logo.png differ\n",
+        'diff --git "a/caf\\303\\251.txt" "b/caf\\303\\251.txt"\n',
+        "@@ -1,0 +2 @@\n",
+        "+z\n",
+    ]
+
+    assert list(iter_diff_hunk_ranges(lines)) == [
+        ("src/a b.py", [(4, 4)]), ("logo.png", None), ("café.txt", [(1, 1)])]
+
+
+def test_iter_diff_hunk_ranges_renames():
+    """Test that renamed and copied files are reported under their new path."""
+    lines = [
+        "diff --git a/old.py b/src/new.py\n",
+        "similarity index 90%\n",
+        "rename from old.py\n",
+        "rename to src/new.py\n",
+        "index 1111111..2222222 100644\n",
+        "--- a/old.py\n",
+        "+++ b/src/new.py\n",
+        "@@ -3 +3 @@\n",
+        "-x\n",
+        "+y\n",
+        "diff --git a/moved.py b/dir/moved.py\n",
+        "similarity index 100%\n",
+        "rename from moved.py\n",
+        "rename to dir/moved.py\n",
+        "diff --git a/a.py b/copy.py\n",
+        "similarity index 80%\n",
+        "copy from a.py\n",
+        'copy to "tab\\there.py"\n',
+        "@@ -1,0 +2 @@\n",
+        "+z\n",
+    ]
+
+    assert list(iter_diff_hunk_ranges(lines)) == [
+        ("src/new.py", [(3, 3)]), ("dir/moved.py", []), ("tab\there.py", [(1, 1)])]
@@ -0,0 +1,57 @@
+import pytest
+from unittest.mock import Mock, patch
+
+from git_diff_analyzer.instrumentation import (
+    HTTP, PHASE, SUBPROCESS, add_span_hook, collect_stats, remove_span_hook, span)
+from git_diff_analyzer.git_utils.git_commands import run_git_command
+
+
+def test_span_is_noop_without_collectors():
+    with span("merge-base") as attributes:
+        attributes["bytes"] = 10
+    with collect_stats() as stats:
+        pass
+    assert stats.to_dict() == {"phases": {}, "counts": {}, "latency_ms": {}, "bytes": {}}
+
+
+def test_collect_stats_aggregates_spans():
+    with collect_stats() as stats:
+        with span("merge-base"):
+            pass
+        for size in (100, 50):
+            with span("GET compare", HTTP) as attributes:
+                attributes["bytes"] = size
+
+    result = stats.to_dict()
+    assert set(result["phases"]) == {"merge-base"}
+    assert result["counts"] == {"merge-base": 1, "GET compare": 2}
+    assert sum(result["latency_ms"][HTTP].values()) == 2
+    assert result["bytes"] == {HTTP: 150}
+
+
+def test_span_hook_receives_failed_spans():
+    spans = []
+    add_span_hook(spans.append)
+    try:
+        with pytest.raises(ValueError):
+            with span("remote-connect", PHASE, provider="github"):
+                raise ValueError("boom")
+    finally:
+        remove_span_hook(spans.append)
+
+    assert len(spans) == 1
+    assert spans[0].name == "remote-connect"
+    assert spans[0].attributes == {"provider": "github", "error": "ValueError"}
+    assert spans[0].duration >= 0
+
+
+@patch('subprocess.run')
+def test_run_git_command_records_subprocess(mock_run):
+    mock_run.return_value = Mock(returncode=0, stdout="abc123\n")
+
+    with collect_stats() as stats:
+        run_git_command(["git", "-c", "core.quotepath=false", "merge-base", "a", "b"], "/path/to/repo")
+
+    result = stats.to_dict()
+    assert result["counts"] == {"git merge-base": 1}
+    assert result["bytes"] == {SUBPROCESS: 7}
@@ -0,0 +1,85 @@
+import pytest
+
+from git_diff_analyzer.path_filter import PathFilter, make_path_filter
+
+PATHS = ['README', 'a', 'setup.py', 'sub/a', 'docs/b/a', 's/x.py', 'src/top.py', 'src/a/mid.py',
+         'src/a.py/inner.txt', 'src/tests/test_top.py', 'src/pkg/vendor/lib.py', 'tests/t.py']
+
+
+def test_make_path_filter_without_patterns():
+    assert make_path_filter() is None
+    assert make_path_filter(include=[], exclude=[]) is None
+
+
+def test_include_and_exclude():
+    path_filter = PathFilter(include=['src/**/*.py', 'setup.py'], exclude=['src/tests'])
+
+    assert path_filter('src/app.py')
+    assert path_filter('src/pkg/deep/module.py')
+    assert path_filter('setup.py')
+    assert not path_filter('src/app.js')
+    assert not path_filter('docs/setup.py')
+    assert not path_filter('src/tests/test_app.py')
+
+
+def test_single_star_stays_within_directory():
+    path_filter = PathFilter(include=['src/*.py'])
+
+    assert path_filter('src/app.py')
+    assert not path_filter('src/pkg/module.py')
+
+
+def test_skip_generated():
+    path_filter = PathFilter(skip_generated=True)
+
+    assert path_filter('src/app.py')
+    assert not path_filter('vendor/lib/module.go')
+    assert not path_filter('web/node_modules/react/index.js')
+    assert not path_filter('package-lock.json')
+    assert not path_filter('static/app.min.js')
+    assert not path_filter('docs/logo.png')
+
+
+def test_may_contain():
+    path_filter = PathFilter(include=['src/pkg/**'], exclude=['**/vendor/**', 'src/pkg/*'])
+
+    assert path_filter.may_contain('src')
+    assert path_filter.may_contain('src/pkg/sub')
+    assert not path_filter.may_contain('docs')
+    assert not path_filter.may_contain('src/pkg/vendor')
+
+
+def test_pathspecs():
+    path_filter = PathFilter(include=['src/**'], exclude=['*.lock'])
+
+    assert path_filter.pathspecs() == [':(glob)src/**', ':(glob,exclude)*.lock']
+
+
+def test_negated_bracket_expression():
+    path_filter = PathFilter(include=['src/*.[!c]', 'lib/[^_]*.py'])
+
+    assert path_filter('src/app.h')
+    assert not path_filter('src/app.c')
+    assert path_filter('lib/module.py')
+    assert not path_filter('lib/_private.py')
+    assert PathFilter(include=['[!]x]*'])('a.txt')
+    assert not PathFilter(include=['[!]x]*'])(']a.txt')
+
+
+@pytest.mark.parametrize("include, exclude", [
+    (['src/*'], []), (['*'], []), (['[st]*'], []), (['**/a'], []), (['**/*.py'], []),
+    (['src/**'], []), (['src'], []), (['src/[!t]*'], []), (['*.py'], []), (['?'], []),
+    ([], ['src/*']), ([], ['**/vendor']), ([], ['**/vendor/**']), (['src'], ['src/tests']),
+    (['**/*.py'], ['src/[a-p]*/**']),
+])
+def test_matches_git_pathspecs(git_repo, include, exclude):
+    """Test that the filter selects the same paths as git does with its pathspecs."""
+    base = git_repo.commit("base")
+    for path in PATHS:
+        git_repo.write(path, path)
+    head = git_repo.commit("files")
+    path_filter = PathFilter(include, exclude)
+
+    selected = git_repo.git("diff-tree", "-r", "--name-only", base, head, "--",
+                            *path_filter.pathspecs()).split()
+    assert sorted(path for path in PATHS if path_filter(path)) == sorted(selected)